@@ -0,0 +1,242 @@
+"""
+Self check-in with rotating codes.
+
+A manager opens check-in on a session and puts the current code (or a QR
+of it) on screen. The code is a 6-digit HMAC of the time window, keyed per
+session from SECRET_KEY, so it changes every `checkin_period` seconds and
+is verified by recomputing it rather than looking anything up. The
+previous window's code is accepted too, for members who scan just as it
+rotates.
+
+Per scan the only state needed is the session's check-in window and
+roster, which is cached in-process and reloaded at most every STATE_TTL
+seconds; the member id comes from the JWT claims, not the users table.
+So a scan normally touches no database at all. Closing check-in takes
+effect in other worker processes within STATE_TTL.
+
+Wrong codes are counted per member in the shared cache, so the
+MAX_FAILED_ATTEMPTS limit holds across worker processes.
+
+Accepted check-ins go through a buffered writer (core/buffering.py): a
+background thread writes them as one UPDATE per session, moving ABSENT
+records to PRESENT (manager marks such as EXCUSED are never overwritten),
+so a burst of scans becomes a handful of statements instead of one row
+update per member. Each scan waits for the flush carrying it, and is only
+acknowledged once it is in the database or, if the write failed, in the
+spool file that is replayed on the next successful flush. Set
+ATTENDANCE_CHECKIN_ASYNC = False to write each check-in immediately (tests,
+one-off scripts).
+"""
+import atexit
+import hashlib
+import hmac
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.buffering import BufferedWriter
+from .models import AttendanceSession, AttendanceRecord
+
+CODE_DIGITS = 6
+STATE_TTL = 10  # seconds
+MAX_FAILED_ATTEMPTS = 5
+FAILURES_TTL = 60 * 60
+WRITE_CHUNK = 500
+
+
+class CheckinError(Exception):
+    """A check-in was refused; `reason` is a short machine-readable code."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+# --- Codes ---
+
+def _session_key(session_id):
+    return hmac.new(settings.SECRET_KEY.encode(), f'attendance-checkin:{session_id}'.encode(), hashlib.sha256).digest()
+
+
+def code_for(session_id, window):
+    """TOTP-style truncation of HMAC(session key, window) to CODE_DIGITS digits."""
+    digest = hmac.new(_session_key(session_id), str(window).encode(), hashlib.sha256).digest()
+    offset = digest[-1] & 0x0F
+    value = int.from_bytes(digest[offset:offset + 4], 'big') & 0x7FFFFFFF
+    return str(value % 10 ** CODE_DIGITS).zfill(CODE_DIGITS)
+
+
+def current_code(session_id, period, now=None):
+    """(code, seconds until it rotates)"""
+    now = time.time() if now is None else now
+    return code_for(session_id, int(now // period)), period - int(now % period)
+
+
+def verify_code(session_id, period, code, now=None):
+    now = time.time() if now is None else now
+    window = int(now // period)
+    code = str(code or '').strip()
+    return any(hmac.compare_digest(code_for(session_id, w), code) for w in (window, window - 1))
+
+
+# --- Session state cache ---
+
+_states = {}
+_load_lock = threading.Lock()
+
+
+def _load_state(session_id):
+    row = (
+        AttendanceSession.objects.filter(pk=session_id)
+        .values('status', 'checkin_open_until', 'checkin_period').first()
+    )
+    if row is None or row['status'] == 'FINALIZED' or row['checkin_open_until'] is None:
+        return {'open_until': None, 'period': 30, 'roster': set(), 'present': set(), 'loaded': time.monotonic()}
+    roster = dict(AttendanceRecord.objects.filter(session_id=session_id).values_list('user_id', 'status'))
+    return {
+        'open_until': row['checkin_open_until'].timestamp(),
+        'period': row['checkin_period'],
+        'roster': set(roster),
+        'present': {uid for uid, st in roster.items() if st == 'PRESENT'},
+        'loaded': time.monotonic(),
+    }
+
+
+def _state(session_id):
+    state = _states.get(session_id)
+    if state is not None and time.monotonic() - state['loaded'] < STATE_TTL:
+        return state
+    with _load_lock:
+        # Another thread may have reloaded it while we waited
+        state = _states.get(session_id)
+        if state is not None and time.monotonic() - state['loaded'] < STATE_TTL:
+            return state
+        fresh = _load_state(session_id)
+        if state is not None and fresh['open_until'] is not None:
+            # Keep what this process has seen but not yet flushed
+            fresh['present'] |= state['present']
+        _states[session_id] = fresh
+        stale = [sid for sid, st in _states.items() if fresh['loaded'] - st['loaded'] > 600]
+        for sid in stale:
+            _states.pop(sid, None)
+        return fresh
+
+
+def invalidate(session_id):
+    _states.pop(session_id, None)
+
+
+# --- Buffered writes ---
+
+class CheckinBuffer(BufferedWriter):
+    """Buffered (session_id, user_id) check-ins."""
+    setting_prefix = 'ATTENDANCE_CHECKIN'
+    thread_name = 'attendance-checkin'
+    flush_size = 500
+    flush_interval = 1.0
+    spool_name = 'checkin_spool.jsonl'
+    extra_counters = ('written', 'unchanged')
+
+    def write_batch(self, items):
+        by_session = {}
+        for session_id, user_id in items:
+            by_session.setdefault(session_id, set()).add(user_id)
+        for session_id, user_ids in by_session.items():
+            self._write_session(session_id, sorted(user_ids))
+
+    def _write_session(self, session_id, user_ids):
+        from .marking import _refresh_rollups
+
+        now = timezone.now()
+        updated = 0
+        with transaction.atomic():
+            for i in range(0, len(user_ids), WRITE_CHUNK):
+                updated += AttendanceRecord.objects.filter(
+                    session_id=session_id, user_id__in=user_ids[i:i + WRITE_CHUNK], status='ABSENT',
+                ).update(status='PRESENT', marked_by_id=F('user_id'), timestamp=now)
+            if updated:
+                # Finalized while the check-ins were buffered: keep the rollups in step
+                finalized = AttendanceSession.objects.filter(pk=session_id, status='FINALIZED').only('id', 'date').first()
+                if finalized:
+                    _refresh_rollups(finalized, user_ids)
+        self._count('written', updated)
+        self._count('unchanged', len(user_ids) - updated)
+
+    def decode(self, data):
+        session_id, user_id = data
+        return int(session_id), int(user_id)
+
+
+buffer = CheckinBuffer()
+atexit.register(buffer.shutdown)
+
+
+# --- Entry points ---
+
+def _failures_key(session_id, user_id):
+    return f'attendance:checkin-failures:{session_id}:{user_id}'
+
+
+def _count_failure(key):
+    # Shared by all workers, so the limit holds however scans are balanced
+    cache.add(key, 0, FAILURES_TTL)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, FAILURES_TTL)
+
+
+def check_in(session_id, user_id, code):
+    """
+    Record a member's self check-in. Returns 'checked_in' once it is
+    written (or spooled), or 'already_checked_in'; raises CheckinError
+    otherwise.
+    """
+    state = _state(session_id)
+    now = time.time()
+    if state['open_until'] is None or now > state['open_until']:
+        raise CheckinError('closed')
+    if user_id not in state['roster']:
+        raise CheckinError('not_on_roster')
+    if user_id in state['present']:
+        return 'already_checked_in'
+    failures_key = _failures_key(session_id, user_id)
+    if cache.get(failures_key, 0) >= MAX_FAILED_ATTEMPTS:
+        raise CheckinError('too_many_attempts')
+    if not verify_code(session_id, state['period'], code, now):
+        _count_failure(failures_key)
+        raise CheckinError('invalid_code')
+
+    state['present'].add(user_id)
+    if not buffer.add((session_id, user_id), wait=True):
+        state['present'].discard(user_id)
+        raise CheckinError('unavailable')
+    return 'checked_in'
+
+
+def open_checkin(session, opened_by, minutes=15, period=30):
+    """Populate the roster and accept check-ins for the next `minutes`."""
+    from .marking import populate_session
+
+    populate_session(session, opened_by)
+    session.checkin_open_until = timezone.now() + timedelta(minutes=minutes)
+    session.checkin_period = period
+    if session.status == 'DRAFT':
+        session.status = 'OPEN'
+    session.save(update_fields=['checkin_open_until', 'checkin_period', 'status'])
+    invalidate(session.pk)
+
+
+def close_checkin(session):
+    now = timezone.now()
+    if session.checkin_open_until is None or session.checkin_open_until > now:
+        session.checkin_open_until = now
+        session.save(update_fields=['checkin_open_until'])
+    invalidate(session.pk)
+    buffer.flush()
@@ -0,0 +1,189 @@
+import json
+import random
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from attendance import checkin
+from attendance.models import AttendanceSession, AttendanceRecord
+from attendance.views import SelfCheckinView
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate a burst of members checking in to one session. Creates a throwaway "
+        "session and users, fires the check-ins concurrently, reports latency and how "
+        "long the buffered writes took to land, then deletes everything (unless --keep). "
+        "Refuses to touch the configured database unless DEBUG is on or --i-know-this-is-prod is given; "
+        "--test-database runs against a throwaway database instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=50, help="Simultaneous clients")
+        parser.add_argument('--spread', type=float, default=0,
+                            help="Spread arrivals over this many seconds (0 = all at once)")
+        parser.add_argument('--bad-codes', type=float, default=0.05, help="Fraction of scans with a wrong code")
+        parser.add_argument('--url', help="Base URL of a running server (e.g. http://localhost:8000); "
+                                          "default calls the view in-process")
+        parser.add_argument('--keep', action='store_true', help="Keep the generated session and users")
+        parser.add_argument('--test-database', action='store_true',
+                            help="Run in-process against a throwaway test database, cache and spool")
+        parser.add_argument('--i-know-this-is-prod', action='store_true',
+                            help="Allow writing to the configured database with DEBUG off")
+
+    def handle(self, *args, **options):
+        if options['members'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--members and --concurrency must be positive")
+
+        if options['test_database']:
+            if options['url']:
+                raise CommandError("--test-database runs in-process and can't be combined with --url")
+            self._in_test_database(options)
+        elif settings.DEBUG or options['i_know_this_is_prod']:
+            self._loadtest(options)
+        else:
+            raise CommandError(
+                "DEBUG is off: this would create and delete users and a session in the configured database. "
+                "Use --test-database, or --i-know-this-is-prod if that is really intended."
+            )
+
+    def _in_test_database(self, options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        try:
+            with tempfile.TemporaryDirectory() as tmp, override_settings(
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                ATTENDANCE_CHECKIN_SPOOL_PATH=f'{tmp}/checkin_spool.jsonl',
+            ):
+                self._loadtest(options)
+                checkin.buffer.flush()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _loadtest(self, options):
+        members = options['members']
+        tag = f"loadtest-checkin-{uuid.uuid4().hex[:8]}"
+        session, users = self._setup(tag, members)
+        self.stdout.write(f"Session {session.pk} with {members} members ({tag})")
+        try:
+            self._run(session, users, options)
+        finally:
+            if options['keep']:
+                self.stdout.write(f"Kept session {session.pk} and users {tag}-*")
+            else:
+                session.delete()
+                User.objects.filter(username__startswith=f'{tag}-').delete()
+
+    def _setup(self, tag, members):
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=f'{tag}-{i}', password=password) for i in range(members)], batch_size=1000,
+        )
+        users = list(User.objects.filter(username__startswith=f'{tag}-').values_list('id', flat=True))
+        session = AttendanceSession.objects.create(title=tag, date=timezone.now(), scope_type='CUSTOM')
+        AttendanceRecord.objects.bulk_create(
+            [AttendanceRecord(session=session, user_id=uid) for uid in users], batch_size=1000,
+        )
+        checkin.open_checkin(session, None, minutes=10, period=30)
+        return session, users
+
+    def _run(self, session, users, options):
+        tokens = {}
+        for uid in users:
+            token = AccessToken()
+            token[api_settings.USER_ID_CLAIM] = uid
+            tokens[uid] = str(token)
+
+        send = self._send_http(options['url']) if options['url'] else self._send_local()
+
+        spread = options['spread']
+        start = time.perf_counter()
+        arrivals = sorted((random.uniform(0, spread), uid) for uid in users)
+
+        def scan(item):
+            at, uid = item
+            delay = start + at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # What the member reads off the screen at that moment
+            code, _ = checkin.current_code(session.pk, session.checkin_period)
+            if random.random() < options['bad_codes']:
+                code = str((int(code) + 1) % 10 ** checkin.CODE_DIGITS).zfill(checkin.CODE_DIGITS)
+            body = {'session': session.pk, 'code': code}
+            t0 = time.perf_counter()
+            try:
+                status = send(tokens[uid], body)
+            finally:
+                connection.close()
+            return status, time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(scan, arrivals))
+        elapsed = time.perf_counter() - start
+
+        accepted = sum(1 for st, _ in results if st == 200)
+        latencies = sorted(lat * 1000 for _, lat in results)
+        pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+        self.stdout.write(
+            f"{len(results)} scans in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s), {accepted} accepted\n"
+            f"latency ms: p50 {pct(0.5):.1f}  p95 {pct(0.95):.1f}  p99 {pct(0.99):.1f}  max {latencies[-1]:.1f}"
+        )
+        statuses = {}
+        for st, _ in results:
+            statuses[st] = statuses.get(st, 0) + 1
+        self.stdout.write(f"responses: {dict(sorted(statuses.items()))}")
+
+        # Wait for the buffered writes to reach the database
+        t0 = time.perf_counter()
+        if not options['url']:
+            checkin.buffer.flush()
+        present = 0
+        while time.perf_counter() - t0 < 30:
+            present = session.records.filter(status='PRESENT').count()
+            if present >= accepted:
+                break
+            time.sleep(0.2)
+        self.stdout.write(f"{present} records PRESENT {time.perf_counter() - t0:.2f}s after the last scan")
+        if not options['url']:
+            self.stdout.write(f"buffer: {checkin.buffer.stats()}")
+        if present < accepted:
+            self.stdout.write(self.style.WARNING(f"{accepted - present} accepted check-ins not written yet"))
+
+    def _send_local(self):
+        factory = APIRequestFactory()
+        view = SelfCheckinView.as_view()
+
+        def send(token, body):
+            request = factory.post('/api/attendance/checkin/', body, format='json',
+                                   HTTP_AUTHORIZATION=f'Bearer {token}')
+            return view(request).status_code
+        return send
+
+    def _send_http(self, base_url):
+        url = base_url.rstrip('/') + '/api/attendance/checkin/'
+
+        def send(token, body):
+            request = urllib.request.Request(
+                url, data=json.dumps(body).encode(), method='POST',
+                headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'},
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+        return send
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from attendance.rollups import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Recompute all attendance rollups from FINALIZED sessions (run once after deploying, or to repair)."
+
+    def handle(self, *args, **options):
+        members = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt attendance rollups for {members} members"))
@@ -0,0 +1,181 @@
+"""
+Bulk attendance writes: populating a session's roster and marking it.
+
+populate_session() selects eligible member ids in one query (using the
+normalised MemberProfile.year_number / primary_sig / sigs) and inserts the
+missing records with chunked bulk_create.
+
+Marking:
+A batch is validated up front, then applied as one UPDATE per status
+(user_id__in=...) inside a single transaction. Rows already holding the
+requested status are left alone, so re-sending a batch writes nothing.
+
+Clients may send a batch_id. The first submission's result is stored in
+AttendanceBatch and returned as-is for retries with the same id, so a
+flaky connection that re-posts the same changes doesn't apply them twice.
+"""
+import hashlib
+import json
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import AttendanceSession, AttendanceRecord, AttendanceBatch
+
+VALID_STATUSES = {choice for choice, _ in AttendanceRecord.STATUS_CHOICES}
+INSERT_CHUNK = 2000
+
+
+class BatchReuseError(Exception):
+    """batch_id was already used for a different set of updates."""
+
+
+class TargetYearError(Exception):
+    """target_years holds entries that don't name a year (see MemberProfile.parse_year)."""
+
+
+def _payload_hash(updates):
+    return hashlib.sha256(json.dumps(updates, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _validate(updates):
+    """Returns ({user_id: status}, conflicts). Later entries for a user win."""
+    wanted, conflicts = {}, []
+    for item in updates:
+        if not isinstance(item, dict):
+            conflicts.append({'user_id': None, 'reason': 'malformed'})
+            continue
+        uid, st = item.get('user_id'), item.get('status')
+        try:
+            uid = int(uid)
+        except (TypeError, ValueError):
+            conflicts.append({'user_id': uid, 'reason': 'invalid_user'})
+            continue
+        if st not in VALID_STATUSES:
+            conflicts.append({'user_id': uid, 'reason': 'invalid_status', 'status': st})
+            continue
+        wanted[uid] = st
+    return wanted, conflicts
+
+
+def apply_batch(session, updates, marked_by, batch_id=None):
+    """Apply [{user_id, status}, ...] to a session's records. Returns a result dict."""
+    payload_hash = _payload_hash(updates)
+
+    with transaction.atomic():
+        # Serialises batches per session and makes the batch_id check race-free
+        AttendanceSession.objects.select_for_update().only('id').get(pk=session.pk)
+
+        if batch_id:
+            previous = AttendanceBatch.objects.filter(session=session, batch_id=batch_id).first()
+            if previous:
+                if previous.payload_hash != payload_hash:
+                    raise BatchReuseError(batch_id)
+                return {**previous.result, 'replayed': True}
+
+        wanted, conflicts = _validate(updates)
+        current = dict(
+            AttendanceRecord.objects.filter(session=session, user_id__in=list(wanted))
+            .values_list('user_id', 'status')
+        )
+
+        by_status = defaultdict(list)
+        unchanged = 0
+        for uid, st in wanted.items():
+            if uid not in current:
+                conflicts.append({'user_id': uid, 'reason': 'not_in_session'})
+            elif current[uid] == st:
+                unchanged += 1
+            else:
+                by_status[st].append(uid)
+
+        now = timezone.now()
+        updated = 0
+        for st, user_ids in by_status.items():
+            updated += AttendanceRecord.objects.filter(session=session, user_id__in=user_ids).update(
+                status=st, marked_by=marked_by, timestamp=now,
+            )
+
+        if updated and session.status == 'FINALIZED':
+            changed = [uid for ids in by_status.values() for uid in ids]
+            _refresh_rollups(session, changed)
+
+        result = {'updated': updated, 'unchanged': unchanged, 'conflicts': conflicts, 'batch_id': batch_id}
+        if batch_id:
+            AttendanceBatch.objects.create(
+                session=session, batch_id=batch_id, payload_hash=payload_hash,
+                result=result, created_by=marked_by,
+            )
+    return {**result, 'replayed': False}
+
+
+def target_year_numbers(target_years):
+    """[2, '3rd Year'] -> [2, 3]. Raises TargetYearError naming the entries that don't parse."""
+    from users.models import MemberProfile
+
+    parsed = [(y, MemberProfile.parse_year(y)) for y in target_years or []]
+    invalid = [y for y, number in parsed if number is None]
+    if invalid:
+        raise TargetYearError(invalid)
+    return sorted({number for _, number in parsed})
+
+
+def eligible_users(session):
+    """
+    Active users matching the session's year and SIG filters, as a queryset
+    (not evaluated). Raises TargetYearError rather than dropping the year
+    filter when target_years can't be read.
+    """
+    from users.models import User, MemberProfile
+
+    qs = User.objects.filter(is_active=True)
+    years = target_year_numbers(session.target_years)
+    if years:
+        qs = qs.filter(profile__year_number__in=years)
+
+    if session.scope_type == 'SIG':
+        sig_ids = list(session.target_sigs.values_list('id', flat=True))
+        if sig_ids:
+            # Primary SIG or any of the extra SIGs; a subquery instead of a join keeps rows unique
+            in_sigs = MemberProfile.sigs.through.objects.filter(sig_id__in=sig_ids).values('memberprofile_id')
+            qs = qs.filter(Q(profile__primary_sig_id__in=sig_ids) | Q(profile__in=in_sigs))
+    return qs
+
+
+def populate_session(session, marked_by):
+    """Add an ABSENT record for every eligible user without one. Returns (added, total_eligible)."""
+    has_record = AttendanceRecord.objects.filter(session=session, user_id=OuterRef('pk'))
+    rows = eligible_users(session).annotate(has_record=Exists(has_record)).values_list('id', 'has_record')
+
+    total = 0
+    chunk = []
+    records = AttendanceRecord.objects.filter(session=session)
+    with transaction.atomic():
+        # Counted before and after: ignore_conflicts skips rows a concurrent
+        # populate or mark inserted, so len(chunk) would overcount
+        before = records.count()
+        for user_id, exists in rows.iterator(chunk_size=INSERT_CHUNK):
+            total += 1
+            if exists:
+                continue
+            chunk.append(AttendanceRecord(session=session, user_id=user_id, status='ABSENT', marked_by=marked_by))
+            if len(chunk) >= INSERT_CHUNK:
+                AttendanceRecord.objects.bulk_create(chunk, ignore_conflicts=True)
+                chunk = []
+        if chunk:
+            AttendanceRecord.objects.bulk_create(chunk, ignore_conflicts=True)
+        added = records.count() - before
+        if added and session.status == 'FINALIZED':
+            _refresh_rollups(session)
+    return added, total
+
+
+def _refresh_rollups(session, user_ids=None):
+    from .rollups import month_of, refresh_session, refresh_users
+    months = {month_of(session.date)}
+    if user_ids is None:
+        transaction.on_commit(lambda: refresh_session(session.pk, months))
+    else:
+        transaction.on_commit(lambda: refresh_users(user_ids, months))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendance_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancesession',
+            name='checkin_open_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendancesession',
+            name='checkin_period',
+            field=models.PositiveSmallIntegerField(default=30, help_text='Seconds each check-in code is valid for'),
+        ),
+    ]
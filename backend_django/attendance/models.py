@@ -26,6 +26,10 @@ class AttendanceSession(models.Model):
     target_years = models.JSONField(default=list, blank=True, help_text="List of years [1, 2, 3, 4] included. Empty = All.")
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
+
+    # Self check-in (attendance/checkin.py): open while checkin_open_until is in the future
+    checkin_open_until = models.DateTimeField(null=True, blank=True)
+    checkin_period = models.PositiveSmallIntegerField(default=30, help_text="Seconds each check-in code is valid for")
     
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -51,3 +55,54 @@ class AttendanceRecord(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.status} @ {self.session}"
+
+class AttendanceBatch(models.Model):
+    """A client-submitted batch_update, kept so retried submissions are applied once."""
+    session = models.ForeignKey(AttendanceSession, on_delete=models.CASCADE, related_name='batches')
+    batch_id = models.CharField(max_length=64)
+    payload_hash = models.CharField(max_length=64)
+    result = models.JSONField(default=dict)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('session', 'batch_id')
+
+    def __str__(self):
+        return f"Batch {self.batch_id} @ {self.session}"
+
+
+# --- Materialised attendance rollups (maintained by attendance/rollups.py) ---
+
+class AttendanceMonthlyRollup(models.Model):
+    """Per-member counts over FINALIZED sessions in one calendar month."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='attendance_rollups')
+    month = models.DateField(help_text="First day of the month")
+    sessions = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'month')
+        indexes = [models.Index(fields=['month'], name='attendance_rollup_month_idx')]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m}: {self.present}/{self.sessions}"
+
+class AttendanceMemberStats(models.Model):
+    """All-time totals and streaks per member over FINALIZED sessions."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='attendance_stats')
+    sessions = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    current_streak = models.PositiveIntegerField(default=0, help_text="Consecutive sessions attended, up to the latest")
+    longest_streak = models.PositiveIntegerField(default=0)
+    consecutive_absences = models.PositiveIntegerField(default=0, help_text="Unexcused absences since the last attended session")
+    last_session_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.present}/{self.sessions}"
@@ -0,0 +1,258 @@
+"""
+Attendance analytics over materialised rollups.
+
+Only FINALIZED sessions count. Two tables are maintained:
+
+- AttendanceMonthlyRollup: per member per month counts
+- AttendanceMemberStats: all-time totals plus streaks
+
+Refreshes are incremental: when a session is finalized, un-finalized,
+re-dated, deleted, or re-marked after finalizing, only the members on that
+session (and the affected months) are recomputed. Each refresh rebuilds
+those rows from the records, so it is idempotent and safe to re-run.
+`manage.py rebuild_attendance_rollups` recomputes everyone.
+
+Rates exclude excused sessions: present / (sessions - excused).
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import AttendanceRecord, AttendanceMonthlyRollup, AttendanceMemberStats
+
+FINALIZED = 'FINALIZED'
+COUNTS = ('sessions', 'present', 'excused', 'absent')
+
+
+def month_of(dt):
+    local = timezone.localtime(dt) if timezone.is_aware(dt) else dt
+    return date(local.year, local.month, 1)
+
+
+def rate(present, sessions, excused):
+    counted = sessions - excused
+    return round(present / counted, 4) if counted > 0 else None
+
+
+def _status_counts():
+    return {
+        'sessions': Count('id'),
+        'present': Count('id', filter=Q(status='PRESENT')),
+        'excused': Count('id', filter=Q(status='EXCUSED')),
+        'absent': Count('id', filter=Q(status='ABSENT')),
+    }
+
+
+# --- Refresh ---
+
+def refresh_users(user_ids, months=None):
+    """
+    Rebuild rollups for these members. `months` (first-of-month dates)
+    limits the monthly rebuild; None rebuilds every month.
+    """
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return
+    finalized = AttendanceRecord.objects.filter(session__status=FINALIZED, user_id__in=user_ids)
+
+    monthly = finalized
+    if months is not None:
+        months = set(months)
+        q_months = Q()
+        for m in months:
+            q_months |= Q(session__date__year=m.year, session__date__month=m.month)
+        monthly = monthly.filter(q_months)
+    monthly = (
+        monthly.annotate(month=TruncMonth('session__date', output_field=DateField()))
+        .values('user_id', 'month').annotate(**_status_counts()).order_by()
+    )
+
+    with transaction.atomic():
+        stale = AttendanceMonthlyRollup.objects.filter(user_id__in=user_ids)
+        if months is not None:
+            stale = stale.filter(month__in=months)
+        stale.delete()
+        AttendanceMonthlyRollup.objects.bulk_create(
+            [AttendanceMonthlyRollup(**row) for row in monthly], batch_size=1000,
+        )
+
+        # Totals come from the (small) monthly table, streaks from the ordered history
+        totals = {
+            row['user_id']: row for row in
+            AttendanceMonthlyRollup.objects.filter(user_id__in=user_ids)
+            .values('user_id').annotate(**{f: Sum(f) for f in COUNTS}).order_by()
+        }
+        streaks = _streaks(finalized)
+
+        AttendanceMemberStats.objects.filter(user_id__in=user_ids).delete()
+        AttendanceMemberStats.objects.bulk_create([
+            AttendanceMemberStats(
+                user_id=uid,
+                **{f: totals[uid][f] for f in COUNTS},
+                **streaks.get(uid, {}),
+            )
+            for uid in user_ids if uid in totals
+        ], batch_size=1000)
+
+
+def _streaks(records):
+    """Walk each member's history in session order. EXCUSED neither extends nor breaks a streak."""
+    result = {}
+    rows = records.order_by('user_id', 'session__date', 'session_id').values_list('user_id', 'status', 'session__date')
+    for uid, st, when in rows.iterator(chunk_size=5000):
+        s = result.setdefault(uid, {'current_streak': 0, 'longest_streak': 0, 'consecutive_absences': 0, 'last_session_at': None})
+        s['last_session_at'] = when
+        if st == 'PRESENT':
+            s['current_streak'] += 1
+            s['consecutive_absences'] = 0
+            s['longest_streak'] = max(s['longest_streak'], s['current_streak'])
+        elif st == 'ABSENT':
+            s['current_streak'] = 0
+            s['consecutive_absences'] += 1
+    return result
+
+
+def refresh_session(session_id, months):
+    user_ids = AttendanceRecord.objects.filter(session_id=session_id).values_list('user_id', flat=True)
+    refresh_users(user_ids, months)
+
+
+def rebuild_all():
+    AttendanceMonthlyRollup.objects.all().delete()
+    AttendanceMemberStats.objects.all().delete()
+    user_ids = (
+        AttendanceRecord.objects.filter(session__status=FINALIZED)
+        .values_list('user_id', flat=True).distinct().order_by('user_id')
+    )
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), 500):
+        refresh_users(user_ids[i:i + 500])
+    return len(user_ids)
+
+
+# --- Reads ---
+
+def sig_member_ids(sig_id):
+    """Profiles in a SIG, as primary SIG or one of the extra SIGs."""
+    from users.models import MemberProfile
+    through = MemberProfile.sigs.through.objects.filter(sig_id=sig_id).values('memberprofile_id')
+    return MemberProfile.objects.filter(Q(primary_sig_id=sig_id) | Q(id__in=through)).values('user_id')
+
+
+MEMBER_FIELDS = {
+    'full_name': 'user__profile__full_name',
+    'roll_number': 'user__profile__roll_number',
+    'year': 'user__profile__year_number',
+    'sig': 'user__profile__primary_sig__name',
+}
+
+
+def _member_row(row):
+    out = {'user_id': row['user_id']}
+    out.update({k: row[v] for k, v in MEMBER_FIELDS.items()})
+    out.update({f: row[f] for f in COUNTS})
+    out['rate'] = rate(row['present'], row['sessions'], row['excused'])
+    return out
+
+
+def member_rates(sig_id=None, year=None, since=None, until=None, user_id=None):
+    """
+    Per-member rates. Without a month range this reads AttendanceMemberStats
+    (one row per member, streaks included); with one it sums monthly rollups.
+    """
+    if since or until:
+        qs = AttendanceMonthlyRollup.objects.all()
+        if since:
+            qs = qs.filter(month__gte=since)
+        if until:
+            qs = qs.filter(month__lte=until)
+        qs = qs.values('user_id', *MEMBER_FIELDS.values()).annotate(**{f: Sum(f) for f in COUNTS}).order_by()
+        extra = ()
+    else:
+        extra = ('current_streak', 'longest_streak', 'consecutive_absences', 'last_session_at')
+        qs = AttendanceMemberStats.objects.values('user_id', *MEMBER_FIELDS.values(), *COUNTS, *extra)
+
+    if sig_id:
+        qs = qs.filter(user_id__in=sig_member_ids(sig_id))
+    if year:
+        qs = qs.filter(user__profile__year_number=year)
+    if user_id:
+        qs = qs.filter(user_id=user_id)
+
+    rows = []
+    for row in qs:
+        out = _member_row(row)
+        out.update({f: row[f] for f in extra})
+        rows.append(out)
+    rows.sort(key=lambda r: (r['rate'] is None, r['rate'] if r['rate'] is not None else 0))
+    return rows
+
+
+def sig_rates():
+    """Per-SIG totals over current SIG membership (primary or extra SIGs)."""
+    from users.models import Sig, MemberProfile
+
+    stats = {
+        row['user_id']: row for row in
+        AttendanceMemberStats.objects.values('user_id', *COUNTS)
+    }
+    members = {}  # sig_id -> set(user_id)
+    primary = MemberProfile.objects.filter(primary_sig__isnull=False).values_list('user_id', 'primary_sig_id')
+    extra = MemberProfile.sigs.through.objects.values_list('memberprofile__user_id', 'sig_id')
+    for pairs in (primary, extra):
+        for uid, sig_id in pairs:
+            if uid in stats:
+                members.setdefault(sig_id, set()).add(uid)
+
+    result = []
+    for sig_id, name in Sig.objects.order_by('order', 'name').values_list('id', 'name'):
+        uids = members.get(sig_id, ())
+        totals = {f: sum(stats[u][f] for u in uids) for f in COUNTS}
+        result.append({'sig_id': sig_id, 'sig': name, 'members': len(uids), **totals,
+                       'rate': rate(totals['present'], totals['sessions'], totals['excused'])})
+    return result
+
+
+def monthly_rates(user_id=None, sig_id=None, since=None, until=None):
+    qs = AttendanceMonthlyRollup.objects.all()
+    if user_id:
+        qs = qs.filter(user_id=user_id)
+    if sig_id:
+        qs = qs.filter(user_id__in=sig_member_ids(sig_id))
+    if since:
+        qs = qs.filter(month__gte=since)
+    if until:
+        qs = qs.filter(month__lte=until)
+    rows = qs.values('month').annotate(**{f: Sum(f) for f in COUNTS}, members=Count('user_id')).order_by('month')
+    return [{**row, 'rate': rate(row['present'], row['sessions'], row['excused'])} for row in rows]
+
+
+def at_risk(threshold=0.6, months=3, min_sessions=2, max_absences=3):
+    """
+    Members whose rate over the last `months` months is below `threshold`
+    (with at least `min_sessions` counted sessions), or who have missed
+    `max_absences` sessions in a row.
+    """
+    since = month_of(timezone.now() - timedelta(days=31 * (months - 1)))
+    recent = {row['user_id']: row for row in member_rates(since=since)}
+    absences = dict(AttendanceMemberStats.objects.values_list('user_id', 'consecutive_absences'))
+
+    flagged = []
+    for uid in set(recent) | {u for u, n in absences.items() if n >= max_absences}:
+        row = recent.get(uid)
+        reasons = []
+        if row and row['rate'] is not None and row['sessions'] - row['excused'] >= min_sessions and row['rate'] < threshold:
+            reasons.append('low_rate')
+        if absences.get(uid, 0) >= max_absences:
+            reasons.append('consecutive_absences')
+        if reasons:
+            flagged.append({**(row or {'user_id': uid}), 'consecutive_absences': absences.get(uid, 0), 'reasons': reasons})
+    if any('full_name' not in r for r in flagged):
+        # Streak-only members with no sessions in the window: fill in their details
+        details = {r['user_id']: r for r in member_rates()}
+        flagged = [{**details.get(f['user_id'], {}), **f} for f in flagged]
+    flagged.sort(key=lambda r: (r.get('rate') is None, r.get('rate') or 0, -r['consecutive_absences']))
+    return {'since': since, 'threshold': threshold, 'members': flagged}
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from django.db.models import Count, Q
 from .models import AttendanceSession, AttendanceRecord
+from .marking import TargetYearError, target_year_numbers
 from users.serializers import UserSerializer
 from users.models import User, MemberProfile
 
@@ -35,14 +37,21 @@ class AttendanceSessionSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'date', 'created_by', 
             'scope_type', 'target_sigs', 'target_sigs_ids', 'target_years', 
-            'status', 'created_at', 'stats'
+            'status', 'checkin_open_until', 'checkin_period', 'created_at', 'stats'
         ]
-        read_only_fields = ['created_by', 'created_at', 'stats', 'target_sigs']
+        read_only_fields = ['created_by', 'created_at', 'stats', 'target_sigs', 'checkin_open_until', 'checkin_period']
 
     def get_stats(self, obj):
-        total = obj.records.count()
-        present = obj.records.filter(status='PRESENT').count()
-        excused = obj.records.filter(status='EXCUSED').count()
+        if hasattr(obj, 'stats_total'):
+            # Annotated by AttendanceSessionViewSet.get_queryset
+            total, present, excused = obj.stats_total, obj.stats_present, obj.stats_excused
+        else:
+            counts = obj.records.aggregate(
+                total=Count('id'),
+                present=Count('id', filter=Q(status='PRESENT')),
+                excused=Count('id', filter=Q(status='EXCUSED')),
+            )
+            total, present, excused = counts['total'], counts['present'], counts['excused']
         absent = total - present - excused
         return {
             'total': total,
@@ -51,6 +60,15 @@ class AttendanceSessionSerializer(serializers.ModelSerializer):
             'excused': excused
         }
 
+    def validate_target_years(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Expected a list of years.")
+        try:
+            target_year_numbers(value)
+        except TargetYearError as e:
+            raise serializers.ValidationError(f"Unrecognised years: {e.args[0]}")
+        return value
+
     def create(self, validated_data):
         sig_ids = validated_data.pop('target_sigs_ids', [])
         session = AttendanceSession.objects.create(**validated_data)
@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import AttendanceSession
+from .rollups import FINALIZED, month_of, refresh_session, refresh_users
+
+# --- ROLLUP REFRESH (see attendance/rollups.py) ---
+
+@receiver(pre_save, sender=AttendanceSession)
+def remember_previous_state(sender, instance, **kwargs):
+    instance._rollup_prev = (
+        AttendanceSession.objects.filter(pk=instance.pk).values('status', 'date').first()
+        if instance.pk else None
+    )
+
+@receiver(post_save, sender=AttendanceSession)
+def refresh_on_finalize(sender, instance, created, **kwargs):
+    prev = getattr(instance, '_rollup_prev', None)
+    if created or not prev:
+        return
+    was_final, is_final = prev['status'] == FINALIZED, instance.status == FINALIZED
+    if not (was_final or is_final):
+        return
+    if was_final == is_final and prev['date'] == instance.date:
+        return
+    months = {month_of(prev['date']), month_of(instance.date)}
+    session_id = instance.pk
+    transaction.on_commit(lambda: refresh_session(session_id, months))
+
+@receiver(pre_delete, sender=AttendanceSession)
+def remember_members_on_delete(sender, instance, **kwargs):
+    if instance.status == FINALIZED:
+        instance._rollup_users = list(instance.records.values_list('user_id', flat=True))
+
+@receiver(post_delete, sender=AttendanceSession)
+def refresh_on_delete(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_rollup_users', None)
+    if user_ids:
+        months = {month_of(instance.date)}
+        transaction.on_commit(lambda: refresh_users(user_ids, months))
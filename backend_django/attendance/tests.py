@@ -1,3 +1,403 @@
-from django.test import TestCase
+from datetime import date, datetime
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.testing import IsolatedTestCase
+from users.models import MemberProfile, Role, Sig, User
+from users.tests import make_member
+from . import checkin
+from .models import AttendanceMemberStats, AttendanceMonthlyRollup, AttendanceRecord, AttendanceSession
+
+
+class BatchUpdateTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.session = AttendanceSession.objects.create(title='General Meeting', date=timezone.now(), status='OPEN')
+        self.members = [make_member(f'member{i}') for i in range(4)]
+        AttendanceRecord.objects.bulk_create(
+            AttendanceRecord(session=self.session, user=user, status='ABSENT') for user in self.members
+        )
+        self.url = f'/api/attendance/sessions/{self.session.pk}/batch_update/'
+
+    def post(self, updates, batch_id=None):
+        return self.client.post(self.url, {'updates': updates, 'batch_id': batch_id}, format='json')
+
+    def statuses(self):
+        return dict(self.session.records.values_list('user__username', 'status'))
+
+    def test_batch_is_one_update_per_status(self):
+        updates = [{'user_id': u.pk, 'status': 'PRESENT'} for u in self.members[:3]]
+        updates.append({'user_id': self.members[3].pk, 'status': 'EXCUSED'})
+        # session + target SIGs, savepoint, lock, current statuses, one UPDATE per status, release
+        with self.assertNumQueries(8):
+            result = self.post(updates).data
+        self.assertEqual((result['updated'], result['unchanged']), (4, 0))
+        self.assertEqual(self.statuses()['member3'], 'EXCUSED')
+
+        result = self.post(updates).data
+        self.assertEqual((result['updated'], result['unchanged']), (0, 4))
+
+    def test_invalid_entries_come_back_as_conflicts(self):
+        outsider = make_member('outsider')
+        result = self.post([
+            {'user_id': self.members[0].pk, 'status': 'LATE'},
+            {'user_id': 'abc', 'status': 'PRESENT'},
+            {'user_id': outsider.pk, 'status': 'PRESENT'},
+            'nonsense',
+            {'user_id': self.members[1].pk, 'status': 'PRESENT'},
+        ]).data
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(
+            sorted(c['reason'] for c in result['conflicts']),
+            ['invalid_status', 'invalid_user', 'malformed', 'not_in_session'],
+        )
+
+    def test_retried_batch_id_is_not_applied_twice(self):
+        updates = [{'user_id': self.members[0].pk, 'status': 'PRESENT'}]
+        first = self.post(updates, batch_id='phone-1').data
+        self.assertFalse(first['replayed'])
+
+        # Changed in between: a retry of the old batch must not undo it
+        self.post([{'user_id': self.members[0].pk, 'status': 'EXCUSED'}])
+        retry = self.post(updates, batch_id='phone-1').data
+        self.assertTrue(retry['replayed'])
+        self.assertEqual(retry['updated'], first['updated'])
+        self.assertEqual(self.statuses()['member0'], 'EXCUSED')
+
+        response = self.post([{'user_id': self.members[1].pk, 'status': 'PRESENT'}], batch_id='phone-1')
+        self.assertEqual(response.status_code, 409)
+
+
+class PopulateTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.robotics = Sig.objects.create(name='Robotics')
+        self.aero = Sig.objects.create(name='Aero')
+        self.session = AttendanceSession.objects.create(title='SIG meet', date=timezone.now(), scope_type='SIG', target_years=[2])
+        self.session.target_sigs.add(self.robotics)
+
+    def populate(self):
+        return self.client.post(f'/api/attendance/sessions/{self.session.pk}/populate/').data
+
+    def add_member(self, username, year='2nd Year', primary_sig='', extra_sig=None, active=True):
+        user = make_member(username, sig=extra_sig, year=year)
+        profile = user.profile
+        profile.sig = primary_sig  # save() resolves primary_sig from the name
+        profile.save()
+        if not active:
+            User.objects.filter(pk=user.pk).update(is_active=False)
+        return user
+
+    def test_roster_follows_year_and_sig_filters(self):
+        self.add_member('by_primary', primary_sig='ROBOTICS')
+        self.add_member('by_extra', primary_sig='Aero', extra_sig=self.robotics)
+        self.add_member('wrong_year', year='3rd Year', primary_sig='Robotics')
+        self.add_member('other_sig', primary_sig='Aero', extra_sig=self.aero)
+        self.add_member('inactive', primary_sig='Robotics', active=False)
+
+        self.assertEqual(self.populate(), {'added': 2, 'total_eligible': 2})
+        self.assertEqual(sorted(self.session.records.values_list('user__username', flat=True)), ['by_extra', 'by_primary'])
+        self.assertEqual(set(self.session.records.values_list('status', flat=True)), {'ABSENT'})
+
+    def test_repopulating_only_adds_newcomers(self):
+        first = self.add_member('first', primary_sig='Robotics')
+        self.populate()
+        AttendanceRecord.objects.filter(user=first).update(status='PRESENT')
+
+        self.add_member('second', extra_sig=self.robotics)
+        self.assertEqual(self.populate(), {'added': 1, 'total_eligible': 2})
+        self.assertEqual(dict(self.session.records.values_list('user__username', 'status')),
+                         {'first': 'PRESENT', 'second': 'ABSENT'})
+
+    def test_year_parsing_only_reads_a_standalone_year(self):
+        cases = {'2nd Year': 2, '3': 3, 'year 4': 4, '1ST': 1, '': None, '2023 batch': None, '10th sem': None, 'Alumni': None}
+        self.assertEqual({value: MemberProfile.parse_year(value) for value in cases}, cases)
+
+        self.add_member('batch', year='2023 batch', primary_sig='Robotics')
+        self.assertIsNone(MemberProfile.objects.get(user__username='batch').year_number)
+        self.assertEqual(self.populate(), {'added': 0, 'total_eligible': 0})
+
+    def test_free_text_target_years_are_parsed(self):
+        self.session.target_years = ['2nd', '4th Year']
+        self.session.save()
+        self.add_member('second', primary_sig='Robotics')
+        self.add_member('fourth', year='4', primary_sig='Robotics')
+        self.add_member('third', year='3rd Year', primary_sig='Robotics')
+        self.assertEqual(self.populate(), {'added': 2, 'total_eligible': 2})
+
+    def test_unreadable_target_years_are_rejected(self):
+        self.add_member('second', primary_sig='Robotics')
+        self.session.target_years = ['2nd', 'final']
+        self.session.save()
+        url = f'/api/attendance/sessions/{self.session.pk}'
+        self.assertEqual(self.client.post(f'{url}/populate/').status_code, 400)
+        self.assertEqual(self.client.post(f'{url}/open_checkin/').status_code, 400)
+        self.assertFalse(self.session.records.exists())
+
+        response = self.client.post('/api/attendance/sessions/', {
+            'title': 'Meet', 'date': timezone.now().isoformat(), 'scope_type': 'GLOBAL', 'target_years': ['2nd', 'final'],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('target_years', response.data)
+
+    def test_query_count_does_not_grow_with_members(self):
+        self.session.scope_type, self.session.target_years = 'GLOBAL', []
+        self.session.save()
+        for i in range(3):
+            self.add_member(f'member{i}')
+        # session + target SIGs, savepoint, count, eligible ids, one insert, count, release
+        with self.assertNumQueries(8):
+            self.assertEqual(self.populate()['added'], 4)
+        self.session.records.all().delete()
+        for i in range(3, 12):
+            self.add_member(f'member{i}')
+        with self.assertNumQueries(8):
+            self.assertEqual(self.populate()['added'], 13)
+
+
+class SessionStatsTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.sig = Sig.objects.create(name='Robotics')
+        self.members = [make_member(f'member{i}') for i in range(3)]
+
+    def add_sessions(self, count):
+        for _ in range(count):
+            session = AttendanceSession.objects.create(date=timezone.now(), scope_type='SIG')
+            session.target_sigs.add(self.sig)
+            AttendanceRecord.objects.bulk_create(
+                AttendanceRecord(session=session, user=user, status=st)
+                for user, st in zip(self.members, ('PRESENT', 'EXCUSED', 'ABSENT'))
+            )
+
+    def test_list_query_count_does_not_grow_with_sessions(self):
+        self.add_sessions(2)
+        with self.assertNumQueries(2):
+            self.client.get('/api/attendance/sessions/')
+
+        self.add_sessions(5)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/attendance/sessions/')
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(response.data[0]['stats'], {'total': 3, 'present': 1, 'absent': 1, 'excused': 1})
+
+
+class RollupTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.sig = Sig.objects.create(name='Robotics')
+        self.alice = make_member('alice', sig=self.sig)
+        self.bob = make_member('bob')
+        self.sessions = []
+        history = {self.alice: ('PRESENT', 'PRESENT', 'ABSENT'), self.bob: ('ABSENT', 'EXCUSED', 'ABSENT')}
+        for day in range(3):
+            session = AttendanceSession.objects.create(date=timezone.make_aware(datetime(2026, 3, 2 + day, 18)))
+            for user, statuses in history.items():
+                AttendanceRecord.objects.create(session=session, user=user, status=statuses[day])
+            self.sessions.append(session)
+
+    def finalize(self, session, status='FINALIZED'):
+        session.status = status
+        with self.captureOnCommitCallbacks(execute=True):
+            session.save()
+
+    def stats(self, user):
+        return AttendanceMemberStats.objects.filter(user=user).values(
+            'sessions', 'present', 'excused', 'current_streak', 'longest_streak', 'consecutive_absences',
+        ).first()
+
+    def test_finalizing_refreshes_only_that_session(self):
+        self.assertIsNone(self.stats(self.alice))
+        self.finalize(self.sessions[0])
+        self.assertEqual(self.stats(self.alice)['present'], 1)
+
+        for session in self.sessions[1:]:
+            self.finalize(session)
+        self.assertEqual(self.stats(self.alice), {
+            'sessions': 3, 'present': 2, 'excused': 0,
+            'current_streak': 0, 'longest_streak': 2, 'consecutive_absences': 1,
+        })
+        self.assertEqual(self.stats(self.bob)['consecutive_absences'], 2)  # EXCUSED doesn't reset it
+        self.assertEqual(AttendanceMonthlyRollup.objects.get(user=self.alice).month, date(2026, 3, 1))
+
+        self.finalize(self.sessions[2], status='OPEN')
+        self.assertEqual(self.stats(self.alice)['current_streak'], 2)
+
+    def test_remarking_a_finalized_session_refreshes(self):
+        self.finalize(self.sessions[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/attendance/sessions/{self.sessions[2].pk}/batch_update/',
+                             {'updates': [{'user_id': self.alice.pk, 'status': 'PRESENT'}]}, format='json')
+        self.assertEqual(self.stats(self.alice)['present'], 1)
+
+    def test_analytics_endpoints_and_rebuild_agree(self):
+        for session in self.sessions:
+            self.finalize(session)
+        members = self.client.get('/api/attendance/analytics/members/').data
+        self.assertEqual([(m['full_name'], m['rate']) for m in members], [('Bob', 0.0), ('Alice', 0.6667)])
+        sig_members = self.client.get('/api/attendance/analytics/members/', {'sig': self.sig.pk}).data
+        self.assertEqual([m['full_name'] for m in sig_members], ['Alice'])
+
+        monthly = self.client.get('/api/attendance/analytics/monthly/', {'since': '2026-03'}).data
+        self.assertEqual([(m['month'], m['sessions'], m['members']) for m in monthly], [(date(2026, 3, 1), 6, 2)])
+        self.assertEqual(self.client.get('/api/attendance/analytics/monthly/', {'since': 'March'}).status_code, 400)
+
+        risk = self.client.get('/api/attendance/analytics/at_risk/', {'absences': 2}).data['members']
+        self.assertEqual([(r['full_name'], r['reasons']) for r in risk], [('Bob', ['consecutive_absences'])])
+
+        before = list(AttendanceMemberStats.objects.order_by('user_id').values('user_id', 'present', 'longest_streak'))
+        call_command('rebuild_attendance_rollups', stdout=StringIO())
+        after = list(AttendanceMemberStats.objects.order_by('user_id').values('user_id', 'present', 'longest_streak'))
+        self.assertEqual(before, after)
+
+
+class SessionRecordsTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.sig = Sig.objects.create(name='Robotics')
+        self.session = AttendanceSession.objects.create(date=timezone.now())
+        people = [
+            ('dana', '2nd Year', 'CS21B001', 'PRESENT', self.sig),
+            ('carl', '3rd Year', 'ME20B002', 'ABSENT', None),
+            ('bea', '2nd Year', 'CS21B003', 'EXCUSED', None),
+            ('abe', '1st Year', 'EE22B004', 'ABSENT', self.sig),
+        ]
+        for username, year, roll, st, sig in people:
+            user = make_member(username, sig=sig, year=year, roll_number=roll)
+            AttendanceRecord.objects.create(session=self.session, user=user, status=st)
+        self.url = f'/api/attendance/sessions/{self.session.pk}/records/'
+
+    def names(self, rows):
+        return [row['full_name'] for row in rows]
+
+    def test_rows_are_compact_and_ordered_by_name(self):
+        with self.assertNumQueries(3):  # session, target SIGs, rows
+            rows = self.client.get(self.url).data
+        self.assertEqual(self.names(rows), ['Abe', 'Bea', 'Carl', 'Dana'])
+        self.assertEqual(set(rows[0]), {'id', 'user_id', 'status', 'full_name', 'roll_number', 'username', 'sig', 'year'})
+        self.assertEqual(rows[0]['year'], 1)
+
+    def test_filters_and_search(self):
+        get = lambda **params: self.names(self.client.get(self.url, params).data)
+        self.assertEqual(get(status='ABSENT,EXCUSED'), ['Abe', 'Bea', 'Carl'])
+        self.assertEqual(get(sig=self.sig.pk), ['Abe', 'Dana'])
+        self.assertEqual(get(year=2, status='PRESENT'), ['Dana'])
+        self.assertEqual(get(search='cs21'), ['Bea', 'Dana'])
+        self.assertEqual(self.client.get(self.url, {'status': 'LATE'}).status_code, 400)
+
+    def test_cursor_pages_and_columnar_layout(self):
+        page = self.client.get(self.url, {'page_size': 3, 'layout': 'columnar'}).data
+        self.assertEqual(page['count'], 3)
+        self.assertEqual(page['columns']['username'], ['abe', 'bea', 'carl'])
+        rest = self.client.get(page['next']).data
+        self.assertEqual(rest['columns']['username'], ['dana'])
+        self.assertIsNone(rest['next'])
+
+
+class CheckinCodeTests(IsolatedTestCase):
+    def test_code_rotates_and_accepts_the_previous_window(self):
+        code, expires_in = checkin.current_code(1, 30, now=3000)
+        self.assertEqual((len(code), expires_in), (6, 30))
+        self.assertNotEqual(code, checkin.current_code(2, 30, now=3000)[0])
+        self.assertTrue(checkin.verify_code(1, 30, code, now=3029))
+        self.assertTrue(checkin.verify_code(1, 30, code, now=3059))
+        self.assertFalse(checkin.verify_code(1, 30, code, now=3060))
+        self.assertFalse(checkin.verify_code(2, 30, code, now=3000))
+
+
+class SelfCheckinTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.member = make_member('member')
+        self.excused = make_member('excused')
+        self.session = AttendanceSession.objects.create(date=timezone.now(), scope_type='SIG')
+        for user in (self.member, self.excused):
+            AttendanceRecord.objects.create(session=self.session, user=user)
+        self.session.records.filter(user=self.excused).update(status='EXCUSED')
+
+        manager = APIClient()
+        manager.force_authenticate(self.admin)
+        self.code = manager.post(f'/api/attendance/sessions/{self.session.pk}/open_checkin/', {'period': 30}).data['code']
+        self.addCleanup(checkin.invalidate, self.session.pk)
+
+    def scan(self, user, code=None):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client.post('/api/attendance/checkin/', {'session': self.session.pk, 'code': code or self.code})
+
+    def status_of(self, user):
+        return self.session.records.get(user=user).status
+
+    def test_check_in_marks_absent_members_present_only(self):
+        response = self.scan(self.member)
+        self.assertEqual((response.status_code, response.data['status']), (200, 'checked_in'))
+        self.assertEqual(self.status_of(self.member), 'PRESENT')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.scan(self.member).data['status'], 'already_checked_in')
+
+        self.scan(self.excused)
+        self.assertEqual(self.status_of(self.excused), 'EXCUSED')
+
+    def test_refusals(self):
+        self.assertEqual(self.scan(make_member('outsider')).status_code, 403)
+        wrong = str((int(self.code) + 1) % 10 ** checkin.CODE_DIGITS).zfill(checkin.CODE_DIGITS)
+        for _ in range(checkin.MAX_FAILED_ATTEMPTS):
+            self.assertEqual(self.scan(self.member, code=wrong).status_code, 400)
+        # The counter is in the shared cache, not this process
+        checkin.invalidate(self.session.pk)
+        self.assertEqual(self.scan(self.member).status_code, 429)
+
+        checkin.close_checkin(self.session)
+        self.assertEqual(self.scan(self.excused).status_code, 409)
+
+    def test_failed_write_is_spooled_then_replayed(self):
+        failing = mock.patch.object(checkin.buffer, 'write_batch', side_effect=RuntimeError('db down'))
+        with failing, self.assertLogs('core.buffering', 'ERROR'):
+            self.assertEqual(self.scan(self.member).status_code, 200)
+        self.assertEqual(self.status_of(self.member), 'ABSENT')
+
+        self.session.records.filter(user=self.excused).update(status='ABSENT')
+        checkin.invalidate(self.session.pk)
+        self.scan(self.excused)
+        self.assertEqual((self.status_of(self.member), self.status_of(self.excused)), ('PRESENT', 'PRESENT'))
+
+    def test_check_in_is_refused_when_it_cannot_be_kept(self):
+        failing = mock.patch.object(checkin.buffer, 'write_batch', side_effect=RuntimeError('db down'))
+        unwritable = mock.patch.object(checkin.buffer, '_spool_path', return_value=Path('/nonexistent/spool.jsonl'))
+        with failing, unwritable, self.assertLogs('core.buffering', 'ERROR'):
+            self.assertEqual(self.scan(self.member).status_code, 503)
+        # Not remembered as present, so scanning again works
+        self.assertEqual(self.scan(self.member).data['status'], 'checked_in')
+
+    def test_buffer_stats_are_for_event_managers(self):
+        url = '/api/attendance/sessions/checkin_stats/'
+        client = APIClient()
+        client.force_authenticate(self.member)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        client.force_authenticate(make_member('manager', role=Role.objects.create(name='Events', can_manage_events=True)))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('buffered', response.data)
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AttendanceSessionViewSet, AttendanceRecordViewSet
+from .views import AttendanceSessionViewSet, AttendanceRecordViewSet, AttendanceAnalyticsViewSet, SelfCheckinView
 
 router = DefaultRouter()
 router.register(r'sessions', AttendanceSessionViewSet)
 router.register(r'records', AttendanceRecordViewSet)
+router.register(r'analytics', AttendanceAnalyticsViewSet, basename='attendance-analytics')
 
 urlpatterns = [
+    path('checkin/', SelfCheckinView.as_view(), name='attendance-self-checkin'),
     path('', include(router.urls)),
 ]
@@ -1,17 +1,41 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import AttendanceSession, AttendanceRecord
 from .serializers import AttendanceSessionSerializer, AttendanceRecordSerializer
-from users.permissions import GlobalPermission
-from users.models import User
+from .marking import apply_batch, populate_session, BatchReuseError, TargetYearError, VALID_STATUSES
+from . import checkin, rollups
+from users.permissions import GlobalPermission, get_permission_set
+from core.pagination import OptionalCursorPagination
+
+RECORD_FIELDS = ('id', 'user_id', 'status', 'full_name', 'roll_number', 'username', 'sig', 'year')
+
+
+class SessionRecordPagination(OptionalCursorPagination):
+    page_size = 100
+    max_page_size = 500
+    ordering = ('full_name', 'id')
+
 
 class AttendanceSessionViewSet(viewsets.ModelViewSet):
     queryset = AttendanceSession.objects.all().order_by('-date')
     serializer_class = AttendanceSessionSerializer
     permission_classes = [GlobalPermission]
 
+    def get_queryset(self):
+        # Stats in the same query as the sessions (read by AttendanceSessionSerializer.get_stats)
+        return super().get_queryset().prefetch_related('target_sigs').annotate(
+            stats_total=Count('records'),
+            stats_present=Count('records', filter=Q(records__status='PRESENT')),
+            stats_excused=Count('records', filter=Q(records__status='EXCUSED')),
+        )
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -22,74 +46,167 @@ class AttendanceSessionViewSet(viewsets.ModelViewSet):
         Only valid if status is DRAFT or OPEN.
         """
         session = self.get_object()
-        
-        # 1. Base Query
-        # Active users only? Maybe yes.
-        qs = User.objects.filter(is_active=True).select_related('profile')
-
-        # 2. Filter by Year
-        if session.target_years:
-            # target_years is list of ints e.g. [2, 3]
-            # Profile year is a string "2nd Year", "3rd Year" or int field?
-            # MemberProfile.year is CharField ("2nd Year"). MemberProfile.year_of_joining is int.
-            # Usually strict parsing is hard. Let's assume frontend sends "2", "3" and we match against year string OR calculated year.
-            # Simplified: Let's rely on MemberProfile.year containing the digit.
-            q_years = Q()
-            for y in session.target_years:
-                q_years |= Q(profile__year__icontains=str(y))
-            qs = qs.filter(q_years)
-
-        # 3. Filter by SIG/Scope
-        if session.scope_type == 'SIG':
-            sig_names = list(session.target_sigs.values_list('name', flat=True))
-            if sig_names:
-                # Users who have this SIG as 'sig' field OR in 'sigs' M2M
-                qs = qs.filter(Q(profile__sig__in=sig_names) | Q(profile__sigs__name__in=sig_names)).distinct()
-        
-        # Exclude users who already have a record
-        existing_ids = session.records.values_list('user_id', flat=True)
-        users_to_add = qs.exclude(id__in=existing_ids)
-
-        new_records = []
-        for u in users_to_add:
-            new_records.append(AttendanceRecord(
-                session=session,
-                user=u,
-                status='ABSENT', # Default
-                marked_by=request.user
-            ))
-        
-        AttendanceRecord.objects.bulk_create(new_records)
-        
+        try:
+            added, total_eligible = populate_session(session, request.user)
+        except TargetYearError as e:
+            return Response({'error': f"Unrecognised target years: {e.args[0]}"}, status=status.HTTP_400_BAD_REQUEST)
         return Response({
-            'added': len(new_records), 
-            'total_eligible': qs.count()
+            'added': added, 
+            'total_eligible': total_eligible
         })
 
     @action(detail=True, methods=['get'])
     def records(self, request, pk=None):
-        """Get all records for a session"""
+        """
+        Compact record rows for a session, ordered by name.
+        Filters: ?status=PRESENT,ABSENT  ?sig=<id>  ?year=<n>  ?search=<name / roll no / username>
+        ?page_size= / ?cursor= paginate; ?layout=columnar returns one array per field.
+        """
         session = self.get_object()
-        records = session.records.select_related('user__profile').all().order_by('user__profile__full_name')
-        return Response(AttendanceRecordSerializer(records, many=True).data)
+        params = request.query_params
+
+        rows = session.records.values(
+            'id', 'user_id', 'status',
+            full_name=Coalesce('user__profile__full_name', Value('')),
+            roll_number=Coalesce('user__profile__roll_number', Value('')),
+            username=F('user__username'),
+            sig=Coalesce('user__profile__sig', Value('')),
+            year=F('user__profile__year_number'),
+        )
+
+        statuses = [st for st in params.get('status', '').split(',') if st]
+        if statuses:
+            if not set(statuses) <= VALID_STATUSES:
+                return Response({'error': f"status must be one of {sorted(VALID_STATUSES)}"}, status=status.HTTP_400_BAD_REQUEST)
+            rows = rows.filter(status__in=statuses)
+        if params.get('sig', '').isdigit():
+            rows = rows.filter(user_id__in=rollups.sig_member_ids(int(params['sig'])))
+        if params.get('year', '').isdigit():
+            rows = rows.filter(user__profile__year_number=int(params['year']))
+        search = params.get('search', '').strip()
+        if search:
+            rows = rows.filter(
+                Q(user__profile__full_name__icontains=search)
+                | Q(user__profile__roll_number__icontains=search)
+                | Q(user__username__icontains=search)
+            )
+
+        paginator = SessionRecordPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        data = list(page if page is not None else rows.order_by(*paginator.ordering))
+
+        if params.get('layout') == 'columnar':
+            fields = RECORD_FIELDS
+            body = {'count': len(data), 'columns': {f: [row[f] for row in data] for f in fields}}
+            if page is not None:
+                body.update(next=paginator.get_next_link(), previous=paginator.get_previous_link())
+            return Response(body)
+        if page is not None:
+            return paginator.get_paginated_response(data)
+        return Response(data)
 
     @action(detail=True, methods=['post'])
     def batch_update(self, request, pk=None):
         """
         Update multiple records at once.
-        Body: { "updates": [ {"user_id": 1, "status": "PRESENT"}, ... ] }
+        Body: { "batch_id": "<optional client id>", "updates": [ {"user_id": 1, "status": "PRESENT"}, ... ] }
+        Retrying with the same batch_id returns the first result without re-applying it.
         """
         session = self.get_object()
         updates = request.data.get('updates', [])
-        
-        count = 0
-        for item in updates:
-            uid = item.get('user_id')
-            st = item.get('status')
-            if uid and st:
-                AttendanceRecord.objects.filter(session=session, user_id=uid).update(status=st, marked_by=request.user)
-                count += 1
-        return Response({'updated': count})
+        if not isinstance(updates, list):
+            return Response({'error': 'updates must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        batch_id = request.data.get('batch_id') or None
+        if batch_id is not None and (not isinstance(batch_id, str) or len(batch_id) > 64):
+            return Response({'error': 'batch_id must be a string of at most 64 characters'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = apply_batch(session, updates, request.user, batch_id=batch_id)
+        except BatchReuseError:
+            return Response({'error': 'batch_id was already used for different updates'}, status=status.HTTP_409_CONFLICT)
+        return Response(result)
+
+    @action(detail=True, methods=['post'])
+    def open_checkin(self, request, pk=None):
+        """
+        Let members check themselves in with the rotating code.
+        Body: { "minutes": 15, "period": 30 }  (period = seconds per code)
+        """
+        session = self.get_object()
+        if session.status == 'FINALIZED':
+            return Response({'error': 'Session is finalized'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            minutes = int(request.data.get('minutes', 15))
+            period = int(request.data.get('period', 30))
+        except (TypeError, ValueError):
+            return Response({'error': 'minutes and period must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (1 <= minutes <= 240 and 10 <= period <= 300):
+            return Response({'error': 'minutes must be 1-240 and period 10-300'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            checkin.open_checkin(session, request.user, minutes=minutes, period=period)
+        except TargetYearError as e:
+            return Response({'error': f"Unrecognised target years: {e.args[0]}"}, status=status.HTTP_400_BAD_REQUEST)
+        return self.checkin_code(request, pk)
+
+    @action(detail=True, methods=['post'])
+    def close_checkin(self, request, pk=None):
+        session = self.get_object()
+        checkin.close_checkin(session)
+        return Response({'checkin_open_until': session.checkin_open_until})
+
+    # POST so it goes through the can_manage_events check; reads are open to every member
+    @action(detail=True, methods=['post'])
+    def checkin_code(self, request, pk=None):
+        """Current code for the screen/QR, and how many seconds until it rotates."""
+        session = self.get_object()
+        if not session.checkin_open_until or session.checkin_open_until <= timezone.now():
+            return Response({'error': 'Check-in is not open'}, status=status.HTTP_400_BAD_REQUEST)
+        code, expires_in = checkin.current_code(session.pk, session.checkin_period)
+        return Response({
+            'session': session.pk,
+            'code': code,
+            'expires_in': expires_in,
+            'period': session.checkin_period,
+            'checkin_open_until': session.checkin_open_until,
+        })
+
+    @action(detail=False, methods=['get'])
+    def checkin_stats(self, request):
+        if not (request.user.is_superuser or get_permission_set(request.user).has('can_manage_events')):
+            return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(checkin.buffer.stats())
+
+
+class SelfCheckinView(APIView):
+    """
+    Member self check-in. Body: { "session": <id>, "code": "123456" }
+    Authenticated from the token claims alone (no user lookup) and verified
+    against in-process state; the only write is the batched check-in itself.
+    """
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    ERRORS = {
+        'closed': (status.HTTP_409_CONFLICT, 'Check-in is not open for this session'),
+        'not_on_roster': (status.HTTP_403_FORBIDDEN, 'You are not on this session\'s list'),
+        'too_many_attempts': (status.HTTP_429_TOO_MANY_REQUESTS, 'Too many wrong codes, ask a coordinator to mark you'),
+        'invalid_code': (status.HTTP_400_BAD_REQUEST, 'Invalid or expired code'),
+        'unavailable': (status.HTTP_503_SERVICE_UNAVAILABLE, 'Could not record your check-in, please scan again'),
+    }
+
+    def post(self, request):
+        try:
+            session_id = int(request.data.get('session'))
+        except (TypeError, ValueError):
+            return Response({'error': 'session is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = checkin.check_in(session_id, int(request.user.id), request.data.get('code'))
+        except checkin.CheckinError as e:
+            code, message = self.ERRORS[e.reason]
+            return Response({'error': message, 'reason': e.reason}, status=code)
+        return Response({'status': result})
 
 class AttendanceRecordViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -105,3 +222,63 @@ class AttendanceRecordViewSet(viewsets.ReadOnlyModelViewSet):
         if user_id:
             qs = qs.filter(user_id=user_id)
         return qs.order_by('-session__date')
+
+
+class AttendanceAnalyticsViewSet(viewsets.ViewSet):
+    """
+    Attendance rates over FINALIZED sessions, served from the rollup tables
+    (attendance/rollups.py). Month filters take ?since=YYYY-MM&until=YYYY-MM.
+    """
+    permission_classes = [GlobalPermission]
+
+    def _int(self, name):
+        value = self.request.query_params.get(name, '')
+        return int(value) if value.isdigit() else None
+
+    def _month(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_date(f"{value}-01") if len(value) == 7 else parse_date(value)
+        if parsed is None:
+            raise ValueError(f"Invalid '{name}' month: {value}")
+        return parsed.replace(day=1)
+
+    def _respond(self, fn):
+        try:
+            return Response(fn())
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'])
+    def members(self, request):
+        """Per-member rate and streaks. Filters: ?sig=, ?year=, ?user_id=, ?since=, ?until="""
+        return self._respond(lambda: rollups.member_rates(
+            sig_id=self._int('sig'), year=self._int('year'), user_id=self._int('user_id'),
+            since=self._month('since'), until=self._month('until'),
+        ))
+
+    @action(detail=False, methods=['get'])
+    def sigs(self, request):
+        return Response(rollups.sig_rates())
+
+    @action(detail=False, methods=['get'])
+    def monthly(self, request):
+        """Month-by-month rates, overall or for ?user_id= / ?sig="""
+        return self._respond(lambda: rollups.monthly_rates(
+            user_id=self._int('user_id'), sig_id=self._int('sig'),
+            since=self._month('since'), until=self._month('until'),
+        ))
+
+    @action(detail=False, methods=['get'])
+    def at_risk(self, request):
+        """?threshold=0.6&months=3&min_sessions=2&absences=3"""
+        def run():
+            threshold = float(request.query_params.get('threshold', 0.6))
+            return rollups.at_risk(
+                threshold=threshold,
+                months=self._int('months') or 3,
+                min_sessions=self._int('min_sessions') or 2,
+                max_absences=self._int('absences') or 3,
+            )
+        return self._respond(run)
@@ -2,6 +2,9 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the app through this entry point (e.g. uvicorn workers) for the
+project event stream at /api/projects/<id>/stream/; under WSGI that view
+answers 503 and clients keep polling.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
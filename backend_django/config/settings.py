@@ -201,6 +201,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # Proxies in front of Django (nginx: 1). Client IPs for rate limits are
+    # taken from the X-Forwarded-For entry the outermost proxy added, never
+    # from what the client sent; 0 uses REMOTE_ADDR (no proxy).
+    'NUM_PROXIES': config('NUM_PROXIES', default=1, cast=int),
 }
 
 from datetime import timedelta
@@ -213,6 +217,78 @@ SIMPLE_JWT = {
 }
 
 
+# ======================
+# CACHE
+# ======================
+
+# Shared by every worker on the host (version counters, permission sets,
+# quiz payloads, typing indicators, cached public pages). The default file
+# backend needs no server; `redis` / `memcached` can point CACHE_LOCATION
+# at a local socket (unix:///run/redis/redis.sock, unix:/run/memcached.sock)
+# once redis-py / pymemcache is installed. `locmem` is per process.
+CACHE_BACKENDS = {
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'django_cache') if CACHE_BACKEND == 'file' else ''),
+        # Namespaces keys when several deployments share one cache server
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='robotech'),
+        # Bump to discard every cached entry (e.g. after a deploy changing cached shapes)
+        'VERSION': config('CACHE_VERSION', default=1, cast=int),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 20000} if CACHE_BACKEND in ('file', 'locmem') else {},
+    }
+}
+
+# Upper bound on staleness of @cached_response pages (core/caching.py)
+# for writes that bypass model signals
+CACHE_RESPONSE_TIMEOUT = config('CACHE_RESPONSE_TIMEOUT', default=300, cast=int)
+
+
+# ======================
+# REALTIME (project SSE stream)
+# ======================
+
+# In-process pub/sub: events only reach clients connected to the same
+# server process. Swap for a shared broker before running several workers.
+REALTIME_BROKER = config('REALTIME_BROKER', default='projects.realtime.InProcessBroker')
+
+
+# ======================
+# AUDIT LOG
+# ======================
+
+# Audit events are buffered and bulk-written by a background thread
+# (users/audit.py). Failed flushes go to the spool file and are replayed.
+AUDIT_LOG_ASYNC = config('AUDIT_LOG_ASYNC', default=True, cast=bool)
+AUDIT_LOG_FLUSH_SIZE = 200
+AUDIT_LOG_FLUSH_INTERVAL = 2.0  # seconds
+AUDIT_LOG_MAX_BUFFER = 10000
+AUDIT_LOG_SPOOL_PATH = config('AUDIT_LOG_SPOOL_PATH', default=str(BASE_DIR / 'audit_spool.jsonl'))
+
+# Window kept by `manage.py prune_audit_logs` (schedule it, e.g. nightly cron)
+AUDIT_LOG_RETENTION_DAYS = config('AUDIT_LOG_RETENTION_DAYS', default=365, cast=int)
+
+
+# ======================
+# ATTENDANCE SELF CHECK-IN
+# ======================
+
+# Check-ins are buffered and written as one UPDATE per session (attendance/checkin.py).
+# Failed writes go to the spool file and are replayed.
+ATTENDANCE_CHECKIN_ASYNC = config('ATTENDANCE_CHECKIN_ASYNC', default=True, cast=bool)
+ATTENDANCE_CHECKIN_FLUSH_INTERVAL = 1.0  # seconds
+ATTENDANCE_CHECKIN_FLUSH_SIZE = 500
+ATTENDANCE_CHECKIN_SPOOL_PATH = config('ATTENDANCE_CHECKIN_SPOOL_PATH', default=str(BASE_DIR / 'checkin_spool.jsonl'))
+
+
 # ======================
 # LOGGING (optional but helpful)
 # ======================
@@ -0,0 +1,224 @@
+"""
+Buffered background writer.
+
+Subclasses batch items produced by request threads and write them from a
+background thread, either once PREFIX_FLUSH_SIZE items are pending or
+every PREFIX_FLUSH_INTERVAL seconds, whichever comes first. They implement
+write_batch(items), which raises on failure, and encode() / decode() to
+turn an item into JSON and back.
+
+A batch that fails to write, or a buffer that outgrows PREFIX_MAX_BUFFER
+because the database is not keeping up, goes to an append-only JSON-lines
+spool file (PREFIX_SPOOL_PATH). The spool is replayed on the next
+successful flush. Items are only dropped when even the spool write fails.
+
+add(item, wait=True) blocks until the item's batch is in the database or
+the spool, so a caller can acknowledge it knowing a restart won't lose it;
+batching still applies, as every request waiting on the same flush shares
+one write. An atexit hook flushes what is left on shutdown. With
+PREFIX_ASYNC = False each add() writes immediately (tests, one-off scripts).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+WAIT_TIMEOUT = 10  # seconds
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.done = threading.Event()
+        self.durable = False
+
+    def finish(self, durable):
+        self.durable = durable
+        self.done.set()
+
+
+class BufferedWriter:
+    setting_prefix = None  # e.g. 'AUDIT_LOG' reads AUDIT_LOG_FLUSH_SIZE, ...
+    thread_name = 'buffered-writer'
+    flush_size = 200
+    flush_interval = 2.0
+    max_buffer = 10000
+    spool_name = 'spool.jsonl'
+    extra_counters = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._batch = _Batch()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self.counters = dict.fromkeys(
+            ('recorded', 'flushed', 'spooled', 'replayed', 'dropped', 'failed_flushes', *self.extra_counters), 0,
+        )
+
+    def setting(self, name, default):
+        return getattr(settings, f'{self.setting_prefix}_{name}', default)
+
+    # -- to implement --
+
+    def write_batch(self, items):
+        raise NotImplementedError
+
+    def encode(self, item):
+        return item
+
+    def decode(self, data):
+        return data
+
+    # -- producer side (request threads) --
+
+    def add(self, item, wait=False):
+        """
+        Queue an item. With wait=True, return whether it reached the
+        database or the spool (False if it was dropped or timed out).
+        """
+        if not self.setting('ASYNC', True):
+            self._count('recorded')
+            with self._flush_lock:
+                written = self._insert([item])
+                if written and self._spool_path().exists():
+                    self._replay_spool()
+            return written or self._spool([item])
+
+        self._ensure_thread()
+        overflow = None
+        with self._lock:
+            self.counters['recorded'] += 1
+            batch = self._batch
+            batch.items.append(item)
+            size = len(batch.items)
+            if size > self.setting('MAX_BUFFER', self.max_buffer):
+                # Flusher is falling behind: spill rather than grow or block
+                overflow, self._batch = batch, _Batch()
+        if overflow:
+            overflow.finish(self._spool(overflow.items))
+        elif size >= self.setting('FLUSH_SIZE', self.flush_size) or wait:
+            self._wake.set()
+        if wait:
+            return batch.done.wait(WAIT_TIMEOUT) and batch.durable
+        return True
+
+    # -- consumer side (background thread) --
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            if self._pid is not None and self._pid != pid:
+                # Forked worker: the parent's buffer and thread are not ours
+                self._batch = _Batch()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = self.setting('FLUSH_INTERVAL', self.flush_interval)
+        while not self._stopping:
+            self._wake.wait(interval)
+            self._wake.clear()
+            self.flush()
+        connection.close()
+
+    def flush(self):
+        """Write everything buffered so far. Safe to call from any thread."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._batch = self._batch, _Batch()
+            written = self._insert(batch.items) if batch.items else True
+            batch.finish(written or self._spool(batch.items))
+            if written and self._spool_path().exists():
+                self._replay_spool()
+
+    def _insert(self, items):
+        """Write items to the database; False if that failed."""
+        try:
+            self.write_batch(items)
+        except Exception:
+            logger.exception("%s flush failed for %d items", self.thread_name, len(items))
+            self._count('failed_flushes')
+            if threading.current_thread() is self._thread:
+                # Drop the broken connection so the next flush reconnects
+                connection.close()
+            return False
+        self._count('flushed', len(items))
+        return True
+
+    # -- spool file --
+
+    def _spool_path(self):
+        return Path(self.setting('SPOOL_PATH', settings.BASE_DIR / self.spool_name))
+
+    def _spool(self, items):
+        lines = ''.join(json.dumps(self.encode(item), cls=DjangoJSONEncoder) + '\n' for item in items)
+        try:
+            with open(self._spool_path(), 'a', encoding='utf-8') as fh:
+                fh.write(lines)
+        except OSError:
+            logger.exception("%s spool write failed, dropping %d items", self.thread_name, len(items))
+            self._count('dropped', len(items))
+            return False
+        self._count('spooled', len(items))
+        return True
+
+    def _replay_spool(self):
+        path = self._spool_path()
+        # Claim the file first so concurrent appends land in a fresh spool
+        claimed = path.with_name(f'{path.name}.replay-{os.getpid()}-{int(time.time() * 1000)}')
+        try:
+            os.replace(path, claimed)
+        except FileNotFoundError:
+            return
+
+        items = []
+        with open(claimed, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    items.append(self.decode(json.loads(line)))
+                except (ValueError, KeyError, TypeError):
+                    self._count('dropped')
+
+        if items:
+            if self._insert(items):
+                self._count('replayed', len(items))
+            else:
+                self._spool(items)
+        claimed.unlink(missing_ok=True)
+
+    # -- stats --
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, 'buffered': len(self._batch.items)}
+
+    # -- lifecycle --
+
+    def shutdown(self, timeout=5):
+        if self._thread is None and not self._batch.items:
+            return
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
@@ -0,0 +1,138 @@
+"""
+Cache-aside for public read endpoints.
+
+    @cached_response('announcements', shared=True)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+caches the data of a successful GET under the request's full URL (host,
+path and query string) within a namespace. Each namespace has a version
+counter (core/versioning.py); entries remember the version they were built
+at and are ignored once it moves. invalidate_on() wires model signals to
+bump a namespace, so any write drops all of its cached pages at once.
+
+Only anonymous requests are cached unless shared=True, since most viewsets
+filter what a signed-in user sees. Writes that bypass signals
+(QuerySet.update, bulk_create) must call invalidate_models() for the models
+they touch, or invalidate() directly; otherwise they only show up once the
+entry times out.
+"""
+import functools
+import hashlib
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from rest_framework.response import Response
+
+from core.versioning import get_version, get_versions, bump_version
+
+M2M_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+# model -> namespaces its signals invalidate, filled by invalidate_on()
+_namespaces_by_model = defaultdict(set)
+
+
+def _version_key(namespace):
+    return f'cache:version:{namespace}'
+
+
+def _changed_key(namespace):
+    return f'cache:changed-at:{namespace}'
+
+
+def _response_key(namespace, request):
+    url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f'cache:response:{namespace}:{url}'
+
+
+def invalidate(namespace):
+    bump_version(_version_key(namespace))
+    cache.set(_changed_key(namespace), time.time(), None)
+
+
+def invalidate_models(*models):
+    """Invalidate what saving one of `models` would, for writes that skip signals."""
+    for namespace in set().union(*(_namespaces_by_model.get(model, ()) for model in models)):
+        invalidate(namespace)
+
+
+def namespace_state(namespaces):
+    """
+    (versions, last change time) of `namespaces`, for HTTP validators
+    (core/conditional.py). A change time lost to a cache flush restarts at
+    now, so it can only move forward.
+    """
+    version_keys = [_version_key(n) for n in namespaces]
+    changed_keys = [_changed_key(n) for n in namespaces]
+    versions = get_versions(*version_keys)
+    changed = cache.get_many(changed_keys)
+    now = time.time()
+    for key in changed_keys:
+        if key not in changed:
+            cache.add(key, now, None)
+            changed[key] = cache.get(key, now)
+    return tuple(versions[k] for k in version_keys), max(changed.values(), default=None)
+
+
+def cached_response(namespace, timeout=None, shared=False):
+    """Cache a view method's 200 GET responses in `namespace`."""
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET' or (request.user.is_authenticated and not shared):
+                return view_method(self, request, *args, **kwargs)
+
+            key = _response_key(namespace, request)
+            version = get_version(_version_key(namespace))
+            cached = cache.get(key)
+            if cached is not None and cached[0] == version:
+                response = Response(cached[1])
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, (version, response.data), timeout or settings.CACHE_RESPONSE_TIMEOUT)
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_on(namespaces, *senders, ignore_fields=()):
+    """
+    Invalidate `namespaces` whenever one of `senders` is saved or deleted.
+    M2M through models (Model.field.through) invalidate on add/remove/clear.
+    Saves whose update_fields are all in `ignore_fields` are skipped.
+    """
+    if isinstance(namespaces, str):
+        namespaces = (namespaces,)
+    ignore_fields = frozenset(ignore_fields)
+
+    def bump():
+        for namespace in namespaces:
+            invalidate(namespace)
+
+    def on_save(sender, update_fields=None, **kwargs):
+        if update_fields and ignore_fields.issuperset(update_fields):
+            return
+        bump()
+
+    def on_delete(sender, **kwargs):
+        bump()
+
+    def on_m2m(sender, action, **kwargs):
+        if action in M2M_ACTIONS:
+            bump()
+
+    for sender in senders:
+        _namespaces_by_model[sender].update(namespaces)
+        uid = f"cache:{','.join(namespaces)}:{sender._meta.label}"
+        if sender._meta.auto_created:
+            m2m_changed.connect(on_m2m, sender=sender, weak=False, dispatch_uid=uid)
+        else:
+            post_save.connect(on_save, sender=sender, weak=False, dispatch_uid=uid)
+            post_delete.connect(on_delete, sender=sender, weak=False, dispatch_uid=uid)
@@ -0,0 +1,120 @@
+"""
+Conditional GET helpers: strong ETags over rendered bodies and
+If-None-Match matching (weak comparison, as RFC 9110 specifies for GET),
+plus ConditionalGetMixin for viewsets.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+
+from .caching import namespace_state
+
+
+def make_etag(body):
+    return quote_etag(hashlib.sha1(body).hexdigest())
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in (e.removeprefix('W/') for e in etags)
+
+
+def json_body_response(request, body, etag, cache_control='no-cache'):
+    """Serve pre-rendered JSON bytes, or 304 when the client already has this ETag."""
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        super().__init__('Not modified')
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified for a viewset's read actions, checked in initial()
+    so a 304 is sent before the queryset is evaluated or serialized.
+
+    Validators are the version counters of `conditional_namespaces`
+    (core/caching.py; bumped by the models wired with invalidate_on) and,
+    for models that keep one, `conditional_timestamp_field` of the object
+    (detail) or the latest value and row count of the viewer's queryset
+    (list), read in one small query. The ETag also covers the URL, the
+    viewer and the negotiated media type, since querysets and
+    representations differ per user.
+    """
+    conditional_namespaces = ()
+    conditional_timestamp_field = None
+    conditional_actions = ('list', 'retrieve')
+
+    _validators = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return
+        if request.META.get('HTTP_IF_NONE_MATCH', '').strip() == '*':
+            # Only true if the object exists, which the validators don't check
+            return
+        self._validators = self.get_conditional_validators(request)
+        if self._validators is None:
+            return
+        etag, last_modified = self._validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._validators is not None and response.status_code in (200, 304):
+            etag, last_modified = self._validators
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = 'private, no-cache' if request.user.is_authenticated else 'no-cache'
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def _timestamp_validator(self):
+        field = self.conditional_timestamp_field
+        qs = self.filter_queryset(self.get_queryset())
+        if self.detail:
+            lookup = self.lookup_url_kwarg or self.lookup_field
+            stamps = list(qs.filter(**{self.lookup_field: self.kwargs[lookup]}).values_list(field, flat=True)[:1])
+            return (stamps[0], 1) if stamps else None
+        # values('pk') drops the list annotations from the subquery
+        model = qs.model
+        stats = model._default_manager.filter(pk__in=qs.values('pk')).aggregate(latest=Max(field), rows=Count('pk'))
+        return stats['latest'], stats['rows']
+
+    def get_conditional_validators(self, request):
+        """(etag, last-modified epoch seconds), or None to skip (e.g. detail not found)."""
+        versions, changed_at = namespace_state(self.conditional_namespaces)
+        parts = [request.get_full_path(), request.user.pk, request.accepted_media_type, versions]
+        last_modified = changed_at
+        if self.conditional_timestamp_field:
+            stamp = self._timestamp_validator()
+            if stamp is None:
+                return None
+            parts.append(stamp)
+            if stamp[0]:
+                last_modified = max(last_modified or 0, stamp[0].timestamp())
+        etag = make_etag(repr(parts).encode())
+        return etag, int(last_modified) if last_modified else None
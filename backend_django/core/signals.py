@@ -0,0 +1,9 @@
+from .caching import invalidate_on
+from .models import Announcement, GalleryImage, FormSection, FormField, FormResponse
+
+# --- PUBLIC PAGE CACHES ---
+
+invalidate_on('announcements', Announcement)
+invalidate_on('gallery', GalleryImage)
+# What FormSerializer nests (sections, fields, response count)
+invalidate_on('forms', FormSection, FormField, FormResponse)
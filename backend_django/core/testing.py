@@ -0,0 +1,43 @@
+"""
+Shared test setup.
+
+IsolatedTestCase runs each test against a fresh in-process cache (the
+configured file cache would leak version counters and cached pages between
+tests and into the deployment's cache directory), writes audit events and
+check-ins synchronously, and points their spool files at a temporary
+directory. read_csv() collects a streamed CSV export (core/exports.py).
+"""
+import csv
+import gzip
+import io
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=TEST_CACHES, AUDIT_LOG_ASYNC=False, ATTENDANCE_CHECKIN_ASYNC=False)
+class IsolatedTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        spool_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, spool_dir, True)
+        cls.enterClassContext(override_settings(
+            AUDIT_LOG_SPOOL_PATH=f'{spool_dir}/audit_spool.jsonl',
+            ATTENDANCE_CHECKIN_SPOOL_PATH=f'{spool_dir}/checkin_spool.jsonl',
+        ))
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+def read_csv(response):
+    body = b''.join(response.streaming_content)
+    if response['Content-Type'] == 'application/gzip':
+        body = gzip.decompress(body)
+    return list(csv.reader(io.StringIO(body.decode())))
@@ -1,3 +1,148 @@
-from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from recruitment.models import RecruitmentApplication, RecruitmentDrive
+from users.models import Sig, User
+from users.tests import make_member
+from .form_models import Form, FormField, FormResponse
+from .models import Announcement
+from .testing import IsolatedTestCase, read_csv
+
+
+class FormResponseQueryTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.sig = Sig.objects.create(name='Software')
+        self.form = Form.objects.create(title='Induction', created_by=self.admin)
+
+    def add_responses(self, start, count):
+        for i in range(start, start + count):
+            user = make_member(f'applicant{i}', sig=self.sig)
+            FormResponse.objects.create(form=self.form, user=user, data={'Name': f'Applicant {i}'})
+        FormResponse.objects.create(form=self.form, data={'Name': 'Anonymous'})
+
+    def test_list_query_count_does_not_grow_with_responses(self):
+        self.add_responses(0, 2)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/form-responses/')
+        self.assertEqual(response.status_code, 200)
+
+        self.add_responses(2, 4)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/form-responses/')
+        self.assertEqual(len(response.data), 8)
+        details = [r['user_details'] for r in response.data]
+        self.assertIn(None, details)
+        self.assertIn('Software', {d['profile']['sigs'][0]['name'] for d in details if d})
+
+
+class FormExportTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.form = Form.objects.create(title='Induction Form', created_by=self.admin)
+        FormField.objects.create(form=self.form, label='Email', order=0)
+        FormField.objects.create(form=self.form, label='Skills', order=1)
+        self.url = f'/api/forms/{self.form.pk}/export_responses_csv/'
+
+    def add_responses(self, start, count):
+        for i in range(start, start + count):
+            FormResponse.objects.create(
+                form=self.form, user=make_member(f'applicant{i}'),
+                data={'Email': f'a{i}@x.com', 'Skills': ['CAD', 'C']},
+            )
+
+    def test_export_streams_one_row_per_response(self):
+        self.add_responses(0, 2)
+        self.add_responses(2, 3)
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Induction_Form_responses.csv"')
+        with self.assertNumQueries(1):
+            rows = read_csv(response)
+        self.assertEqual(rows[0], ['Response ID', 'User', 'Submitted At', 'Email', 'Skills'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[-1][1:2] + rows[-1][3:], ['applicant0', 'a0@x.com', 'CAD, C'])
+
+    def test_filters_and_gzip(self):
+        self.add_responses(0, 3)
+        drive = RecruitmentDrive.objects.create(title='Core', form=self.form, primary_field='Email')
+        RecruitmentApplication.objects.create(drive=drive, identifier='a1@x.com', status='SELECTED')
+        RecruitmentApplication.objects.create(drive=drive, identifier='a2@x.com')
+
+        rows = read_csv(self.client.get(self.url, {'drive': drive.pk, 'gzip': '1'}))
+        self.assertEqual(sorted(r[3] for r in rows[1:]), ['a1@x.com', 'a2@x.com'])
+        rows = read_csv(self.client.get(self.url, {'drive': drive.pk, 'status': 'SELECTED'}))
+        self.assertEqual([r[3] for r in rows[1:]], ['a1@x.com'])
+
+        self.assertEqual(len(read_csv(self.client.get(self.url, {'to': '2000-01-01'}))), 1)
+        self.assertEqual(self.client.get(self.url, {'from': 'yesterday'}).status_code, 400)
+
+
+class CachedResponseTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.announcement = Announcement.objects.create(title='Induction', content='Friday 5pm', author=self.admin)
+        self.client = APIClient()
+
+    def get(self, url='/api/announcements/'):
+        return self.client.get(url)
+
+    def test_shared_namespace_serves_everyone_from_cache(self):
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+        self.client.force_authenticate(make_member('member'))
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+        detail = f'/api/announcements/{self.announcement.pk}/'
+        self.assertEqual(self.get(detail)['X-Cache'], 'MISS')
+        self.assertEqual(self.get(detail).data['title'], 'Induction')
+
+    def test_writes_invalidate_every_page(self):
+        detail = f'/api/announcements/{self.announcement.pk}/'
+        self.get(), self.get(detail)
+
+        self.client.force_authenticate(self.admin)
+        self.client.post(f'{detail}publish/')
+        self.client.force_authenticate(None)
+        response = self.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIsNotNone(response.data['published_at'])
+
+        Announcement.objects.create(title='Hackathon', content='Saturday', author=self.admin)
+        response = self.get()
+        self.assertEqual((response['X-Cache'], len(response.data)), ('MISS', 2))
+
+
+class ConditionalGetTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.announcement = Announcement.objects.create(title='Induction', content='Friday 5pm', author=self.admin)
+        self.client = APIClient()
+
+    def test_unchanged_list_and_detail_answer_304(self):
+        for url in ('/api/announcements/', f'/api/announcements/{self.announcement.pk}/'):
+            response = self.client.get(url)
+            self.assertEqual(response['Cache-Control'], 'no-cache')
+            self.assertIn('Last-Modified', response)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual((response.status_code, response.content), (304, b''))
+
+    def test_validators_change_with_writes_and_viewer(self):
+        etag = self.client.get('/api/announcements/')['ETag']
+        self.client.force_authenticate(make_member('member'))
+        response = self.client.get('/api/announcements/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        etag = response['ETag']
+        Announcement.objects.create(title='Hackathon', content='Saturday', author=self.admin)
+        self.assertEqual(self.client.get('/api/announcements/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_missing_detail_is_still_404(self):
+        self.assertEqual(self.client.get('/api/announcements/999/', HTTP_IF_NONE_MATCH='*').status_code, 404)
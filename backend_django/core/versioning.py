@@ -0,0 +1,42 @@
+"""
+Cache-backed change counters.
+
+A version key holds an integer that is bumped whenever the data it guards
+changes. Readers compare the version they saw against the current one
+instead of re-reading the data. Counters are seeded from the clock, so a
+cache flush never hands out a number that was already seen.
+"""
+import time
+from django.core.cache import cache
+
+
+def _seed():
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    """Current value of a version counter, creating it if missing."""
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _seed(), timeout=None)
+        value = cache.get(key, 0)
+    return value
+
+
+def get_versions(*keys):
+    """Fetch several counters in one cache round-trip."""
+    values = cache.get_many(keys)
+    for key in keys:
+        if values.get(key) is None:
+            values[key] = get_version(key)
+    return values
+
+
+def bump_version(key):
+    """Advance a counter. Returns the new value."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing (never read, or evicted): seed it past anything handed out
+        cache.add(key, _seed(), timeout=None)
+        return cache.incr(key)
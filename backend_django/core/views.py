@@ -2,8 +2,6 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
-from django.http import HttpResponse
-import csv
 from .models import (
     Announcement, GalleryImage, Sponsorship, ContactMessage, 
     Form, FormSection, FormField, FormResponse
@@ -14,11 +12,24 @@ from .serializers import (
     FormFieldSerializer, FormResponseSerializer
 )
 from users.permissions import GlobalPermission
+from users.serializers import user_summary_prefetch
+from .caching import cached_response
+from .conditional import ConditionalGetMixin
+from .exports import ExportFilterError, date_range_filters, iterate, stream_csv, wants_gzip
 
-class AnnouncementViewSet(viewsets.ModelViewSet):
+class AnnouncementViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Announcement.objects.all().order_by('-created_at')
     serializer_class = AnnouncementSerializer
     permission_classes = [GlobalPermission]
+    conditional_namespaces = ('announcements',)
+
+    @cached_response('announcements', shared=True)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response('announcements', shared=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=True, methods=['post'])
     def publish(self, request, pk=None):
@@ -27,9 +38,10 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
         ann.save()
         return Response({'status': 'published'})
 
-class GalleryViewSet(viewsets.ModelViewSet):
+class GalleryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [GlobalPermission]
     serializer_class = GalleryImageSerializer
+    conditional_namespaces = ('gallery',)
 
     def get_queryset(self):
         qs = GalleryImage.objects.all().order_by('-uploaded_at')
@@ -38,6 +50,14 @@ class GalleryViewSet(viewsets.ModelViewSet):
             qs = qs.filter(event_id=event_id)
         return qs
 
+    @cached_response('gallery', shared=True)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response('gallery', shared=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=['post'])
     def upload(self, request):
         images = request.FILES.getlist('images')
@@ -79,10 +99,13 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
 
 # --- DYNAMIC FORMS ---
 
-class FormViewSet(viewsets.ModelViewSet):
+class FormViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Form.objects.all().order_by('-created_at')
     serializer_class = FormSerializer
     permission_classes = [GlobalPermission]
+    # The form row itself is covered by updated_at; 'forms' tracks what it nests
+    conditional_namespaces = ('forms',)
+    conditional_timestamp_field = 'updated_at'
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -90,43 +113,62 @@ class FormViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def responses(self, request, pk=None):
         form = self.get_object()
-        responses = form.responses.all().order_by('-submitted_at')
+        responses = form.responses.prefetch_related(*user_summary_prefetch('user')).order_by('-submitted_at')
         return Response(FormResponseSerializer(responses, many=True).data)
 
     @action(detail=True, methods=['get'])
     def export_responses_csv(self, request, pk=None):
+        """
+        Streams the form's responses. Filters: ?from=&to= (submission date),
+        ?drive=<id> (only candidates with an application in that drive,
+        optionally narrowed with ?status=), ?gzip=1
+        """
         form = self.get_object()
-        responses = form.responses.all().order_by('-submitted_at')
-        fields = form.fields.all().order_by('order')
-        
-        response = HttpResponse(content_type='text/csv')
+        try:
+            filters = date_range_filters(request, 'submitted_at')
+        except ExportFilterError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        responses = form.responses.filter(**filters)
+        drive_id = request.query_params.get('drive')
+        if drive_id:
+            responses = self._restrict_to_drive(responses, drive_id, request.query_params.get('status'))
+            if responses is None:
+                return Response({"error": "Drive not found or has no identifier field."}, status=status.HTTP_400_BAD_REQUEST)
+
+        labels = list(form.fields.order_by('order').values_list('label', flat=True))
+        responses = responses.order_by('-submitted_at').values_list('id', 'user__username', 'submitted_at', 'data')
+
+        def rows():
+            for resp_id, username, submitted_at, data in iterate(responses):
+                data = data or {}
+                row = [resp_id, username or 'Anonymous', submitted_at.strftime("%Y-%m-%d %H:%M:%S")]
+                # Map data
+                for label in labels:
+                    val = data.get(label, '')
+                    if isinstance(val, list): val = ", ".join(map(str, val))
+                    row.append(str(val))
+                yield row
+
+        header = ['Response ID', 'User', 'Submitted At'] + labels
         filename = f"{form.title.replace(' ', '_')}_responses.csv"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        writer = csv.writer(response)
-        
-        # Headers
-        headers = ['Response ID', 'User', 'Submitted At'] + [f.label for f in fields]
-        writer.writerow(headers)
-
-        for resp in responses:
-            user_str = resp.user.username if resp.user else 'Anonymous'
-            row = [
-                resp.id, 
-                user_str, 
-                resp.submitted_at.strftime("%Y-%m-%d %H:%M:%S")
-            ]
-            
-            # Map data
-            data = resp.data or {}
-            for field in fields:
-                val = data.get(field.label, '')
-                if isinstance(val, list): val = ", ".join(map(str, val))
-                row.append(str(val))
-            
-            writer.writerow(row)
-            
-        return response
+        return stream_csv(filename, header, rows(), compress=wants_gzip(request))
+
+    def _restrict_to_drive(self, responses, drive_id, app_status=None):
+        from django.db.models.fields.json import KeyTextTransform
+        from recruitment.models import RecruitmentDrive, RecruitmentApplication
+
+        if not str(drive_id).isdigit():
+            return None
+        drive = RecruitmentDrive.objects.filter(pk=drive_id).only('id', 'primary_field').first()
+        if not drive or not drive.primary_field:
+            return None
+        applications = RecruitmentApplication.objects.filter(drive=drive)
+        if app_status:
+            applications = applications.filter(status=app_status)
+        return responses.annotate(
+            _identifier=KeyTextTransform(drive.primary_field, 'data')
+        ).filter(_identifier__in=applications.values('identifier'))
 
 class FormSectionViewSet(viewsets.ModelViewSet):
     queryset = FormSection.objects.all()
@@ -139,7 +181,7 @@ class FormFieldViewSet(viewsets.ModelViewSet):
     permission_classes = [GlobalPermission]
 
 class FormResponseViewSet(viewsets.ModelViewSet):
-    queryset = FormResponse.objects.all()
+    queryset = FormResponse.objects.prefetch_related(*user_summary_prefetch('user'))
     serializer_class = FormResponseSerializer
     permission_classes = [GlobalPermission]
 
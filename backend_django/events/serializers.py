@@ -1,10 +1,10 @@
 from rest_framework import serializers
 from .models import Event
-from users.serializers import UserSerializer
+from users.serializers import UserSummarySerializer
 
 class EventSerializer(serializers.ModelSerializer):
-    lead_details = UserSerializer(source='lead', read_only=True)
-    volunteers_details = UserSerializer(source='volunteers', many=True, read_only=True)
+    lead_details = UserSummarySerializer(source='lead', read_only=True)
+    volunteers_details = UserSummarySerializer(source='volunteers', many=True, read_only=True)
     event_date = serializers.DateTimeField(source='date', read_only=True)
     creator_email = serializers.EmailField(source='lead.email', read_only=True)
     
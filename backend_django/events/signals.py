@@ -0,0 +1,8 @@
+from core.caching import invalidate_on
+from .models import Event
+
+# --- PUBLIC PAGE CACHES (core/caching.py) ---
+
+# Gallery images carry their event's title
+invalidate_on(('events', 'gallery'), Event)
+invalidate_on('events', Event.volunteers.through)
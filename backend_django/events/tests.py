@@ -1,3 +1,57 @@
-from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from core.testing import IsolatedTestCase
+from users.models import Sig
+from users.tests import make_member
+from .models import Event
+
+
+class EventListQueryTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sig = Sig.objects.create(name='Aerial')
+        self.member = make_member('member', sig=self.sig)
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def add_events(self, start, count):
+        for i in range(start, start + count):
+            lead = make_member(f'lead{i}', sig=self.sig)
+            event = Event.objects.create(
+                title=f'Workshop {i}', description='', date=timezone.now(), sig=self.sig,
+                lead=lead, visibility='PUBLISHED',
+            )
+            event.volunteers.add(self.member, lead)
+
+    def test_list_query_count_does_not_grow_with_events(self):
+        self.add_events(0, 2)
+        self.client.get('/api/events/')  # compiles and caches the member's permission set
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/events/')
+        self.assertEqual(response.status_code, 200)
+
+        self.add_events(2, 4)
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/events/')
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(len(response.data[0]['volunteers_details']), 2)
+
+
+class EventCacheTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lead = make_member('lead')
+        Event.objects.create(title='Workshop', description='', date=timezone.now(), lead=self.lead, visibility='PUBLISHED')
+        self.client = APIClient()
+
+    def test_only_anonymous_listings_are_cached(self):
+        self.assertEqual(self.client.get('/api/events/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/events/')['X-Cache'], 'HIT')
+
+        self.client.force_authenticate(self.lead)
+        self.assertNotIn('X-Cache', self.client.get('/api/events/'))
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get('/api/events/')
+        self.assertEqual(self.client.get('/api/events/?page=1')['X-Cache'], 'MISS')
@@ -1,17 +1,21 @@
 from rest_framework import viewsets, permissions
 from .models import Event
 from .serializers import EventSerializer
-from users.permissions import GlobalPermission
+from core.caching import cached_response
+from core.conditional import ConditionalGetMixin
+from users.permissions import GlobalPermission, get_permission_set
+from users.serializers import user_summary_prefetch
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Event.objects.all().order_by('-date')
     serializer_class = EventSerializer
     permission_classes = [GlobalPermission]
+    conditional_namespaces = ('events',)
 
     def get_queryset(self):
         from django.db.models import Q
         user = self.request.user
-        qs = Event.objects.all().order_by('-date')
+        qs = Event.objects.prefetch_related(*user_summary_prefetch('lead', 'volunteers')).order_by('-date')
 
         # 1. Anonymous / Public users: Only Published Global/SIG events
         # 1. Anonymous / Public users: Only Published Global/SIG events
@@ -31,7 +35,7 @@ class EventViewSet(viewsets.ModelViewSet):
         # - See DRAFT events if they have management permissions (simplified: if lead or can_manage_events)
         
         # Check if user has global event management permission
-        has_perm = user.user_roles.filter(can_manage_events=True).exists()
+        has_perm = get_permission_set(user).has('can_manage_events')
         
         if has_perm:
             # Manager: See all events except OTHER people's Personal events
@@ -47,6 +51,15 @@ class EventViewSet(viewsets.ModelViewSet):
             Q(lead=user)
         ).distinct()
 
+    # Anonymous visitors all get the same public listing
+    @cached_response('events')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response('events')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         # Set the lead to the current user if not explicitly provided
         serializer.save(lead=self.request.user)
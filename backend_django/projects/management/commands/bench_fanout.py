@@ -0,0 +1,55 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.realtime import InProcessBroker, encode_event
+
+
+class Command(BaseCommand):
+    help = "Benchmark project stream fan-out: one publisher, N connected subscribers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=500)
+        parser.add_argument('--events', type=int, default=200)
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options['subscribers'], options['events']))
+
+    async def _run(self, n_subs, n_events):
+        broker = InProcessBroker(max_queue=n_events)
+        channel = 'bench'
+        subs = [broker.subscribe(channel) for _ in range(n_subs)]
+
+        async def consume(sub):
+            for _ in range(n_events):
+                await sub.get()
+
+        consumers = [asyncio.create_task(consume(s)) for s in subs]
+        frame = encode_event('message', {'id': 1, 'thread': 1, 'content': 'x' * 200})
+        loop = asyncio.get_running_loop()
+
+        # Publish from a worker thread, like a sync view running under ASGI
+        def publish_all():
+            timings = []
+            for _ in range(n_events):
+                t0 = time.perf_counter()
+                broker.publish(channel, frame)
+                timings.append(time.perf_counter() - t0)
+            return timings
+
+        started = time.perf_counter()
+        publish_times = await loop.run_in_executor(None, publish_all)
+        await asyncio.gather(*consumers)
+        elapsed = time.perf_counter() - started
+
+        deliveries = n_subs * n_events
+        publish_us = [t * 1e6 for t in publish_times]
+        self.stdout.write(f"subscribers={n_subs} events={n_events} deliveries={deliveries}")
+        self.stdout.write(f"publish() per event: mean {statistics.mean(publish_us):.1f}us, "
+                          f"p95 {sorted(publish_us)[int(len(publish_us) * 0.95) - 1]:.1f}us")
+        self.stdout.write(f"per delivery: {elapsed / deliveries * 1e6:.2f}us")
+        self.stdout.write(f"all delivered in {elapsed * 1000:.1f}ms "
+                          f"({deliveries / elapsed:,.0f} deliveries/s)")
+        self.stdout.write(f"dropped frames: {sum(s.dropped for s in subs)}")
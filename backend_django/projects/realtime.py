@@ -0,0 +1,158 @@
+"""
+Change propagation for open project pages.
+
+Each project carries a sync version (core.versioning counter) bumped on
+message, thread, task and membership writes, so sync_state polls can
+short-circuit when nothing changed.
+
+Push channel: publishers (signal handlers and regular sync views) call publish_project_event();
+the SSE view in projects/streams.py holds one Subscription per connected tab.
+The default broker lives in-process, so it only fans out inside one server
+process. Point settings.REALTIME_BROKER at another class with the same
+interface (subscribe / publish / join / leave / online) to move to a shared
+broker later.
+"""
+import asyncio
+import json
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+from core.versioning import get_version, bump_version
+
+
+def encode_event(event, data):
+    """Render one Server-Sent Events frame. Done once per publish, not per subscriber."""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def project_channel(project_id):
+    return f"project:{project_id}"
+
+
+def _sync_key(project_id):
+    return f"project:{project_id}:sync"
+
+
+def get_sync_version(project_id):
+    return get_version(_sync_key(project_id))
+
+
+def bump_sync_version(project_id):
+    return bump_version(_sync_key(project_id))
+
+
+def _deliver_all(subs, frame):
+    for sub in subs:
+        sub._deliver(frame)
+
+
+class Subscription:
+    """One subscriber's bounded inbox, owned by the event loop that created it."""
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _deliver(self, frame):
+        # Slow consumer: drop the oldest frame rather than grow without bound
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._channels = defaultdict(set)
+        self._presence = defaultdict(Counter)  # channel -> {user_id: open connections}
+
+    def subscribe(self, channel):
+        sub = Subscription(self, channel, self.max_queue)
+        with self._lock:
+            self._channels[channel].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._channels.get(sub.channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._channels[sub.channel]
+
+    def publish(self, channel, frame):
+        """Fan a pre-encoded frame out to every subscriber. Returns the subscriber count."""
+        with self._lock:
+            subs = list(self._channels.get(channel, ()))
+
+        # Publishers may run in sync worker threads: wake each event loop
+        # once per publish, not once per subscriber
+        by_loop = defaultdict(list)
+        for sub in subs:
+            by_loop[sub.loop].append(sub)
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for loop, group in by_loop.items():
+            if loop is current:
+                _deliver_all(group, frame)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(_deliver_all, group, frame)
+        return len(subs)
+
+    # Presence: reference-counted so several tabs count as one user
+
+    def join(self, channel, user_id):
+        """Returns True when this is the user's first connection on the channel."""
+        with self._lock:
+            self._presence[channel][user_id] += 1
+            return self._presence[channel][user_id] == 1
+
+    def leave(self, channel, user_id):
+        """Returns True when the user's last connection on the channel closed."""
+        with self._lock:
+            counts = self._presence[channel]
+            counts[user_id] -= 1
+            if counts[user_id] > 0:
+                return False
+            del counts[user_id]
+            if not counts:
+                del self._presence[channel]
+            return True
+
+    def online(self, channel):
+        with self._lock:
+            return sorted(self._presence.get(channel, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.REALTIME_BROKER)()
+    return _broker
+
+
+def publish_project_event(project_id, event, data):
+    return get_broker().publish(project_channel(project_id), encode_event(event, data))
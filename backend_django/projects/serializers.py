@@ -1,9 +1,9 @@
 from rest_framework import serializers
-from users.serializers import UserSerializer
+from users.serializers import UserSummarySerializer
 from .models import Project, Task, TaskComment, ProjectRequest, ProjectThread, ThreadMessage
 
 class ThreadMessageSerializer(serializers.ModelSerializer):
-    author_details = UserSerializer(source='author', read_only=True)
+    author_details = UserSummarySerializer(source='author', read_only=True)
     class Meta:
         model = ThreadMessage
         fields = '__all__'
@@ -11,13 +11,13 @@ class ThreadMessageSerializer(serializers.ModelSerializer):
 
 class ProjectThreadSerializer(serializers.ModelSerializer):
     messages = ThreadMessageSerializer(many=True, read_only=True)
-    created_by_details = UserSerializer(source='created_by', read_only=True)
+    created_by_details = UserSummarySerializer(source='created_by', read_only=True)
     class Meta:
         model = ProjectThread
         fields = '__all__'
 
 class ProjectRequestSerializer(serializers.ModelSerializer):
-    user_details = UserSerializer(source='user', read_only=True)
+    user_details = UserSummarySerializer(source='user', read_only=True)
     user_position = serializers.CharField(source='user.profile.position', read_only=True)
     class Meta:
         model = ProjectRequest
@@ -32,16 +32,40 @@ class TaskCommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['author']
 
 class TaskSerializer(serializers.ModelSerializer):
-    assigned_to_details = UserSerializer(source='assigned_to', read_only=True)
+    assigned_to_details = UserSummarySerializer(source='assigned_to', read_only=True)
     comments = TaskCommentSerializer(many=True, read_only=True)
     
     class Meta:
         model = Task
         fields = '__all__'
 
-class ProjectSerializer(serializers.ModelSerializer):
-    lead_details = UserSerializer(source='lead', read_only=True)
-    members_details = UserSerializer(source='members', many=True, read_only=True)
+class ProjectVisibilityMixin:
+    """Only show inner details to members/leads or staff."""
+    SENSITIVE_FIELDS = ['threads', 'tasks', 'join_requests', 'status_update_requested', 'status_requested_by']
+
+    def _is_member(self, instance):
+        # Annotated by ProjectViewSet.get_queryset for the whole page
+        annotated = getattr(instance, 'viewer_is_member', None)
+        if annotated is not None:
+            return annotated
+
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            user = request.user
+            return user.is_superuser or instance.lead_id == user.id or instance.members.filter(id=user.id).exists()
+        return False
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        if not self._is_member(instance):
+            # Strip sensitive management data for public view
+            for field in self.SENSITIVE_FIELDS:
+                ret.pop(field, None)
+        return ret
+
+class ProjectSerializer(ProjectVisibilityMixin, serializers.ModelSerializer):
+    lead_details = UserSummarySerializer(source='lead', read_only=True)
+    members_details = UserSummarySerializer(source='members', many=True, read_only=True)
     tasks = TaskSerializer(many=True, read_only=True)
     threads = ProjectThreadSerializer(many=True, read_only=True)
     join_requests = ProjectRequestSerializer(many=True, read_only=True)
@@ -50,23 +74,34 @@ class ProjectSerializer(serializers.ModelSerializer):
         model = Project
         fields = '__all__'
 
-    def to_representation(self, instance):
-        ret = super().to_representation(instance)
-        request = self.context.get('request')
-        
-        # Security: Only show inner details to members/leads or staff
-        is_member = False
-        if request and request.user.is_authenticated:
-            user = request.user
-            if user.is_superuser or instance.lead == user or instance.members.filter(id=user.id).exists():
-                is_member = True
-        
-        if not is_member:
-            # Strip sensitive management data for public view
-            ret.pop('threads', None)
-            ret.pop('tasks', None)
-            ret.pop('join_requests', None)
-            ret.pop('status_update_requested', None)
-            ret.pop('status_requested_by', None)
-            
-        return ret
+class ProjectListSerializer(ProjectVisibilityMixin, serializers.ModelSerializer):
+    """
+    Compact list representation: counts plus a lead summary. Nested
+    collections are opt-in through `expand` (see EXPANSIONS).
+    """
+    SENSITIVE_FIELDS = ProjectVisibilityMixin.SENSITIVE_FIELDS + ['pending_request_count']
+
+    # expand key -> (field name, field factory)
+    EXPANSIONS = {
+        'tasks': ('tasks', lambda: TaskSerializer(many=True, read_only=True)),
+        'threads': ('threads', lambda: ProjectThreadSerializer(many=True, read_only=True)),
+        'members': ('members_details', lambda: UserSummarySerializer(source='members', many=True, read_only=True)),
+        'join_requests': ('join_requests', lambda: ProjectRequestSerializer(many=True, read_only=True)),
+    }
+
+    lead_details = UserSummarySerializer(source='lead', read_only=True)
+    member_count = serializers.IntegerField(read_only=True)
+    task_count = serializers.IntegerField(read_only=True)
+    open_task_count = serializers.IntegerField(read_only=True)
+    thread_count = serializers.IntegerField(read_only=True)
+    pending_request_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Project
+        fields = '__all__'
+
+    def __init__(self, *args, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for key in expand:
+            name, factory = self.EXPANSIONS[key]
+            self.fields[name] = factory()
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from core.caching import invalidate_on
+from users.models import User, MemberProfile, Sig
+from .models import Project, Task, TaskComment, ProjectRequest, ProjectThread, ThreadMessage
+from .realtime import publish_project_event, bump_sync_version
+
+@receiver(post_save, sender=ThreadMessage)
+def push_new_message(sender, instance, created, **kwargs):
+    if not created:
+        return
+
+    def publish():
+        from .serializers import ThreadMessageSerializer
+        message = ThreadMessage.objects.select_related('thread', 'author__profile').get(pk=instance.pk)
+        publish_project_event(message.thread.project_id, 'message', ThreadMessageSerializer(message).data)
+
+    # Only announce rows that actually committed
+    transaction.on_commit(publish)
+
+# --- SYNC VERSION (sync_state ?since=) ---
+
+@receiver([post_save, post_delete], sender=Project)
+def touch_project(sender, instance, **kwargs):
+    bump_sync_version(instance.pk)
+
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=ProjectThread)
+def touch_project_of_child(sender, instance, **kwargs):
+    bump_sync_version(instance.project_id)
+
+@receiver([post_save, post_delete], sender=ThreadMessage)
+def touch_project_of_message(sender, instance, **kwargs):
+    try:
+        bump_sync_version(instance.thread.project_id)
+    except ProjectThread.DoesNotExist:
+        pass  # thread deleted in the same cascade; its own signal covers it
+
+@receiver(m2m_changed, sender=Project.members.through)
+def touch_on_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_sync_version(instance.pk)
+    else:
+        # user.projects.add(...) etc.
+        for project_id in (pk_set or ()):
+            bump_sync_version(project_id)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def touch_on_login(sender, instance, update_fields=None, **kwargs):
+    # members_status carries last_login, which simplejwt updates on token issue
+    if not update_fields or 'last_login' not in update_fields:
+        return
+    project_ids = Project.objects.filter(
+        Q(lead=instance) | Q(members=instance)
+    ).values_list('id', flat=True).distinct()
+    for project_id in project_ids:
+        bump_sync_version(project_id)
+
+# --- CONDITIONAL GET (core/conditional.py) ---
+
+# What project payloads nest; Project rows themselves carry last_updated_at.
+# User saves count even for last_login, which members' presence shows.
+invalidate_on(
+    'projects',
+    Project.members.through, Task, TaskComment, ProjectRequest, ProjectThread, ThreadMessage,
+)
+invalidate_on('projects', User, MemberProfile, MemberProfile.sigs.through, Sig)
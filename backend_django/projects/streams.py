@@ -0,0 +1,90 @@
+"""
+Server-Sent Events endpoint for project pages: new thread messages, typing
+signals and presence changes, pushed as they happen instead of polled.
+
+Async view: it only streams when served through config/asgi.py. Under WSGI
+it answers 503 so clients fall back to sync_state polling.
+
+EventSource cannot send headers, so the page first fetches a stream ticket
+(ProjectViewSet.stream_ticket, normal JWT auth) and passes it as ?ticket=.
+A ticket is signed for one user and one project and expires after
+TICKET_MAX_AGE, so access tokens never end up in URLs or access logs.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Project
+from .realtime import get_broker, project_channel, encode_event
+
+KEEPALIVE_SECONDS = 15
+TICKET_SALT = 'projects.stream-ticket'
+TICKET_MAX_AGE = 30  # seconds
+
+
+def issue_ticket(user, project_id):
+    return signing.dumps({'u': user.pk, 'p': int(project_id)}, salt=TICKET_SALT)
+
+
+def _authenticate(request, project_id):
+    """Active user named by a valid ?ticket= for this project, else None."""
+    try:
+        data = signing.loads(request.GET.get('ticket', ''), salt=TICKET_SALT, max_age=TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if data.get('p') != int(project_id):
+        return None
+    return get_user_model().objects.filter(pk=data.get('u'), is_active=True).first()
+
+
+def can_view(user, project_id):
+    qs = Project.objects.filter(pk=project_id)
+    if not user.is_superuser:
+        qs = qs.filter(Q(lead=user) | Q(members=user))
+    return qs.exists()
+
+
+async def _event_stream(project_id, user):
+    broker = get_broker()
+    channel = project_channel(project_id)
+    sub = broker.subscribe(channel)
+    presence = {'id': user.id, 'username': user.username}
+
+    if broker.join(channel, user.id):
+        broker.publish(channel, encode_event('presence', {**presence, 'online': True, 'at': timezone.now()}))
+    try:
+        yield 'retry: 3000\n\n'
+        yield encode_event('ready', {'online': broker.online(channel)})
+        while True:
+            try:
+                frame = await sub.get(timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                frame = ': keep-alive\n\n'
+            yield frame
+    finally:
+        # Runs when the client disconnects and the response task is cancelled
+        sub.close()
+        if broker.leave(channel, user.id):
+            broker.publish(channel, encode_event('presence', {**presence, 'online': False, 'at': timezone.now()}))
+
+
+async def project_stream(request, pk):
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Streaming requires the ASGI server. Poll sync_state instead.'}, status=503)
+
+    user = await sync_to_async(_authenticate)(request, pk)
+    if user is None:
+        return JsonResponse({'error': 'Missing or expired stream ticket.'}, status=401)
+    if not await sync_to_async(can_view)(user, pk):
+        return JsonResponse({'error': 'Must be a project member.'}, status=403)
+
+    response = StreamingHttpResponse(_event_stream(pk, user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # disable nginx buffering
+    return response
@@ -1,3 +1,198 @@
-from django.test import TestCase
+import asyncio
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from core.testing import IsolatedTestCase
+from users.models import Sig, User
+from users.tests import make_member
+from . import streams
+from .models import Project, ProjectThread, Task, ThreadMessage
+from .realtime import get_broker, project_channel
+
+
+class ProjectQueryTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sig = Sig.objects.create(name='Mechanical')
+        self.member = make_member('member', sig=self.sig)
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def add_projects(self, start, count):
+        for i in range(start, start + count):
+            lead = make_member(f'lead{i}', sig=self.sig)
+            project = Project.objects.create(title=f'Project {i}', description='', lead=lead, is_public=i % 2 == 0)
+            project.members.add(self.member, lead)
+            Task.objects.create(project=project, title='Chassis', assigned_to=lead)
+            thread = ProjectThread.objects.create(project=project, title='General', created_by=lead)
+            for author in (lead, self.member):
+                ThreadMessage.objects.create(thread=thread, author=author, content='hi')
+
+    def test_list_query_count_does_not_grow_with_projects(self):
+        url = '/api/projects/?expand=members,threads,tasks'
+        self.add_projects(0, 2)
+        with self.assertNumQueries(21):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.add_projects(2, 4)
+        with self.assertNumQueries(21):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 6)
+        project = response.data[0]
+        self.assertEqual(project['member_count'], 2)
+        self.assertEqual(len(project['threads'][0]['messages']), 2)
+        self.assertEqual(project['lead_details']['profile']['sigs'][0]['name'], 'Mechanical')
+
+    def test_thread_message_list_query_count_does_not_grow_with_messages(self):
+        self.add_projects(0, 1)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/messages/')
+        self.assertEqual(response.status_code, 200)
+
+        self.add_projects(1, 3)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/messages/')
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(response.data[0]['author_details']['profile']['full_name'], 'Lead0')
+
+    def test_thread_list_query_count_does_not_grow_with_threads(self):
+        self.add_projects(0, 1)
+        with self.assertNumQueries(8):
+            self.client.get('/api/threads/')
+
+        self.add_projects(1, 3)
+        with self.assertNumQueries(8):
+            response = self.client.get('/api/threads/')
+        self.assertEqual(len(response.data), 4)
+
+
+class ProjectListTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lead = make_member('lead')
+        self.outsider = make_member('outsider')
+        self.client = APIClient()
+        for i in range(3):
+            project = Project.objects.create(title=f'Project {i}', description='', lead=self.lead, is_public=True)
+            project.members.add(self.lead)
+            Task.objects.create(project=project, title='Wiring', status='TODO')
+            Task.objects.create(project=project, title='Frame', status='DONE')
+
+    def test_list_is_compact_by_default(self):
+        self.client.force_authenticate(self.lead)
+        project = self.client.get('/api/projects/').data[0]
+        for nested in ('tasks', 'threads', 'members_details', 'join_requests'):
+            self.assertNotIn(nested, project)
+        self.assertEqual((project['task_count'], project['open_task_count']), (2, 1))
+
+    def test_expansions_are_opt_in_and_hidden_from_non_members(self):
+        self.client.force_authenticate(self.lead)
+        project = self.client.get('/api/projects/?expand=tasks,members,bogus').data[0]
+        self.assertEqual(len(project['tasks']), 2)
+        self.assertEqual(project['members_details'][0]['username'], 'lead')
+
+        self.client.force_authenticate(self.outsider)
+        project = self.client.get('/api/projects/?expand=tasks,members').data[0]
+        self.assertNotIn('tasks', project)
+        self.assertNotIn('pending_request_count', project)
+        self.assertIn('members_details', project)
+
+    def test_cursor_pagination_only_when_asked(self):
+        self.assertEqual(len(self.client.get('/api/projects/').data), 3)
+
+        page = self.client.get('/api/projects/?page_size=2').data
+        self.assertEqual([p['title'] for p in page['results']], ['Project 2', 'Project 1'])
+        rest = self.client.get(page['next']).data
+        self.assertEqual([p['title'] for p in rest['results']], ['Project 0'])
+        self.assertIsNone(rest['next'])
+
+
+class ProjectStreamTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = make_member('member')
+        self.outsider = make_member('outsider')
+        self.project = Project.objects.create(title='Rover', description='', lead=self.member)
+        self.other = Project.objects.create(title='Drone', description='', lead=self.member)
+        self.client = APIClient()
+
+    def ticket_for(self, user, project):
+        self.client.force_authenticate(user)
+        return self.client.get(f'/api/projects/{project.pk}/stream_ticket/')
+
+    def authenticate(self, ticket, project):
+        request = RequestFactory().get('/stream/', {'ticket': ticket})
+        return streams._authenticate(request, project.pk)
+
+    def test_ticket_is_issued_to_members_only(self):
+        self.assertEqual(self.ticket_for(self.outsider, self.project).status_code, 403)
+        response = self.ticket_for(self.member, self.project)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+    def test_ticket_is_bound_to_its_project_and_expires(self):
+        ticket = self.ticket_for(self.member, self.project).data['ticket']
+        self.assertEqual(self.authenticate(ticket, self.project), self.member)
+        self.assertIsNone(self.authenticate(ticket, self.other))
+        self.assertIsNone(self.authenticate(ticket + 'x', self.project))
+        with mock.patch.object(streams, 'TICKET_MAX_AGE', -1):
+            self.assertIsNone(self.authenticate(ticket, self.project))
+
+    def test_stream_needs_the_asgi_server(self):
+        ticket = self.ticket_for(self.member, self.project).data['ticket']
+        response = self.client.get(f'/api/projects/{self.project.pk}/stream/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 503)
+
+    def test_committed_message_is_pushed_to_subscribers(self):
+        thread = ProjectThread.objects.create(project=self.project, title='General', created_by=self.member)
+
+        async def subscribe():
+            return get_broker().subscribe(project_channel(self.project.pk))
+
+        loop = asyncio.new_event_loop()
+        try:
+            sub = loop.run_until_complete(subscribe())
+            with self.captureOnCommitCallbacks(execute=True):
+                ThreadMessage.objects.create(thread=thread, author=self.member, content='motor wired')
+            frame = loop.run_until_complete(sub.get(timeout=1))
+            sub.close()
+        finally:
+            loop.close()
+
+        event, data = frame.strip().split('\n')
+        self.assertEqual(event, 'event: message')
+        self.assertEqual(json.loads(data.removeprefix('data: '))['content'], 'motor wired')
+
+
+class SyncStateTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lead = make_member('lead')
+        self.project = Project.objects.create(title='Rover', description='', lead=self.lead)
+        self.thread = ProjectThread.objects.create(project=self.project, title='General', created_by=self.lead)
+        self.client = APIClient()
+        self.client.force_authenticate(self.lead)
+        self.url = f'/api/projects/{self.project.pk}/sync_state/'
+
+    def test_unchanged_poll_is_not_modified(self):
+        state = self.client.get(self.url).data
+        self.assertEqual(state['threads_state'], {self.thread.pk: 0})
+        self.assertEqual(list(state['members_status']), [self.lead.pk])
+        with self.assertNumQueries(1):  # only the project lookup
+            response = self.client.get(self.url, {'since': state['version']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_move_the_version(self):
+        version = self.client.get(self.url).data['version']
+        message = ThreadMessage.objects.create(thread=self.thread, author=self.lead, content='hi')
+        state = self.client.get(self.url, {'since': version}).data
+        self.assertEqual(state['threads_state'], {self.thread.pk: message.pk})
+
+        member = make_member('member')
+        self.project.members.add(member)
+        state = self.client.get(self.url, {'since': state['version']}).data
+        self.assertIn(member.pk, state['members_status'])
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import ProjectViewSet, TaskViewSet, ProjectRequestViewSet, ProjectThreadViewSet, ThreadMessageViewSet
+from .streams import project_stream
 
 router = DefaultRouter()
 router.register(r'projects', ProjectViewSet, basename='projects')
@@ -10,5 +11,6 @@ router.register(r'threads', ProjectThreadViewSet, basename='threads')
 router.register(r'messages', ThreadMessageViewSet, basename='messages')
 
 urlpatterns = [
+    path('projects/<int:pk>/stream/', project_stream, name='project_stream'),
     path('', include(router.urls)),
 ]
@@ -1,37 +1,111 @@
-from django.db.models import Q
+from django.db.models import Q, Count, Max, Exists, OuterRef, Subquery, Value, Case, When, BooleanField, IntegerField
+from django.contrib.auth import get_user_model
+from django.db.models.functions import Coalesce
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Project, Task, TaskComment, ProjectRequest, ProjectThread, ThreadMessage
 from .serializers import (
-    ProjectSerializer, TaskSerializer, TaskCommentSerializer,
+    ProjectSerializer, ProjectListSerializer, TaskSerializer, TaskCommentSerializer,
     ProjectRequestSerializer, ProjectThreadSerializer, ThreadMessageSerializer
 )
-from users.permissions import GlobalPermission
+from users.permissions import GlobalPermission, get_permission_set
+from users.serializers import user_summary_prefetch
 from .permissions import IsProjectMember
 from rest_framework.permissions import IsAuthenticated
+from core.conditional import ConditionalGetMixin
+from core.pagination import OptionalCursorPagination
+from .realtime import publish_project_event, get_sync_version
 
-class ProjectViewSet(viewsets.ModelViewSet):
+User = get_user_model()
+
+def _count_per_project(model, **filters):
+    """Correlated COUNT subquery keyed on the outer Project."""
+    counts = (model.objects.filter(project=OuterRef('pk'), **filters)
+              .order_by().values('project').annotate(n=Count('pk')).values('n'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+# Prefetches backing each ?expand= option of the list endpoint
+LIST_EXPANSION_PREFETCH = {
+    'tasks': ['tasks__comments__author', *user_summary_prefetch('tasks__assigned_to')],
+    'threads': ['threads__messages', *user_summary_prefetch('threads__created_by', 'threads__messages__author')],
+    'members': user_summary_prefetch('members'),
+    'join_requests': ['join_requests', *user_summary_prefetch('join_requests__user')],
+}
+
+class ProjectViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [GlobalPermission]
+    pagination_class = OptionalCursorPagination
+    # The project row itself is covered by last_updated_at; 'projects' tracks what it nests
+    conditional_namespaces = ('projects',)
+    conditional_timestamp_field = 'last_updated_at'
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProjectListSerializer
+        return ProjectSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            kwargs['expand'] = self._list_expansions()
+        return super().get_serializer(*args, **kwargs)
+
+    def _list_expansions(self):
+        raw = self.request.query_params.get('expand', '')
+        return [e for e in dict.fromkeys(raw.split(',')) if e in ProjectListSerializer.EXPANSIONS]
+
+    def _with_prefetch(self, qs):
+        if self.action == 'list':
+            lookups = ['members', *user_summary_prefetch('lead')]
+            for key in self._list_expansions():
+                lookups += LIST_EXPANSION_PREFETCH[key]
+            return qs.prefetch_related(*lookups).annotate(
+                member_count=_count_per_project(Project.members.through),
+                task_count=_count_per_project(Task),
+                open_task_count=_count_per_project(Task, status__in=['TODO', 'IN_PROGRESS', 'REVIEW']),
+                thread_count=_count_per_project(ProjectThread),
+                pending_request_count=_count_per_project(ProjectRequest, status='PENDING'),
+            )
+        if self.action == 'retrieve':
+            lookups = user_summary_prefetch('lead')
+            for extra in LIST_EXPANSION_PREFETCH.values():
+                lookups += extra
+            return qs.prefetch_related(*lookups)
+        return qs
+
+    def _with_membership(self, qs):
+        # One membership flag per row instead of a members query per project
+        user = self.request.user
+        if not user.is_authenticated:
+            return qs.annotate(viewer_is_member=Value(False))
+        if user.is_superuser:
+            return qs.annotate(viewer_is_member=Value(True))
+        membership = Project.members.through.objects.filter(project=OuterRef('pk'), user=user)
+        return qs.annotate(viewer_is_member=Case(
+            When(Q(lead=user) | Q(Exists(membership)), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        ))
 
     def get_queryset(self):
         user = self.request.user
+        qs = self._with_membership(self._with_prefetch(Project.objects.all()))
         
         # 1. Base Query: Everything for Superusers
         if user.is_authenticated and user.is_superuser:
-            return Project.objects.all().order_by('-created_at')
+            return qs.order_by('-created_at')
             
         # 2. Logic for Authenticated Members/Leads
         if user.is_authenticated:
-            return Project.objects.filter(
+            return qs.filter(
                 Q(is_public=True) | 
                 Q(lead=user) | 
                 Q(members=user)
             ).distinct().order_by('-created_at')
             
         # 3. Logic for Public/Anonymous Users
-        return Project.objects.filter(is_public=True).order_by('-created_at')
+        return qs.filter(is_public=True).order_by('-created_at')
 
     def perform_create(self, serializer):
         # Save project first
@@ -83,35 +157,48 @@ class ProjectViewSet(viewsets.ModelViewSet):
             
         return Response({'status': 'Join request sent'})
 
+    @action(detail=True, methods=['get'])
+    def stream_ticket(self, request, pk=None):
+        """Short-lived ticket for opening the project's event stream (projects/streams.py)."""
+        from .streams import issue_ticket, can_view
+        if not request.user.is_authenticated or not can_view(request.user, pk):
+            return Response({'error': 'Must be a project member.'}, status=status.HTTP_403_FORBIDDEN)
+        response = Response({'ticket': issue_ticket(request.user, pk)})
+        response['Cache-Control'] = 'no-store'
+        return response
+
     @action(detail=True, methods=['get'])
     def sync_state(self, request, pk=None):
         """
         Lightweight endpoint for polling.
-        Returns:
+        Query: ?since=<version> from the previous response.
+        Returns 304 when nothing changed since that version, else:
+        - version: pass back as ?since= on the next poll
         - members_status: { id: last_login } for all members + lead
-        - threads_hash: { thread_id: last_message_id } to detect new messages
+        - threads_state: { thread_id: last_message_id } to detect new messages
         """
-        try:
-            project = self.get_object()
-            
-            # 1. Members Status
-            members = list(project.members.all())
-            if project.lead: members.append(project.lead)
-            members_status = {m.id: m.last_login for m in members}
-            
-            # 2. Threads State
-            threads_state = {}
-            for t in project.threads.all():
-                last_msg = t.messages.last()
-                threads_state[t.id] = last_msg.id if last_msg else 0
-                
-            return Response({
-                "members_status": members_status,
-                "threads_state": threads_state
-            })
-        except Exception as e:
-            print(f"Sync State Error: {e}")
-            return Response({'error': str(e)}, status=500)
+        project = self.get_object()
+        version = get_sync_version(project.id)
+        if request.query_params.get('since') == str(version):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+
+        # 1. Members Status
+        members_status = dict(
+            User.objects.filter(Q(projects=project) | Q(pk=project.lead_id))
+            .distinct().values_list('id', 'last_login')
+        )
+
+        # 2. Threads State: latest message per thread in one aggregate
+        threads_state = {
+            thread_id: last_id or 0
+            for thread_id, last_id in project.threads.annotate(last_id=Max('messages__id')).values_list('id', 'last_id')
+        }
+
+        return Response({
+            "version": version,
+            "members_status": members_status,
+            "threads_state": threads_state
+        })
 
 class TaskViewSet(viewsets.ModelViewSet):
     queryset = Task.objects.all()
@@ -143,8 +230,9 @@ class ProjectRequestViewSet(viewsets.ModelViewSet):
         # Verify if requester is lead or admin
         user = request.user
         is_lead = join_req.project.lead == user
-        has_perm = user.user_roles.filter(can_manage_projects=True).exists()
-        is_web_lead = user.user_roles.filter(name='WEB_LEAD').exists()
+        perms = get_permission_set(user)
+        has_perm = perms.has('can_manage_projects')
+        is_web_lead = perms.is_web_lead
         
         if not (user.is_superuser or is_lead or has_perm or is_web_lead):
              return Response({"error": "Unauthorized"}, status=403)
@@ -158,7 +246,8 @@ class ProjectRequestViewSet(viewsets.ModelViewSet):
     def reject(self, request, pk=None):
         join_req = self.get_object()
         user = request.user
-        if not (user.is_superuser or join_req.project.lead == user or user.user_roles.filter(can_manage_projects=True).exists() or user.user_roles.filter(name='WEB_LEAD').exists()):
+        perms = get_permission_set(user)
+        if not (user.is_superuser or join_req.project.lead == user or perms.has('can_manage_projects') or perms.is_web_lead):
              return Response({"error": "Unauthorized"}, status=403)
         join_req.status = 'REJECTED'
         join_req.save()
@@ -171,9 +260,10 @@ class ProjectThreadViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        qs = ProjectThread.objects.prefetch_related('messages', *user_summary_prefetch('created_by', 'messages__author'))
         if user.is_superuser:
-            return ProjectThread.objects.all()
-        return ProjectThread.objects.filter(Q(project__lead=user) | Q(project__members=user)).distinct()
+            return qs
+        return qs.filter(Q(project__lead=user) | Q(project__members=user)).distinct()
 
     def perform_create(self, serializer):
         project = serializer.validated_data.get('project')
@@ -207,6 +297,9 @@ class ProjectThreadViewSet(viewsets.ModelViewSet):
             user_id = request.user.id
             key = f"typing:{thread.id}:{user_id}"
             cache.set(key, request.user.username, timeout=4)
+            publish_project_event(thread.project_id, 'typing', {
+                'thread': thread.id, 'id': user_id, 'username': request.user.username
+            })
             return Response({'status': 'ok'})
         except Exception as e:
             print(f"Typing Signal Error: {e}")
@@ -222,12 +315,9 @@ class ProjectThreadViewSet(viewsets.ModelViewSet):
             members = list(thread.project.members.all())
             if thread.project.lead: members.append(thread.project.lead)
             
-            for m in members:
-                if m.id == request.user.id: continue
-                key = f"typing:{thread.id}:{m.id}"
-                username = cache.get(key)
-                if username:
-                    active_typers.append({'id': m.id, 'username': username})
+            keys = {f"typing:{thread.id}:{m.id}": m.id for m in members if m.id != request.user.id}
+            for key, username in cache.get_many(keys).items():
+                active_typers.append({'id': keys[key], 'username': username})
                     
             return Response({'typers': active_typers})
         except Exception as e:
@@ -241,9 +331,10 @@ class ThreadMessageViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        qs = ThreadMessage.objects.prefetch_related(*user_summary_prefetch('author'))
         if user.is_superuser:
-            return ThreadMessage.objects.all()
-        return ThreadMessage.objects.filter(Q(thread__project__lead=user) | Q(thread__project__members=user)).distinct()
+            return qs
+        return qs.filter(Q(thread__project__lead=user) | Q(thread__project__members=user)).distinct()
 
     def perform_create(self, serializer):
         thread = serializer.validated_data.get('thread')
@@ -0,0 +1,164 @@
+"""
+Quiz results analytics.
+
+One pass over the graded attempts (streamed with iterator()) collects the
+score list, per-question correctness and option pick counts, and the rows
+for the leaderboard. The result is cached under a per-quiz version that is
+bumped whenever an attempt is graded (submit, auto-submit, sweeper,
+regrade) or the quiz's questions change, so it is recomputed only when
+something new has come in.
+
+Questions are judged against the compiled answer key (quizzes/scoring.py);
+SHORT / LONG questions only report how many attempts answered them.
+"""
+from django.core.cache import cache
+
+from core.versioning import get_version, bump_version
+from .models import Question, QuizAttempt
+from .scoring import GRADED_STATUSES, compile_answer_key
+
+ANALYTICS_TIMEOUT = 60 * 60
+PERCENTILES = (10, 25, 50, 75, 90)
+ITERATOR_CHUNK = 1000
+
+
+def _version_key(quiz_id):
+    return f'quiz:analytics-version:{quiz_id}'
+
+
+def _analytics_key(quiz_id):
+    return f'quiz:analytics:{quiz_id}'
+
+
+def invalidate_analytics(quiz_id):
+    bump_version(_version_key(quiz_id))
+
+
+def percentile(sorted_values, p):
+    """Linear interpolation between closest ranks."""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def histogram(sorted_values, bins):
+    if not sorted_values:
+        return []
+    lo, hi = sorted_values[0], sorted_values[-1]
+    if lo == hi:
+        return [{'from': lo, 'to': hi, 'count': len(sorted_values)}]
+    width = (hi - lo) / bins
+    counts = [0] * bins
+    for v in sorted_values:
+        counts[min(int((v - lo) / width), bins - 1)] += 1
+    return [
+        {'from': round(lo + i * width, 2), 'to': round(lo + (i + 1) * width, 2), 'count': n}
+        for i, n in enumerate(counts)
+    ]
+
+
+def _parse_picks(answer):
+    picks = set()
+    for a in answer:
+        try:
+            picks.add(int(a))
+        except (TypeError, ValueError):
+            return None
+    return picks
+
+
+def compute_analytics(quiz_id, bins=10):
+    answer_key = {qid: correct for qid, correct, _, _ in compile_answer_key(quiz_id)}
+    questions = {}
+    for q in Question.objects.filter(quiz_id=quiz_id).prefetch_related('options').order_by('order', 'id'):
+        questions[str(q.id)] = {
+            'question_id': q.id,
+            'text': q.text,
+            'question_type': q.question_type,
+            'answered': 0,
+            'correct': 0,
+            'options': {o.id: {'option_id': o.id, 'text': o.text, 'is_correct': o.is_correct, 'picks': 0}
+                        for o in q.options.all()},
+        }
+
+    scores, board = [], []
+    counted = disqualified = 0
+    rows = (
+        QuizAttempt.objects.filter(quiz_id=quiz_id, status__in=GRADED_STATUSES + ('DISQUALIFIED',))
+        .values_list('id', 'status', 'score', 'responses', 'candidate_name', 'candidate_email',
+                     'user__username', 'start_time', 'submitted_at')
+    )
+    for attempt_id, status, score, responses, name, email, username, started, submitted in rows.iterator(chunk_size=ITERATOR_CHUNK):
+        if status == 'DISQUALIFIED':
+            disqualified += 1
+            continue
+        counted += 1
+        scores.append(score)
+        duration = int((submitted - started).total_seconds()) if started and submitted else None
+        board.append((score, duration, attempt_id, name or username or '', email, status))
+
+        for qid, answer in (responses or {}).items():
+            stats = questions.get(qid)
+            if stats is None or not answer:
+                continue
+            stats['answered'] += 1
+            if qid not in answer_key:
+                continue
+            picks = _parse_picks(answer)
+            if picks is None:
+                continue
+            if picks == answer_key[qid]:
+                stats['correct'] += 1
+            for option_id in picks:
+                option = stats['options'].get(option_id)
+                if option is not None:
+                    option['picks'] += 1
+
+    scores.sort()
+    # Highest score first, quicker finish breaks ties; equal (score, time) share a rank
+    board.sort(key=lambda r: (-r[0], r[1] if r[1] is not None else float('inf'), r[2]))
+    leaderboard = []
+    for i, (score, duration, attempt_id, name, email, status) in enumerate(board):
+        rank = leaderboard[-1]['rank'] if leaderboard and (score, duration) == (board[i - 1][0], board[i - 1][1]) else i + 1
+        leaderboard.append({'rank': rank, 'attempt_id': attempt_id, 'name': name, 'email': email,
+                            'score': score, 'duration_seconds': duration, 'status': status})
+
+    per_question = []
+    for qid, stats in questions.items():
+        graded = qid in answer_key
+        per_question.append({
+            **stats,
+            'auto_graded': graded,
+            'correct': stats['correct'] if graded else None,
+            'correct_rate': round(stats['correct'] / counted, 4) if graded and counted else None,
+            'answer_rate': round(stats['answered'] / counted, 4) if counted else None,
+            'options': list(stats['options'].values()),
+        })
+
+    return {
+        'quiz_id': quiz_id,
+        'attempts': counted,
+        'disqualified': disqualified,
+        'score': {
+            'mean': round(sum(scores) / len(scores), 2) if scores else None,
+            'min': scores[0] if scores else None,
+            'max': scores[-1] if scores else None,
+            'percentiles': {f'p{p}': percentile(scores, p) for p in PERCENTILES},
+            'histogram': histogram(scores, bins),
+        },
+        'questions': per_question,
+        'leaderboard': leaderboard,
+    }
+
+
+def quiz_analytics(quiz_id, bins=10):
+    version = get_version(_version_key(quiz_id))
+    cached = cache.get(_analytics_key(quiz_id))
+    if cached and cached[0] == version and cached[1] == bins:
+        return cached[2]
+    result = compute_analytics(quiz_id, bins=bins)
+    cache.set(_analytics_key(quiz_id), (version, bins, result), ANALYTICS_TIMEOUT)
+    return result
@@ -0,0 +1,72 @@
+"""
+Delta autosave for quiz attempts.
+
+Clients send only the answers that changed since their last acknowledged
+save, tagged with an increasing sequence number:
+
+    {"seq": 12, "changes": {"41": [103], "44": [110, 112]}}
+
+The delta is merged into QuizAttempt.responses by the database in a single
+conditional UPDATE (`||` on PostgreSQL, json_patch on SQLite,
+JSON_MERGE_PATCH on MySQL), so concurrent saves never overwrite each other
+with a stale copy of the whole dict. The same UPDATE checks that the
+attempt is still ONGOING, within its end time, and that `seq` is newer
+than the last one applied; an older sequence is rejected. Clients keep
+unacknowledged changes and resend them with the next save, so a rejected
+or lost request loses nothing.
+"""
+from django.db.models import F, Func, JSONField, Value
+from django.utils import timezone
+
+from .models import QuizAttempt
+
+MAX_CHANGES = 500
+MAX_ANSWER_LENGTH = 10000
+
+
+class JSONMerge(Func):
+    """Shallow merge of a JSON object into a JSON column, done in SQL."""
+    function = 'json_patch'
+    output_field = JSONField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' || ', **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='JSON_MERGE_PATCH', **extra_context)
+
+
+def clean_changes(changes):
+    """Validate a delta. Returns {question_id: [answers]}; raises ValueError."""
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError("changes must be a non-empty object")
+    if len(changes) > MAX_CHANGES:
+        raise ValueError(f"At most {MAX_CHANGES} changes per save")
+    cleaned = {}
+    for qid, value in changes.items():
+        if not str(qid).isdigit():
+            raise ValueError(f"Invalid question id: {qid}")
+        if value is None:
+            value = []  # cleared answer
+        elif not isinstance(value, list):
+            value = [value]
+        for item in value:
+            if isinstance(item, bool) or not isinstance(item, (int, str)):
+                raise ValueError(f"Invalid answer for question {qid}")
+            if isinstance(item, str) and len(item) > MAX_ANSWER_LENGTH:
+                raise ValueError(f"Answer for question {qid} is too long")
+        cleaned[str(qid)] = value
+    return cleaned
+
+
+def merge_changes(attempt_id, seq, changes):
+    """
+    Apply a cleaned delta if the attempt is ONGOING, not past its end time
+    and `seq` is newer than the last applied one. Returns True if applied.
+    """
+    return QuizAttempt.objects.filter(
+        pk=attempt_id, status='ONGOING', end_time__gt=timezone.now(), response_seq__lt=seq,
+    ).update(
+        responses=JSONMerge(F('responses'), Value(changes, output_field=JSONField())),
+        response_seq=seq,
+    ) == 1
@@ -0,0 +1,158 @@
+"""
+join_by_code front door: an in-memory code index and token-bucket limits.
+
+Active quizzes' join codes are held in a per-process dict. The index is
+stamped with a cache version that quizzes/signals.py bumps on every Quiz
+save or delete (activation, code or title changes) and is reloaded, in one
+query, when the stamp moves or INDEX_MAX_AGE passes. An unknown code is
+rejected without touching the database.
+
+Requests then pass through per-process token buckets:
+
+- every request, per client IP (generous: a whole campus can share a NAT)
+- requests with an unknown code, per client IP (strict: code guessing)
+- requests naming a candidate email, per email
+
+Buckets refill continuously; a rejected request gets 429 with Retry-After.
+The client IP is the X-Forwarded-For entry added by our own proxy
+(REST_FRAMEWORK['NUM_PROXIES']), so a client can't pick a fresh bucket by
+sending its own header.
+Limits are (burst, seconds to refill the full burst) and can be overridden
+in settings as QUIZ_JOIN_RATE_IP / QUIZ_JOIN_RATE_IP_MISSES /
+QUIZ_JOIN_RATE_EMAIL. Because buckets live in each worker, the effective
+limit scales with the number of workers.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from core.versioning import get_version, bump_version
+from .models import Quiz
+
+INDEX_VERSION_KEY = 'quiz:code-index-version'
+INDEX_MAX_AGE = 300  # seconds
+MAX_CODE_LENGTH = Quiz._meta.get_field('join_code').max_length
+MAX_BUCKETS = 20000
+
+DEFAULT_RATES = {
+    'ip': (300, 60),
+    'ip_misses': (10, 60),
+    'email': (10, 60),
+}
+
+ActiveQuiz = namedtuple('ActiveQuiz', 'id title')
+
+
+class CodeIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes = {}
+        self._stamp = None
+        self._loaded_at = 0
+
+    def lookup(self, code):
+        version = get_version(INDEX_VERSION_KEY)
+        if version != self._stamp or time.monotonic() - self._loaded_at > INDEX_MAX_AGE:
+            self._reload(version)
+        return self._codes.get(code)
+
+    def _reload(self, version):
+        with self._lock:
+            if version == self._stamp and time.monotonic() - self._loaded_at <= INDEX_MAX_AGE:
+                return
+            self._codes = {
+                code: ActiveQuiz(quiz_id, title) for quiz_id, code, title in
+                Quiz.objects.filter(is_active=True).values_list('id', 'join_code', 'title')
+            }
+            self._stamp = version
+            self._loaded_at = time.monotonic()
+            counters['index_reloads'] += 1
+
+
+def invalidate_code_index():
+    bump_version(INDEX_VERSION_KEY)
+
+
+class TokenBuckets:
+    """Token buckets keyed by client, oldest evicted past MAX_BUCKETS."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> (tokens, last refill)
+
+    def _rate(self):
+        setting = f'QUIZ_JOIN_RATE_{self.name.upper()}'
+        return getattr(settings, setting, DEFAULT_RATES[self.name])
+
+    def take(self, key):
+        """Spend a token. Returns 0 if allowed, else seconds until one is available."""
+        burst, period = self._rate()
+        per_second = burst / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * per_second)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / per_second
+            if len(self._buckets) > MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+code_index = CodeIndex()
+buckets = {name: TokenBuckets(name) for name in DEFAULT_RATES}
+counters = {
+    'allowed': 0, 'invalid_code': 0, 'throttled_ip': 0, 'throttled_ip_misses': 0,
+    'throttled_email': 0, 'index_reloads': 0,
+}
+
+
+class JoinRejected(Exception):
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+def client_ip(request):
+    # Honours NUM_PROXIES: with it unset DRF would take the client-supplied X-Forwarded-For as is
+    return BaseThrottle().get_ident(request)
+
+
+def _throttle(bucket, key, counter):
+    wait = buckets[bucket].take(key)
+    if wait:
+        counters[counter] += 1
+        raise JoinRejected(429, "Too many attempts. Please wait and try again.", retry_after=int(wait) + 1)
+
+
+def admit(request, code, email=''):
+    """The active quiz for `code`, or JoinRejected (404 unknown code, 429 throttled)."""
+    ip = client_ip(request)
+    _throttle('ip', ip, 'throttled_ip')
+
+    code = str(code).strip()
+    quiz = code_index.lookup(code) if len(code) <= MAX_CODE_LENGTH else None
+    if quiz is None:
+        counters['invalid_code'] += 1
+        _throttle('ip_misses', ip, 'throttled_ip_misses')
+        raise JoinRejected(404, "Invalid code or quiz inactive")
+
+    if email:
+        _throttle('email', email, 'throttled_email')
+    counters['allowed'] += 1
+    return quiz
+
+
+def stats():
+    return {**counters, 'active_codes': len(code_index._codes),
+            'tracked_clients': {name: len(b._buckets) for name, b in buckets.items()}}
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quizzes.sweeper import sweep_expired, SWEEP_BATCH
+
+
+class Command(BaseCommand):
+    help = (
+        "Auto-submit ONGOING quiz attempts whose time ran out. Schedule it (e.g. every "
+        "minute from cron) or keep it running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=60,
+                            help="Seconds past the end time before an attempt is swept (default 60)")
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH)
+        parser.add_argument('--loop', type=float, default=0,
+                            help="Keep running, sweeping every this many seconds")
+
+    def handle(self, *args, **options):
+        if options['grace'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--grace must be >= 0 and --batch-size positive")
+
+        while True:
+            result = sweep_expired(grace=options['grace'], batch_size=options['batch_size'])
+            if result['swept'] or not options['loop']:
+                self.stdout.write(f"Auto-submitted {result['swept']} expired attempts")
+            if not options['loop']:
+                return
+            try:
+                time.sleep(options['loop'])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_quiz_instructions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='response_seq',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
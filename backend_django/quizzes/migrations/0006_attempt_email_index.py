@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_attempt_response_seq'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'candidate_email'], name='quizattempt_quiz_email_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_attempt_email_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['status', 'end_time'], name='quizattempt_status_end_idx'),
+        ),
+    ]
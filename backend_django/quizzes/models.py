@@ -88,12 +88,19 @@ class QuizAttempt(models.Model):
     
     # Store responses: { question_id: [option_ids] }
     responses = models.JSONField(default=dict, blank=True)
+    # Sequence number of the last autosave merged into responses (quizzes/autosave.py)
+    response_seq = models.PositiveIntegerField(default=0)
     
     score = models.FloatField(default=0.0)
     
     class Meta:
-        pass
         # unique_together removed to support guests
+        indexes = [
+            # Guest lookup by email in join_by_code
+            models.Index(fields=['quiz', 'candidate_email'], name='quizattempt_quiz_email_idx'),
+            # Expired ONGOING attempts for the auto-submit sweeper
+            models.Index(fields=['status', 'end_time'], name='quizattempt_status_end_idx'),
+        ]
 
     @property
     def time_left_seconds(self):
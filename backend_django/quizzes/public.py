@@ -0,0 +1,68 @@
+"""
+Pre-rendered public quiz payload.
+
+What candidates see of a quiz (PublicQuizSerializer: questions and
+options without answers) is rendered to JSON once per change and cached
+with its ETag, stamped with a per-quiz version that quizzes/signals.py
+bumps on any Quiz, Question or Option write. join_by_code embeds it and
+the public quiz detail serves the bytes directly, answering 304 when the
+client sends a matching If-None-Match. Entries also expire after
+PAYLOAD_TIMEOUT, which bounds how stale the embedded creator details can
+get.
+"""
+import json
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from core.conditional import make_etag
+from core.versioning import get_version, bump_version
+from users.serializers import user_summary_prefetch
+from .models import Quiz
+
+PAYLOAD_TIMEOUT = 60 * 60
+
+
+def _version_key(quiz_id):
+    return f'quiz:public-version:{quiz_id}'
+
+
+def _payload_key(quiz_id):
+    return f'quiz:public:{quiz_id}'
+
+
+def render_public_quiz(quiz_id):
+    from .serializers import PublicQuizSerializer
+    quiz = (
+        Quiz.objects.prefetch_related('questions__options', *user_summary_prefetch('creator'))
+        .filter(pk=quiz_id).first()
+    )
+    if quiz is None:
+        return None
+    return JSONRenderer().render(PublicQuizSerializer(quiz).data)
+
+
+def public_quiz(quiz_id):
+    """(etag, JSON bytes) for the quiz, or None if it doesn't exist."""
+    version = get_version(_version_key(quiz_id))
+    cached = cache.get(_payload_key(quiz_id))
+    if cached and cached[0] == version:
+        return cached[1], cached[2]
+    body = render_public_quiz(quiz_id)
+    if body is None:
+        return None
+    etag = make_etag(body)
+    cache.set(_payload_key(quiz_id), (version, etag, body), PAYLOAD_TIMEOUT)
+    return etag, body
+
+
+def public_quiz_data(quiz_id):
+    """(etag, dict) for embedding in another response, or None."""
+    payload = public_quiz(quiz_id)
+    if payload is None:
+        return None
+    return payload[0], json.loads(payload[1])
+
+
+def invalidate_public_quiz(quiz_id):
+    bump_version(_version_key(quiz_id))
@@ -0,0 +1,101 @@
+"""
+Compiled answer keys and in-memory scoring.
+
+A quiz's answer key (the auto-graded MCQ/MSQ questions, their correct
+option ids and marks) is compiled into plain tuples with two queries and
+cached. The cache entry is stamped with a per-quiz version that
+quizzes/signals.py bumps whenever a question or option of that quiz is
+saved or deleted, so an edited key is recompiled on next use. Grading an
+attempt is then a loop of set comparisons with no queries.
+
+SHORT / LONG answers are not auto-graded and don't appear in the key.
+"""
+from django.core.cache import cache
+
+from core.versioning import get_version, bump_version
+from .models import Question, Option, QuizAttempt
+
+AUTO_GRADED = ('MCQ', 'MSQ')
+KEY_TIMEOUT = 24 * 60 * 60
+REGRADE_BATCH = 500
+GRADED_STATUSES = ('SUBMITTED', 'AUTO_SUBMITTED')
+
+
+def _version_key(quiz_id):
+    return f'quiz:answer-key-version:{quiz_id}'
+
+
+def _key_key(quiz_id):
+    return f'quiz:answer-key:{quiz_id}'
+
+
+def compile_answer_key(quiz_id):
+    """[(question_id as str, frozenset(correct option ids), marks, negative_marks), ...]"""
+    correct = {}
+    for question_id, option_id in Option.objects.filter(
+        question__quiz_id=quiz_id, is_correct=True,
+    ).values_list('question_id', 'id'):
+        correct.setdefault(question_id, set()).add(option_id)
+    questions = Question.objects.filter(
+        quiz_id=quiz_id, question_type__in=AUTO_GRADED,
+    ).values_list('id', 'marks', 'negative_marks')
+    return [(str(qid), frozenset(correct.get(qid, ())), marks, negative) for qid, marks, negative in questions]
+
+
+def get_answer_key(quiz_id):
+    version = get_version(_version_key(quiz_id))
+    cached = cache.get(_key_key(quiz_id))
+    if cached and cached[0] == version:
+        return cached[1]
+    key = compile_answer_key(quiz_id)
+    cache.set(_key_key(quiz_id), (version, key), KEY_TIMEOUT)
+    return key
+
+
+def invalidate_answer_key(quiz_id):
+    bump_version(_version_key(quiz_id))
+
+
+def score(answer_key, responses):
+    """Marks for `responses` ({question_id: [option ids]}). Unanswered questions score 0."""
+    total = 0
+    responses = responses or {}
+    for qid, correct, marks, negative in answer_key:
+        answer = responses.get(qid)
+        if not answer:
+            continue
+        try:
+            picked = {int(a) for a in answer}
+        except (TypeError, ValueError):
+            picked = None
+        total += marks if picked == correct else -negative
+    return total
+
+
+def regrade_quiz(quiz_id, batch_size=REGRADE_BATCH):
+    """
+    Rescore every graded attempt of a quiz against the current key, writing
+    only the scores that changed, batch_size rows per bulk_update.
+    """
+    answer_key = compile_answer_key(quiz_id)
+    invalidate_answer_key(quiz_id)
+
+    rows = (
+        QuizAttempt.objects.filter(quiz_id=quiz_id, status__in=GRADED_STATUSES)
+        .order_by('id').values_list('id', 'responses', 'score')
+    )
+    checked = changed = 0
+    pending = []
+    for attempt_id, responses, old in rows.iterator(chunk_size=batch_size):
+        checked += 1
+        new = score(answer_key, responses)
+        if new != old:
+            pending.append(QuizAttempt(id=attempt_id, score=new))
+        if len(pending) >= batch_size:
+            QuizAttempt.objects.bulk_update(pending, ['score'])
+            changed += len(pending)
+            pending = []
+    if pending:
+        QuizAttempt.objects.bulk_update(pending, ['score'])
+        changed += len(pending)
+    return {'checked': checked, 'changed': changed, 'graded_questions': len(answer_key)}
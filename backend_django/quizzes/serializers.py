@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import Quiz, Question, Option, QuizAttempt
-from users.serializers import UserSerializer
+from users.serializers import UserSummarySerializer
 
 class OptionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,7 +16,7 @@ class QuestionSerializer(serializers.ModelSerializer):
 
 class QuizSerializer(serializers.ModelSerializer):
     questions = QuestionSerializer(many=True, read_only=True)
-    creator_details = UserSerializer(source='creator', read_only=True)
+    creator_details = UserSummarySerializer(source='creator', read_only=True)
     question_count = serializers.IntegerField(source='questions.count', read_only=True)
     
     class Meta:
@@ -25,13 +25,13 @@ class QuizSerializer(serializers.ModelSerializer):
         read_only_fields = ['creator', 'created_at']
 
 class QuizAttemptSerializer(serializers.ModelSerializer):
-    user_details = UserSerializer(source='user', read_only=True)
+    user_details = UserSummarySerializer(source='user', read_only=True)
     time_left = serializers.IntegerField(source='time_left_seconds', read_only=True)
     
     class Meta:
         model = QuizAttempt
         fields = '__all__'
-        read_only_fields = ['user', 'score', 'submitted_at', 'candidate_name', 'candidate_email']
+        read_only_fields = ['user', 'score', 'submitted_at', 'candidate_name', 'candidate_email', 'response_seq']
 
 # Public/Safe Serializers (No Answers)
 class PublicOptionSerializer(serializers.ModelSerializer):
@@ -47,7 +47,7 @@ class PublicQuestionSerializer(serializers.ModelSerializer):
 
 class PublicQuizSerializer(serializers.ModelSerializer):
     questions = PublicQuestionSerializer(many=True, read_only=True)
-    creator_details = UserSerializer(source='creator', read_only=True)
+    creator_details = UserSummarySerializer(source='creator', read_only=True)
     question_count = serializers.IntegerField(source='questions.count', read_only=True)
     
     class Meta:
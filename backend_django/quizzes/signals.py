@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Quiz, Question, Option
+from .analytics import invalidate_analytics
+from .joining import invalidate_code_index
+from .public import invalidate_public_quiz
+from .scoring import invalidate_answer_key
+
+# --- CACHE INVALIDATION ---
+# answer keys: scoring.py, public payload: public.py, results: analytics.py, join codes: joining.py
+
+def _quiz_content_changed(quiz_id):
+    invalidate_answer_key(quiz_id)
+    invalidate_public_quiz(quiz_id)
+    invalidate_analytics(quiz_id)
+
+@receiver([post_save, post_delete], sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    invalidate_public_quiz(instance.pk)
+    invalidate_code_index()
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    _quiz_content_changed(instance.quiz_id)
+
+@receiver([post_save, post_delete], sender=Option)
+def option_changed(sender, instance, **kwargs):
+    quiz_id = Question.objects.filter(pk=instance.question_id).values_list('quiz_id', flat=True).first()
+    if quiz_id:
+        _quiz_content_changed(quiz_id)
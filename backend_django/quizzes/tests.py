@@ -1,3 +1,329 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.testing import IsolatedTestCase
+from users.models import Sig, User
+from users.tests import make_member
+from . import joining, tokens
+from .scoring import get_answer_key, score
+from .sweeper import sweep_expired
+from .views import QuizViewSet
+from .models import Option, Question, Quiz, QuizAttempt
+
+
+class QuizAttemptQueryTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.sig = Sig.objects.create(name='Software')
+        self.quiz = Quiz.objects.create(creator=self.admin, title='Screening', join_code='SCREEN1')
+
+    def add_attempts(self, start, count):
+        for i in range(start, start + count):
+            user = make_member(f'candidate{i}', sig=self.sig)
+            QuizAttempt.objects.create(quiz=self.quiz, user=user, status='SUBMITTED', score=i)
+        QuizAttempt.objects.create(quiz=self.quiz, candidate_email=f'guest{start}@example.com')
+
+    def test_list_query_count_does_not_grow_with_attempts(self):
+        self.add_attempts(0, 2)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/attempts/')
+        self.assertEqual(response.status_code, 200)
+
+        self.add_attempts(2, 4)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/attempts/')
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(
+            sorted(a['user_details']['username'] for a in response.data if a['user_details']),
+            [f'candidate{i}' for i in range(6)],
+        )
+
+
+class QuizFlowTestCase(IsolatedTestCase):
+    """An active two-question quiz, and helpers to take it as a guest."""
+
+    def setUp(self):
+        super().setUp()
+        # Per-process join state would otherwise carry over between tests
+        joining.code_index._stamp = None
+        for bucket in joining.buckets.values():
+            bucket._buckets.clear()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.quiz = Quiz.objects.create(creator=self.admin, title='Screening', join_code='OA2026', is_active=True)
+        self.q1 = Question.objects.create(quiz=self.quiz, text='2 + 2?', question_type='MCQ', marks=4, negative_marks=1)
+        self.right = Option.objects.create(question=self.q1, text='4', is_correct=True)
+        self.wrong = Option.objects.create(question=self.q1, text='5')
+        self.q2 = Question.objects.create(quiz=self.quiz, text='Primes?', question_type='MSQ', marks=2)
+        self.two = Option.objects.create(question=self.q2, text='2', is_correct=True)
+        self.three = Option.objects.create(question=self.q2, text='3', is_correct=True)
+        self.client = APIClient()
+        self.url = f'/api/quizzes/{self.quiz.pk}'
+
+    def join(self, email='cand@example.com', **extra):
+        return self.client.post('/api/quizzes/join_by_code/', {'code': 'OA2026', 'email': email, 'name': 'Cand', **extra}, format='json')
+
+    def start(self, email='cand@example.com'):
+        """Join and start; returns the attempt token."""
+        token = self.join(email).data['attempt_token']
+        return self.client.post(f'{self.url}/start_quiz/', {'attempt_token': token}, format='json').data['attempt_token']
+
+    def post(self, action, token, **data):
+        return self.client.post(f'{self.url}/{action}/', {'attempt_token': token, **data}, format='json')
+
+
+class AutosaveTests(QuizFlowTestCase):
+    def test_deltas_merge_into_the_saved_responses(self):
+        token = self.start()
+        with self.assertNumQueries(1):
+            response = self.post('update_responses', token, seq=1, changes={str(self.q1.pk): [self.wrong.pk]})
+        self.assertEqual(response.data['status'], 'saved')
+        self.post('update_responses', token, seq=2, changes={str(self.q2.pk): [self.two.pk]})
+        self.post('update_responses', token, seq=3, changes={str(self.q1.pk): self.right.pk})
+
+        attempt = QuizAttempt.objects.get()
+        self.assertEqual(attempt.responses, {str(self.q1.pk): [self.right.pk], str(self.q2.pk): [self.two.pk]})
+        self.assertEqual(attempt.response_seq, 3)
+
+    def test_stale_and_malformed_saves_are_rejected(self):
+        token = self.start()
+        self.post('update_responses', token, seq=5, changes={str(self.q1.pk): [self.right.pk]})
+        response = self.post('update_responses', token, seq=4, changes={str(self.q1.pk): [self.wrong.pk]})
+        self.assertEqual((response.status_code, response.data['seq']), (409, 5))
+        self.assertEqual(QuizAttempt.objects.get().responses, {str(self.q1.pk): [self.right.pk]})
+
+        for changes in ({}, {'q1': [1]}, {str(self.q1.pk): [{'id': 1}]}):
+            self.assertEqual(self.post('update_responses', token, seq=6, changes=changes).status_code, 400)
+        self.assertEqual(self.post('update_responses', token, seq=0, changes={str(self.q1.pk): []}).status_code, 400)
+
+    def test_full_replace_and_submit_with_pending_changes(self):
+        token = self.start()
+        self.post('update_responses', token, responses={str(self.q1.pk): [self.wrong.pk]})
+        self.assertEqual(QuizAttempt.objects.get().responses, {str(self.q1.pk): [self.wrong.pk]})
+
+        changes = {str(self.q1.pk): [self.right.pk], str(self.q2.pk): [self.two.pk, self.three.pk]}
+        response = self.post('submit_quiz', token, seq=1, changes=changes)
+        self.assertEqual((response.data['status'], response.data['score']), ('SUBMITTED', 6))
+
+
+class AttemptTokenTests(QuizFlowTestCase):
+    def test_token_is_bound_to_quiz_and_expiry(self):
+        token = self.join().data['attempt_token']
+        attempt = QuizAttempt.objects.get()
+        self.assertEqual(tokens.read(token, self.quiz.pk).attempt_id, attempt.pk)
+        self.assertIsNone(tokens.read(token, self.quiz.pk + 1))
+        self.assertIsNone(tokens.read(token[:-1], self.quiz.pk))
+        with mock.patch('quizzes.tokens.time.time', return_value=10 ** 10):
+            self.assertIsNone(tokens.read(token, self.quiz.pk))
+
+    def test_guests_need_their_token(self):
+        token = self.join().data['attempt_token']
+        for action in ('start_quiz', 'update_responses', 'submit_quiz'):
+            self.assertEqual(self.post(action, None).status_code, 403)
+        self.assertEqual(self.post('start_quiz', token).data['status'], 'ONGOING')
+
+    def test_rejoining_by_email_needs_the_token(self):
+        token = self.join().data['attempt_token']
+        self.assertEqual(self.join().status_code, 403)
+        resumed = self.join(attempt_token=token)
+        self.assertEqual(resumed.data['attempt']['id'], QuizAttempt.objects.get().pk)
+
+    def test_deleted_attempt_is_not_ongoing(self):
+        token = self.start()
+        QuizAttempt.objects.all().delete()
+        response = self.post('update_responses', token, seq=1, changes={str(self.q1.pk): [self.right.pk]})
+        self.assertEqual((response.status_code, response.data['error']), (400, 'Quiz session not ongoing'))
+
+    def test_signed_in_users_fall_back_to_their_attempt(self):
+        member = make_member('member')
+        self.client.force_authenticate(member)
+        self.join()
+        self.assertEqual(self.post('start_quiz', None).data['status'], 'ONGOING')
+        self.assertEqual(QuizAttempt.objects.get().user, member)
+
+
+class ScoringTests(QuizFlowTestCase):
+    def responses(self, q1=(), q2=()):
+        return {str(self.q1.pk): list(q1), str(self.q2.pk): list(q2)}
+
+    def test_scoring_uses_the_cached_key(self):
+        key = get_answer_key(self.quiz.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_answer_key(self.quiz.pk), key)
+            self.assertEqual(score(key, self.responses([self.right.pk], [self.three.pk, self.two.pk])), 6)
+            self.assertEqual(score(key, self.responses([self.wrong.pk], [self.two.pk])), -1)
+            self.assertEqual(score(key, self.responses()), 0)
+            self.assertEqual(score(key, {str(self.q1.pk): ['x']}), -1)
+
+        self.wrong.is_correct = True
+        self.wrong.save()
+        self.assertEqual(score(get_answer_key(self.quiz.pk), self.responses([self.right.pk])), -1)
+
+    def test_regrade_rescores_after_a_key_fix(self):
+        for i, answer in enumerate((self.right, self.wrong, self.wrong)):
+            QuizAttempt.objects.create(
+                quiz=self.quiz, candidate_email=f'c{i}@example.com', status='SUBMITTED',
+                responses=self.responses([answer.pk]), score=score(get_answer_key(self.quiz.pk), self.responses([answer.pk])),
+            )
+        QuizAttempt.objects.create(quiz=self.quiz, candidate_email='late@example.com', status='ONGOING',
+                                   responses=self.responses([self.wrong.pk]))
+        # Fix a mis-entered key behind the signals, as a data migration would
+        Option.objects.filter(pk=self.wrong.pk).update(is_correct=True)
+        Option.objects.filter(pk=self.right.pk).update(is_correct=False)
+
+        self.client.force_authenticate(self.admin)
+        result = self.client.post(f'{self.url}/regrade/').data
+        self.assertEqual(result, {'checked': 3, 'changed': 3, 'graded_questions': 2})
+        self.assertEqual(sorted(QuizAttempt.objects.values_list('score', flat=True)), [-1, 0, 4, 4])
+        self.assertEqual(score(get_answer_key(self.quiz.pk), self.responses([self.wrong.pk])), 4)
+
+
+class SweeperTests(QuizFlowTestCase):
+    def add_attempt(self, email, minutes_left, answer=None, status='ONGOING'):
+        now = timezone.now()
+        return QuizAttempt.objects.create(
+            quiz=self.quiz, candidate_email=email, status=status, start_time=now - timedelta(minutes=30),
+            end_time=now + timedelta(minutes=minutes_left),
+            responses={str(self.q1.pk): [answer.pk]} if answer else {},
+        )
+
+    def test_expired_attempts_are_graded_once(self):
+        gone = [self.add_attempt(f'gone{i}@example.com', -5, self.right) for i in range(3)]
+        self.add_attempt('grace@example.com', -0.5)
+        self.add_attempt('live@example.com', 10)
+
+        self.assertEqual(sweep_expired(batch_size=2), {'swept': 3, 'batches': 2})
+        attempt = QuizAttempt.objects.get(pk=gone[0].pk)
+        self.assertEqual((attempt.status, attempt.score, attempt.submitted_at), ('AUTO_SUBMITTED', 4, attempt.end_time))
+        self.assertEqual(sweep_expired()['swept'], 0)
+        self.assertEqual(QuizAttempt.objects.filter(status='ONGOING').count(), 2)
+
+    def test_submit_racing_the_sweep_does_not_overwrite_it(self):
+        attempt = self.add_attempt('racer@example.com', -5, self.right)  # loaded while still ONGOING
+        sweep_expired()
+        self.assertFalse(QuizViewSet()._calculate_and_save(attempt, self.quiz, is_disqualified=True))
+        self.assertEqual((attempt.status, attempt.score), ('AUTO_SUBMITTED', 4))
+        self.assertEqual(QuizAttempt.objects.get().status, 'AUTO_SUBMITTED')
+
+
+class PublicQuizTests(QuizFlowTestCase):
+    def test_join_embeds_the_cached_payload(self):
+        data = self.join().data
+        options = [o for q in data['quiz']['questions'] for o in q['options']]
+        self.assertEqual(len(options), 4)
+        self.assertFalse(any('is_correct' in o for o in options))
+        # Payload and code index are cached: only the attempt row is touched
+        with self.assertNumQueries(2):
+            again = self.join('other@example.com').data
+        self.assertEqual(again['quiz_etag'], data['quiz_etag'])
+
+    def test_detail_answers_304_until_a_question_changes(self):
+        response = self.client.get(f'{self.url}/')
+        etag = response['ETag']
+        self.assertNotIn(b'is_correct', response.content)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(f'{self.url}/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.q1.text = '2 + 3?'
+        self.q1.save()
+        response = self.client.get(f'{self.url}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_quiz_deleted_behind_the_code_index(self):
+        stale = joining.ActiveQuiz(self.quiz.pk, self.quiz.title)
+        Quiz.objects.filter(pk=self.quiz.pk).delete()
+        with mock.patch.object(joining.code_index, 'lookup', return_value=stale):
+            self.assertEqual(self.join().status_code, 404)
+
+
+class AnalyticsTests(QuizFlowTestCase):
+    def add_attempt(self, email, q1, q2, minutes, status='SUBMITTED'):
+        responses = {str(self.q1.pk): [o.pk for o in q1], str(self.q2.pk): [o.pk for o in q2]}
+        start = timezone.now() - timedelta(hours=1)
+        return QuizAttempt.objects.create(
+            quiz=self.quiz, candidate_email=email, candidate_name=email.split('@')[0], status=status,
+            responses=responses, score=score(get_answer_key(self.quiz.pk), responses),
+            start_time=start, submitted_at=start + timedelta(minutes=minutes),
+        )
+
+    def analytics(self, **params):
+        return self.client.get(f'{self.url}/analytics/', params).data
+
+    def test_distribution_questions_and_leaderboard(self):
+        self.add_attempt('ace@x.com', [self.right], [self.two, self.three], 20)
+        self.add_attempt('quick@x.com', [self.right], [], 10)
+        self.add_attempt('slow@x.com', [self.right], [], 25)
+        self.add_attempt('miss@x.com', [self.wrong], [self.two], 15)
+        self.add_attempt('cheat@x.com', [self.right], [], 5, status='DISQUALIFIED')
+        self.client.force_authenticate(self.admin)
+
+        result = self.analytics(bins=2)
+        self.assertEqual((result['attempts'], result['disqualified']), (4, 1))
+        self.assertEqual(result['score']['min'], -1)
+        self.assertEqual((result['score']['max'], result['score']['percentiles']['p50']), (6, 4))
+        self.assertEqual([b['count'] for b in result['score']['histogram']], [1, 3])
+
+        q1, q2 = result['questions']
+        self.assertEqual((q1['correct_rate'], q2['answer_rate']), (0.75, 0.5))
+        self.assertEqual({o['text']: o['picks'] for o in q2['options']}, {'2': 2, '3': 1})
+
+        board = [(r['rank'], r['name']) for r in result['leaderboard']]
+        self.assertEqual(board, [(1, 'ace'), (2, 'quick'), (3, 'slow'), (4, 'miss')])
+        self.assertEqual(len(self.analytics(top=2)['leaderboard']), 2)
+
+    def test_cached_until_an_attempt_is_graded(self):
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.analytics()['attempts'], 0)
+        with self.assertNumQueries(1):  # the quiz lookup
+            self.analytics()
+
+        self.client.force_authenticate(None)
+        token = self.start()
+        self.post('submit_quiz', token)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.analytics()['attempts'], 1)
+
+    def test_managers_only(self):
+        self.client.force_authenticate(make_member('member'))
+        self.assertEqual(self.client.get(f'{self.url}/analytics/').status_code, 403)
+
+
+class JoinAdmissionTests(QuizFlowTestCase):
+    def check_code(self, code, **headers):
+        return self.client.post('/api/quizzes/join_by_code/', {'code': code}, format='json', **headers)
+
+    def test_unknown_codes_never_reach_the_database(self):
+        self.assertEqual(self.check_code('OA2026').data['status'], 'code_valid')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.check_code('NOPE').status_code, 404)
+
+        self.quiz.is_active = False
+        self.quiz.save()
+        self.assertEqual(self.check_code('OA2026').status_code, 404)
+
+    @override_settings(QUIZ_JOIN_RATE_IP_MISSES=(2, 60), REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_code_guessing_is_throttled_per_client_ip(self):
+        # Our proxy appends the real address; whatever the client sent before it is ignored
+        for i in range(2):
+            self.assertEqual(self.check_code('GUESS', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}, 203.0.113.7').status_code, 404)
+        response = self.check_code('GUESS', HTTP_X_FORWARDED_FOR='10.0.0.9, 203.0.113.7')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        self.assertEqual(self.check_code('GUESS', HTTP_X_FORWARDED_FOR='198.51.100.1').status_code, 404)
+        self.assertEqual(self.check_code('OA2026', HTTP_X_FORWARDED_FOR='203.0.113.7').status_code, 200)
+
+    @override_settings(QUIZ_JOIN_RATE_EMAIL=(2, 60))
+    def test_joins_are_throttled_per_email(self):
+        before = joining.stats()['throttled_email']
+        statuses = [self.join('Cand@Example.com' if i % 2 else 'cand@example.com').status_code for i in range(3)]
+        self.assertEqual(statuses[-1], 429)
+        self.assertEqual(joining.stats()['throttled_email'], before + 1)
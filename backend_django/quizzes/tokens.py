@@ -0,0 +1,60 @@
+"""
+Signed attempt tokens.
+
+join_by_code and start_quiz give the candidate a token naming their
+attempt, its quiz, when the token expires and, once the attempt has
+started, its end time. start_quiz, update_responses and submit_quiz route
+with the token alone (a primary-key lookup, or no lookup at all for
+autosave), and the deadline is checked from the token. Guests must present
+one, including to resume from join_by_code; only a signed-in user without a
+token falls back to their own attempt. Tokens issued before the start fall back to the
+end time cached by start_quiz.
+
+Tokens are signed with SECRET_KEY (django.core.signing); a token is only
+accepted for the quiz it was issued for.
+"""
+import time
+from collections import namedtuple
+
+from django.core import signing
+from django.core.cache import cache
+
+SALT = 'quizzes.attempt-token'
+JOIN_TTL = 6 * 60 * 60  # seconds a not-yet-started attempt's token is valid
+SUBMIT_GRACE = 5 * 60  # seconds after the end time a token can still submit
+
+AttemptClaim = namedtuple('AttemptClaim', 'attempt_id quiz_id end')
+
+
+def _end_key(attempt_id):
+    return f'quiz:attempt-end:{attempt_id}'
+
+
+def remember_end(attempt):
+    """Cache an attempt's end time (epoch seconds) until shortly after it passes."""
+    end = attempt.end_time.timestamp()
+    cache.set(_end_key(attempt.pk), end, max(int(end - time.time()) + SUBMIT_GRACE, 1))
+
+
+def issue(attempt):
+    end = attempt.end_time.timestamp() if attempt.end_time else None
+    expires = end + SUBMIT_GRACE if end else time.time() + JOIN_TTL
+    return signing.dumps({'a': attempt.pk, 'q': attempt.quiz_id, 'x': int(expires), 'end': end}, salt=SALT)
+
+
+def read(token, quiz_id):
+    """AttemptClaim for a valid, unexpired token issued for `quiz_id`; otherwise None."""
+    if not token or not isinstance(token, str):
+        return None
+    try:
+        data = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        return None
+    if str(data.get('q')) != str(quiz_id) or data.get('x', 0) < time.time():
+        return None
+    end = data.get('end') or cache.get(_end_key(data['a']))
+    return AttemptClaim(data['a'], data['q'], end)
+
+
+def time_left(end):
+    return max(0, int(end - time.time())) if end else 0
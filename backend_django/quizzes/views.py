@@ -1,14 +1,23 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
+from django.http import Http404
 from django.utils import timezone
 from datetime import timedelta
 from .models import Quiz, Question, Option, QuizAttempt
 from .serializers import QuizSerializer, QuestionSerializer, OptionSerializer, QuizAttemptSerializer, PublicQuizSerializer
-from users.permissions import GlobalPermission
+from .analytics import invalidate_analytics, quiz_analytics
+from .autosave import clean_changes, merge_changes
+from .scoring import get_answer_key, regrade_quiz, score
+from .public import public_quiz, public_quiz_data
+from . import joining, tokens
+from users.permissions import GlobalPermission, get_permission_set
+from users.serializers import user_summary_prefetch
+from core.conditional import json_body_response
 
 class QuizViewSet(viewsets.ModelViewSet):
-    queryset = Quiz.objects.all().order_by('-created_at')
+    queryset = Quiz.objects.prefetch_related('questions__options', *user_summary_prefetch('creator')).order_by('-created_at')
     serializer_class = QuizSerializer
     permission_classes = [GlobalPermission]
 
@@ -22,42 +31,70 @@ class QuizViewSet(viewsets.ModelViewSet):
         # But simpler: If action is list/retrieve for PUBLIC access, use Safe Serializer.
         # If user has role with 'can_manage_forms', use Full.
         
-        has_manage_perm = False
-        if self.request.user.is_authenticated:
-            if self.request.user.user_roles.filter(can_manage_forms=True).exists(): has_manage_perm = True
-        
-        if not has_manage_perm:
+        if not get_permission_set(self.request.user).has('can_manage_forms'):
             return PublicQuizSerializer
             
         return QuizSerializer
 
+    def get_queryset(self):
+        if self.action in ('start_quiz', 'submit_quiz', 'update_responses', 'regrade', 'analytics'):
+            # These only need the quiz row; scoring reads the compiled answer key
+            return Quiz.objects.all()
+        return super().get_queryset()
+
     def perform_create(self, serializer):
         serializer.save(creator=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        if self.get_serializer_class() is PublicQuizSerializer:
+            # Candidates get the cached, pre-rendered payload (304 when unchanged)
+            pk = str(kwargs.get('pk', ''))
+            payload = public_quiz(int(pk)) if pk.isdigit() else None
+            if payload is None:
+                raise Http404
+            return json_body_response(request, payload[1], payload[0])
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=['post', 'get'], permission_classes=[permissions.AllowAny])
     def join_by_code(self, request):
         code = request.data.get('code')
         if not code:
             return Response({"error": "Join code required"}, status=400)
             
-        quiz = Quiz.objects.filter(join_code=code, is_active=True).first()
-        if not quiz:
-            return Response({"error": "Invalid code or quiz inactive"}, status=404)
-            
         user = request.user if request.user.is_authenticated else None
-        email = request.data.get('email', '').lower() if not user else ''
+        email = str(request.data.get('email') or '').lower() if not user else ''
+
+        # Code index and rate limits: unknown codes never reach the database
+        try:
+            quiz = joining.admit(request, code, email or (f'user:{user.pk}' if user else ''))
+        except joining.JoinRejected as e:
+            response = Response({"error": e.message}, status=e.status)
+            if e.retry_after:
+                response['Retry-After'] = str(e.retry_after)
+            return response
         
+        quiz_payload = None
+        if user or email:
+            quiz_payload = public_quiz_data(quiz.id)
+            if quiz_payload is None:
+                # Deleted since the code index was loaded
+                return Response({"error": "Invalid code or quiz inactive"}, status=404)
+
         attempt = None
         if user:
-            attempt = QuizAttempt.objects.filter(quiz=quiz, user=user).first()
+            attempt = QuizAttempt.objects.filter(quiz_id=quiz.id, user=user).first()
         elif email:
-            attempt = QuizAttempt.objects.filter(quiz=quiz, candidate_email=email).first()
+            attempt = QuizAttempt.objects.filter(quiz_id=quiz.id, candidate_email=email).first()
+            # An email is not proof of identity: resuming needs the token issued at the first join
+            claim = tokens.read(request.data.get('attempt_token'), quiz.id)
+            if attempt and (claim is None or claim.attempt_id != attempt.pk):
+                return Response({"error": "This email has already joined. Continue from the browser you joined with."}, status=403)
 
         # If it's a POST and we have identity, try to create attempt
         if not attempt and request.method == 'POST' and (user or email):
             name = request.data.get('name', 'Anonymous Candidate')
             attempt = QuizAttempt.objects.create(
-                quiz=quiz,
+                quiz_id=quiz.id,
                 user=user,
                 candidate_name=name if not user else (user.profile.full_name if hasattr(user, 'profile') else user.username),
                 candidate_email=email if not user else user.email
@@ -71,19 +108,40 @@ class QuizViewSet(viewsets.ModelViewSet):
                  "requires_identity": not user
              })
 
+        quiz_etag, quiz_data = quiz_payload
         return Response({
-            "quiz": PublicQuizSerializer(quiz).data,
-            "attempt": QuizAttemptSerializer(attempt).data
+            "quiz": quiz_data,
+            "quiz_etag": quiz_etag,
+            "attempt": QuizAttemptSerializer(attempt).data,
+            "attempt_token": tokens.issue(attempt),
         })
 
+    @action(detail=False, methods=['get'])
+    def join_stats(self, request):
+        """Counters for join_by_code admission and throttling (this worker process)."""
+        if not (request.user.is_superuser or get_permission_set(request.user).has('can_manage_forms')):
+            return Response({"error": "Not allowed"}, status=403)
+        return Response(joining.stats())
+
+    def _claim(self, request, pk):
+        """
+        Claim from the attempt_token in the body, None if a signed-in user sent
+        none. Guests must send a valid token.
+        """
+        token = request.data.get('attempt_token')
+        if not token and request.user.is_authenticated:
+            return None
+        claim = tokens.read(token, pk)
+        if claim is None:
+            raise PermissionDenied("Invalid or expired attempt token. Join the quiz again.")
+        return claim
+
     def _get_attempt(self, request, quiz):
-        user = request.user if request.user.is_authenticated else None
-        if user:
-            return QuizAttempt.objects.filter(quiz=quiz, user=user).first()
-        email = request.data.get('email')
-        if email:
-            return QuizAttempt.objects.filter(quiz=quiz, candidate_email=email.lower()).first()
-        return None
+        """By primary key from the attempt token, or the signed-in user's attempt."""
+        claim = self._claim(request, quiz.pk)
+        if claim is not None:
+            return QuizAttempt.objects.filter(pk=claim.attempt_id).first()
+        return QuizAttempt.objects.filter(quiz=quiz, user=request.user).first()
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.AllowAny])
     def start_quiz(self, request, pk=None):
@@ -103,8 +161,9 @@ class QuizViewSet(viewsets.ModelViewSet):
         attempt.start_time = timezone.now()
         attempt.end_time = attempt.start_time + timedelta(minutes=quiz.duration_minutes)
         attempt.save()
+        tokens.remember_end(attempt)
         
-        return Response(QuizAttemptSerializer(attempt).data)
+        return Response({**QuizAttemptSerializer(attempt).data, "attempt_token": tokens.issue(attempt)})
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.AllowAny])
     def submit_quiz(self, request, pk=None):
@@ -113,40 +172,118 @@ class QuizViewSet(viewsets.ModelViewSet):
         
         if not attempt or attempt.status not in ['ONGOING', 'STARTING']:
              return Response({"error": "No active session"}, status=400)
+
+        # Unsaved autosave changes sent along with the submission
+        changes = request.data.get('changes')
+        if changes and attempt.status == 'ONGOING':
+            try:
+                if merge_changes(attempt.pk, int(request.data.get('seq')), clean_changes(changes)):
+                    attempt.refresh_from_db(fields=['responses', 'response_seq'])
+            except (TypeError, ValueError):
+                pass
              
         is_disqualified = request.data.get('disqualified', False)
-        self._calculate_and_save(attempt, quiz, is_disqualified)
+        if not self._calculate_and_save(attempt, quiz, is_disqualified):
+            return Response({"error": "Quiz already submitted"}, status=400)
         return Response(QuizAttemptSerializer(attempt).data)
 
+    @action(detail=True, methods=['post'])
+    def regrade(self, request, pk=None):
+        """Rescore all submitted attempts against the current answer key (after correcting it)."""
+        quiz = self.get_object()
+        result = regrade_quiz(quiz.pk)
+        if result['changed']:
+            invalidate_analytics(quiz.pk)
+        return Response(result)
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """
+        Score distribution, per-question correctness and option picks, and the
+        ranked leaderboard. ?bins= sets histogram buckets, ?top= trims the leaderboard.
+        """
+        # Reads on this viewset are public, so check the manager flag here
+        if not (request.user.is_superuser or get_permission_set(request.user).has('can_manage_forms')):
+            return Response({"error": "Not allowed"}, status=403)
+        quiz = self.get_object()
+        params = request.query_params
+        bins = int(params['bins']) if params.get('bins', '').isdigit() else 10
+        bins = max(1, min(bins, 100))
+        result = quiz_analytics(quiz.pk, bins=bins)
+        if params.get('top', '').isdigit():
+            result = {**result, 'leaderboard': result['leaderboard'][:int(params['top'])]}
+        return Response(result)
+
     def _calculate_and_save(self, attempt, quiz, is_disqualified=False):
+        """
+        Grade and close the attempt. Conditional on it still being open, so it
+        never overwrites a sweeper's AUTO_SUBMITTED or a concurrent submit;
+        returns False (with `attempt` reloaded) if one got there first.
+        """
         if is_disqualified:
-            attempt.status = 'DISQUALIFIED'
-            attempt.score = 0
+            new_status, new_score = 'DISQUALIFIED', 0
         else:
-            total_score = 0
-            questions = quiz.questions.prefetch_related('options').all()
-            
-            for q in questions:
-                user_ans = attempt.responses.get(str(q.id), [])
-                if q.question_type in ['MCQ', 'MSQ']:
-                    correct_ans = list(q.options.filter(is_correct=True).values_list('id', flat=True))
-                    if not user_ans: continue
-                    if set(map(int, user_ans)) == set(correct_ans):
-                        total_score += q.marks
-                    else:
-                        total_score -= q.negative_marks
-                else:
-                    # Manual grading or neutral for now for short/long
-                    pass
-            
-            attempt.score = total_score
-            attempt.status = 'SUBMITTED'
-            
-        attempt.submitted_at = timezone.now()
-        attempt.save()
+            new_status, new_score = 'SUBMITTED', score(get_answer_key(quiz.pk), attempt.responses)
+        now = timezone.now()
+
+        closed = QuizAttempt.objects.filter(pk=attempt.pk, status__in=('ONGOING', 'STARTING')).update(
+            status=new_status, score=new_score, submitted_at=now,
+        )
+        if not closed:
+            attempt.refresh_from_db()
+            return False
+        attempt.status, attempt.score, attempt.submitted_at = new_status, new_score, now
+        invalidate_analytics(quiz.pk)
+        return True
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.AllowAny])
     def update_responses(self, request, pk=None):
+        """
+        Autosave. Body: { "seq": 12, "changes": { "<question_id>": [<option ids or text>] } }
+        Only changed answers are sent; they are merged into the saved responses.
+        A seq at or below the last saved one is rejected with 409.
+        A full { "responses": {...} } body still replaces everything (older clients).
+        """
+        if request.data.get('changes') is None:
+            return self._replace_responses(request, pk)
+
+        try:
+            seq = int(request.data.get('seq'))
+        except (TypeError, ValueError):
+            seq = 0
+        if seq < 1:
+            return Response({"error": "seq must be a positive integer"}, status=400)
+        try:
+            changes = clean_changes(request.data.get('changes'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        claim = self._claim(request, pk)
+        if claim is not None and claim.end:
+            # Deadline from the token: a live attempt costs one UPDATE by primary key
+            attempt_id, end = claim.attempt_id, claim.end
+        else:
+            attempt = (
+                QuizAttempt.objects.filter(pk=claim.attempt_id) if claim
+                else QuizAttempt.objects.filter(quiz_id=pk, user=request.user)
+            ).only('id', 'status', 'end_time').first()
+            if not attempt or attempt.status != 'ONGOING':
+                return Response({"error": "Quiz session not ongoing"}, status=400)
+            attempt_id, end = attempt.pk, attempt.end_time.timestamp()
+
+        if tokens.time_left(end) > 0 and merge_changes(attempt_id, seq, changes):
+            return Response({"status": "saved", "seq": seq, "time_left": tokens.time_left(end)})
+
+        # Not applied: find out why (the attempt may have been deleted under a live token)
+        attempt = QuizAttempt.objects.filter(pk=attempt_id).first()
+        if not attempt or attempt.status != 'ONGOING':
+            return Response({"error": "Quiz session not ongoing"}, status=400)
+        if attempt.time_left_seconds <= 0:
+            self._calculate_and_save(attempt, self.get_object())
+            return Response({"error": "Time exceeded. Quiz auto-submitted."}, status=400)
+        return Response({"error": "Stale sequence", "seq": attempt.response_seq}, status=409)
+
+    def _replace_responses(self, request, pk):
         quiz = self.get_object()
         attempt = self._get_attempt(request, quiz)
         
@@ -159,8 +296,9 @@ class QuizViewSet(viewsets.ModelViewSet):
             
         responses = request.data.get('responses')
         if responses is not None:
-            attempt.responses = responses
-            attempt.save()
+            # Only while still ongoing: a plain save() could reopen an auto-submitted attempt
+            if not QuizAttempt.objects.filter(pk=attempt.pk, status='ONGOING').update(responses=responses):
+                return Response({"error": "Quiz session not ongoing"}, status=400)
             
         return Response({"status": "saved", "time_left": attempt.time_left_seconds})
 
@@ -184,7 +322,8 @@ class QuizAttemptViewSet(viewsets.ReadOnlyModelViewSet):
         if not user.is_authenticated:
             return QuizAttempt.objects.none()
             
-        if user.is_superuser or user.user_roles.filter(can_manage_forms=True).exists():
-            return QuizAttempt.objects.all()
+        qs = QuizAttempt.objects.prefetch_related(*user_summary_prefetch('user'))
+        if user.is_superuser or get_permission_set(user).has('can_manage_forms'):
+            return qs
             
-        return QuizAttempt.objects.filter(user=user)
+        return qs.filter(user=user)
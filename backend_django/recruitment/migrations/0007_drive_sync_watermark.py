@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0006_recruitmentdrive_candidate_name_field_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recruitmentdrive',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recruitmentdrive',
+            name='last_synced_response_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -18,6 +18,10 @@ class RecruitmentDrive(models.Model):
     
     is_active = models.BooleanField(default=False) 
     is_public = models.BooleanField(default=True)
+
+    # Candidate sync watermark: highest FormResponse id already imported
+    last_synced_response_id = models.PositiveBigIntegerField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -25,9 +29,19 @@ class RecruitmentDrive(models.Model):
     def __str__(self):
         return self.title
 
+    # Changing any of these invalidates the candidate sync watermark
+    SYNC_MAPPING_FIELDS = ('form_id', 'primary_field', 'candidate_name_field', 'sig_field')
+
     def save(self, *args, **kwargs):
         if self.is_active:
              RecruitmentDrive.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+        if self.pk and self.last_synced_response_id is not None:
+            stored = RecruitmentDrive.objects.filter(pk=self.pk).values(*self.SYNC_MAPPING_FIELDS).first()
+            if stored and any(stored[f] != getattr(self, f) for f in self.SYNC_MAPPING_FIELDS):
+                self.last_synced_response_id = None
+                update_fields = kwargs.get('update_fields')
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | {'last_synced_response_id'}
         super().save(*args, **kwargs)
 
 class TimelineEvent(models.Model):
@@ -59,3 +59,4 @@ class RecruitmentDriveSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecruitmentDrive
         fields = '__all__'
+        read_only_fields = ['last_synced_response_id', 'last_synced_at']
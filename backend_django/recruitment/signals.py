@@ -0,0 +1,15 @@
+from core.caching import invalidate_on
+from .models import (
+    RecruitmentDrive, TimelineEvent, RecruitmentApplication,
+    RecruitmentAssignment, InterviewPanel, InterviewSlot
+)
+
+# --- PUBLIC PAGE CACHES (core/caching.py) ---
+
+# active_public nests the drive's timeline, assignments, panels and slots
+# and counts its applications
+invalidate_on(
+    'recruitment',
+    RecruitmentDrive, TimelineEvent, RecruitmentApplication, RecruitmentAssignment,
+    InterviewPanel, InterviewPanel.members.through, InterviewSlot,
+)
@@ -0,0 +1,140 @@
+"""
+Candidate import from a drive's linked form.
+
+Responses are streamed in id order and folded into one row per identifier
+(later responses win, as before). That result is diffed in memory against the
+drive's existing applications, so the writes are a handful of bulk
+statements instead of one update_or_create per response.
+
+Incremental mode only reads responses past the drive's watermark
+(last_synced_response_id). Full mode re-reads the whole form. Changing the
+drive's form or field mapping clears the watermark (RecruitmentDrive.save),
+so the next incremental run is a full one.
+
+The bulk writes skip model signals and auto_now, so the drive's updated_at
+and the 'recruitment' cache namespace are bumped explicitly.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from core.caching import invalidate
+from .models import RecruitmentDrive, RecruitmentApplication
+
+READ_CHUNK = 2000
+WRITE_BATCH = 500
+
+
+def _as_text(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def sync_candidates(drive, incremental=False):
+    """Import/update applications for a drive. Returns a diff report."""
+    from core.form_models import FormResponse
+    from users.models import Sig
+
+    sigs_map = {name.lower(): sig_id for sig_id, name in Sig.objects.values_list('id', 'name')}
+    report = {
+        'mode': 'incremental' if incremental else 'full',
+        'processed': 0,
+        'created': [],
+        'updated': [],
+        'unchanged': 0,
+        'skipped_no_identifier': 0,
+        'duplicates': 0,
+        'unknown_sig': 0,
+    }
+
+    with transaction.atomic():
+        # Lock the drive row so two syncs cannot race on the same identifiers
+        drive = RecruitmentDrive.objects.select_for_update().get(pk=drive.pk)
+        since = drive.last_synced_response_id if incremental else None
+
+        responses = FormResponse.objects.filter(form_id=drive.form_id)
+        if since:
+            responses = responses.filter(id__gt=since)
+        responses = responses.order_by('id').values_list('id', 'data')
+
+        # 1. Fold responses into identifier -> (name, sig_id)
+        incoming = {}
+        watermark = since
+        for resp_id, data in responses.iterator(chunk_size=READ_CHUNK):
+            report['processed'] += 1
+            watermark = resp_id
+            data = data if isinstance(data, dict) else {}
+
+            identifier = data.get(drive.primary_field)
+            if not identifier:
+                report['skipped_no_identifier'] += 1
+                continue
+            identifier = _as_text(identifier)
+
+            candidate_name = ""
+            if drive.candidate_name_field:
+                candidate_name = _as_text(data.get(drive.candidate_name_field, ""))
+
+            sig_id = None
+            if drive.sig_field:
+                sig_val = data.get(drive.sig_field, "")
+                if sig_val and isinstance(sig_val, str):
+                    sig_id = sigs_map.get(sig_val.strip().lower())
+                    if sig_id is None:
+                        report['unknown_sig'] += 1
+
+            if identifier in incoming:
+                report['duplicates'] += 1
+            incoming[identifier] = (candidate_name, sig_id)
+
+        # 2. Diff against what the drive already has
+        existing = _existing_map(drive)
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for identifier, (name, sig_id) in incoming.items():
+            current = existing.get(identifier)
+            if current is None:
+                to_create.append(RecruitmentApplication(
+                    drive=drive, identifier=identifier, candidate_name=name, sig_id=sig_id,
+                ))
+                report['created'].append(identifier)
+                continue
+
+            pk, old_name, old_sig_id = current
+            changes = {}
+            if old_name != name:
+                changes['candidate_name'] = [old_name, name]
+            if old_sig_id != sig_id:
+                changes['sig'] = [old_sig_id, sig_id]
+            if not changes:
+                report['unchanged'] += 1
+                continue
+            to_update.append(RecruitmentApplication(
+                pk=pk, candidate_name=name, sig_id=sig_id, updated_at=now,
+            ))
+            report['updated'].append({'identifier': identifier, 'changes': changes})
+
+        # 3. Apply in batches
+        RecruitmentApplication.objects.bulk_create(to_create, batch_size=WRITE_BATCH)
+        RecruitmentApplication.objects.bulk_update(
+            to_update, ['candidate_name', 'sig', 'updated_at'], batch_size=WRITE_BATCH,
+        )
+
+        # queryset.update() so save() side effects (active drive toggling) don't run
+        RecruitmentDrive.objects.filter(pk=drive.pk).update(
+            last_synced_response_id=watermark, last_synced_at=now, updated_at=now,
+        )
+        transaction.on_commit(lambda: invalidate('recruitment'))
+
+    report['watermark'] = watermark
+    report['synced_at'] = now
+    return report
+
+
+def _existing_map(drive):
+    """identifier -> (pk, candidate_name, sig_id) for the drive's applications."""
+    rows = RecruitmentApplication.objects.filter(drive=drive).values_list(
+        'identifier', 'pk', 'candidate_name', 'sig_id',
+    )
+    return {identifier: (pk, name, sig_id) for identifier, pk, name, sig_id in rows.iterator(chunk_size=READ_CHUNK)}
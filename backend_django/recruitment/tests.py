@@ -1,3 +1,83 @@
-from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from core.form_models import Form, FormResponse
+from core.testing import IsolatedTestCase
+from users.models import Sig, User
+from .models import RecruitmentApplication, RecruitmentDrive
+
+
+class CandidateSyncTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.sig = Sig.objects.create(name='Electronics')
+        self.form = Form.objects.create(title='Induction', created_by=self.admin)
+        self.drive = RecruitmentDrive.objects.create(
+            title='Core 2025', form=self.form, is_active=True,
+            primary_field='Email', candidate_name_field='Name', sig_field='SIG',
+        )
+
+    def respond(self, email, name, sig='electronics'):
+        return FormResponse.objects.create(form=self.form, data={'Email': email, 'Name': name, 'SIG': sig})
+
+    def sync(self, mode=None):
+        data = {'mode': mode} if mode else {}
+        return self.client.post(f'/api/recruitment/drives/{self.drive.pk}/sync_candidates/', data).data
+
+    def test_full_sync_reports_a_diff(self):
+        self.respond('a@x.com', 'Asha')
+        self.respond('b@x.com', 'Ben', sig='Basket weaving')
+        self.respond('', 'Nobody')
+        report = self.sync()
+        self.assertEqual(sorted(report['created']), ['a@x.com', 'b@x.com'])
+        self.assertEqual((report['skipped_no_identifier'], report['unknown_sig']), (1, 1))
+        self.assertEqual(RecruitmentApplication.objects.get(identifier='a@x.com').sig, self.sig)
+
+        self.respond('a@x.com', 'Asha K')  # later responses win
+        report = self.sync()
+        self.assertEqual(report['created'], [])
+        self.assertEqual(report['updated'], [{'identifier': 'a@x.com', 'changes': {'candidate_name': ['Asha', 'Asha K']}}])
+        self.assertEqual((report['unchanged'], report['duplicates']), (1, 1))
+
+    def test_incremental_sync_reads_past_the_watermark(self):
+        first = self.respond('a@x.com', 'Asha')
+        self.assertEqual(self.sync('incremental')['watermark'], first.pk)
+
+        second = self.respond('b@x.com', 'Ben')
+        report = self.sync('incremental')
+        self.assertEqual((report['processed'], report['created']), (1, ['b@x.com']))
+
+        report = self.sync('incremental')
+        self.assertEqual((report['processed'], report['watermark']), (0, second.pk))
+        self.assertEqual(RecruitmentApplication.objects.filter(drive=self.drive).count(), 2)
+
+    def test_remapping_fields_resets_the_watermark(self):
+        self.respond('a@x.com', 'Asha')
+        self.sync('incremental')
+        self.drive.refresh_from_db()
+        self.assertIsNotNone(self.drive.last_synced_response_id)
+
+        self.drive.title = 'Core 2025 (extended)'
+        self.drive.save()
+        self.assertIsNotNone(self.drive.last_synced_response_id)
+
+        self.drive.primary_field = 'Name'
+        self.drive.save(update_fields=['primary_field'])
+        self.drive.refresh_from_db()
+        self.assertIsNone(self.drive.last_synced_response_id)
+        self.assertEqual(self.sync('incremental')['created'], ['Asha'])
+
+    def test_sync_invalidates_the_public_drive(self):
+        anonymous = APIClient()
+        url = '/api/recruitment/drives/active_public/'
+        self.assertEqual(anonymous.get(url).data['applications_count'], 0)
+        self.assertEqual(anonymous.get(url)['X-Cache'], 'HIT')
+
+        self.respond('a@x.com', 'Asha')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sync()
+        response = anonymous.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['applications_count'], 1)
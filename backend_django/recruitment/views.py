@@ -6,10 +6,15 @@ from .serializers import RecruitmentDriveSerializer, TimelineEventSerializer, Re
 from django.db import transaction
 from datetime import timedelta
 from django.utils.dateparse import parse_datetime
+from core.caching import cached_response
+from core.conditional import ConditionalGetMixin
 
-class RecruitmentDriveViewSet(viewsets.ModelViewSet):
+class RecruitmentDriveViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = RecruitmentDrive.objects.all().order_by('-created_at')
     serializer_class = RecruitmentDriveSerializer
+    conditional_namespaces = ('recruitment',)
+    conditional_timestamp_field = 'updated_at'
+    conditional_actions = ('list', 'retrieve', 'active_public')
     # permission_classes = [GlobalPermission] -> Moved to get_permissions
 
     def get_permissions(self):
@@ -19,6 +24,7 @@ class RecruitmentDriveViewSet(viewsets.ModelViewSet):
         return [GlobalPermission()]
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    @cached_response('recruitment', shared=True)
     def active_public(self, request):
         """Public endpoint to get the current active recruitment drive"""
         drive = RecruitmentDrive.objects.filter(is_active=True, is_public=True).prefetch_related('timeline', 'assignments', 'panels__slots').first()
@@ -28,56 +34,25 @@ class RecruitmentDriveViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def sync_candidates(self, request, pk=None):
-        """Sync candidates from the linked Form based on configured fields"""
+        """
+        Sync candidates from the linked Form based on configured fields.
+        Pass mode=incremental (query or body) to only import responses
+        submitted since the last sync.
+        """
         drive = self.get_object()
         if not drive.form:
              return Response({"error": "No form linked to this drive."}, status=400)
         
         if not drive.primary_field:
              return Response({"error": "Primary field (Identifier) not configured."}, status=400)
-             
-        from core.form_models import FormResponse
-        from users.models import Sig
-        
-        responses = FormResponse.objects.filter(form=drive.form)
-        count = 0
-        updated = 0
-        
-        # Pre-fetch SIGs for lookup
-        # mapping lowercase name to ID
-        sigs_map = {s.name.lower(): s for s in Sig.objects.all()}
-        
-        for resp in responses:
-            data = resp.data
-            identifier = data.get(drive.primary_field)
-            if not identifier:
-                continue
-                
-            candidate_name = ""
-            if drive.candidate_name_field:
-                 candidate_name = data.get(drive.candidate_name_field, "")
-            
-            sig_obj = None
-            if drive.sig_field:
-                 sig_val = data.get(drive.sig_field, "")
-                 if sig_val and isinstance(sig_val, str):
-                      sig_obj = sigs_map.get(sig_val.strip().lower())
-            
-            # Create or Update Application
-            app, created = RecruitmentApplication.objects.update_or_create(
-                drive=drive,
-                identifier=identifier,
-                defaults={
-                    'candidate_name': candidate_name,
-                    'sig': sig_obj
-                }
-            )
-            if created:
-                count += 1
-            else:
-                updated += 1
-                
-        return Response({"message": f"Synced successfully. Created {count}, Updated {updated}."})
+
+        from .sync import sync_candidates
+        mode = request.query_params.get('mode') or request.data.get('mode')
+        report = sync_candidates(drive, incremental=(mode == 'incremental'))
+
+        created, updated = len(report['created']), len(report['updated'])
+        report['message'] = f"Synced successfully. Created {created}, Updated {updated}, Unchanged {report['unchanged']}."
+        return Response(report)
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
     def submit_assessment(self, request):
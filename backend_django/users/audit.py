@@ -0,0 +1,99 @@
+"""
+Buffered audit log writer.
+
+record() only appends to an in-process buffer; a background thread writes
+the buffer with bulk_create once it reaches AUDIT_LOG_FLUSH_SIZE events or
+every AUDIT_LOG_FLUSH_INTERVAL seconds, whichever comes first.
+
+If a flush fails, or the buffer outgrows AUDIT_LOG_MAX_BUFFER because the
+database is not keeping up, events go to an append-only JSON-lines spool
+file instead. The spool is replayed into the database on the next
+successful flush. Events are only dropped when even the spool write fails.
+
+An atexit hook flushes whatever is still buffered on shutdown. Set
+AUDIT_LOG_ASYNC = False to write synchronously (tests, one-off scripts);
+the spool is then replayed after the next successful write. The buffering
+itself lives in core/buffering.py.
+"""
+import atexit
+import json
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.buffering import BufferedWriter
+
+logger = logging.getLogger(__name__)
+
+
+def format_details(details, request=None):
+    """Normalise details to a JSON object string."""
+    if details in (None, ""):
+        payload = {}
+    elif isinstance(details, dict):
+        payload = dict(details)
+    elif isinstance(details, (list, tuple)):
+        payload = {'items': list(details)}
+    else:
+        payload = {'message': str(details)}
+    if request is not None:
+        payload.setdefault('method', request.method)
+        payload.setdefault('path', request.path)
+    return json.dumps(payload, cls=DjangoJSONEncoder) if payload else ""
+
+
+class AuditWriter(BufferedWriter):
+    setting_prefix = 'AUDIT_LOG'
+    thread_name = 'audit-writer'
+    spool_name = 'audit_spool.jsonl'
+
+    def record(self, event_type, target, actor_id=None, ip_address=None, details="", success=True):
+        self.add({
+            'event_type': event_type,
+            'actor_id': actor_id,
+            'target': str(target)[:255],
+            'ip_address': ip_address,
+            'details': details,
+            'success': success,
+            'created_at': timezone.now(),
+        })
+
+    def write_batch(self, batch):
+        from django.db import IntegrityError
+        from .models import AuditLog, User
+        size = self.setting('FLUSH_SIZE', self.flush_size)
+        try:
+            AuditLog.objects.bulk_create([AuditLog(**event) for event in batch], batch_size=size)
+        except IntegrityError:
+            # An actor was deleted between record() and flush: keep the events, lose the link
+            actor_ids = {e['actor_id'] for e in batch if e['actor_id'] is not None}
+            alive = set(User.objects.filter(pk__in=actor_ids).values_list('pk', flat=True))
+            for event in batch:
+                if event['actor_id'] not in alive:
+                    event['actor_id'] = None
+            AuditLog.objects.bulk_create([AuditLog(**event) for event in batch], batch_size=size)
+
+    def decode(self, event):
+        event['created_at'] = parse_datetime(event['created_at'])
+        return event
+
+
+writer = AuditWriter()
+atexit.register(writer.shutdown)
+
+
+def record_event(event_type, target, actor=None, ip_address=None, details="", success=True, request=None):
+    """Queue an audit event. Never raises into the caller."""
+    try:
+        writer.record(
+            event_type, target,
+            actor_id=actor.pk if actor is not None else None,
+            ip_address=ip_address,
+            details=format_details(details, request),
+            success=success,
+        )
+    except Exception:
+        logger.exception("Could not record audit event %s", event_type)
+        writer._count('dropped')
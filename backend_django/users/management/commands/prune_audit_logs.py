@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from users.retention import purge_audit_logs
+
+
+class Command(BaseCommand):
+    help = "Delete audit logs older than the retention window, in batches, optionally archiving them first."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'AUDIT_LOG_RETENTION_DAYS', 365),
+                            help="Keep this many days of logs (default: AUDIT_LOG_RETENTION_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--archive-dir', help="Write purged rows to monthly audit-YYYY-MM.jsonl.gz files here first")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--days and --batch-size must be positive")
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        result = purge_audit_logs(
+            cutoff,
+            batch_size=options['batch_size'],
+            archive_dir=options['archive_dir'],
+            dry_run=options['dry_run'],
+            pause=options['pause'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f"{result['matched']} logs older than {cutoff:%Y-%m-%d} would be deleted")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted {result['deleted']} logs older than {cutoff:%Y-%m-%d} in {result['batches']} batches"
+            ))
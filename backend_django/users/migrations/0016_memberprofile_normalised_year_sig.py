@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from users.models import parse_year
+
+
+def backfill(apps, schema_editor):
+    MemberProfile = apps.get_model('users', 'MemberProfile')
+    Sig = apps.get_model('users', 'Sig')
+    sig_ids = {name.lower(): pk for pk, name in Sig.objects.values_list('id', 'name')}
+    batch = []
+    for profile in MemberProfile.objects.only('id', 'year', 'sig').iterator(chunk_size=2000):
+        profile.year_number = parse_year(profile.year)
+        profile.primary_sig_id = sig_ids.get((profile.sig or '').lower())
+        batch.append(profile)
+    MemberProfile.objects.bulk_update(batch, ['year_number', 'primary_sig'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_auditlog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memberprofile',
+            name='primary_sig',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='primary_members', to='users.sig'),
+        ),
+        migrations.AddField(
+            model_name='memberprofile',
+            name='year_number',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from users.models import parse_year
+
+
+def reparse(apps, schema_editor):
+    # 0016 and save() first took the first digit anywhere ('2023 batch' -> 2)
+    MemberProfile = apps.get_model('users', 'MemberProfile')
+    batch = []
+    for profile in MemberProfile.objects.only('id', 'year', 'year_number').iterator(chunk_size=2000):
+        year_number = parse_year(profile.year)
+        if year_number != profile.year_number:
+            profile.year_number = year_number
+            batch.append(profile)
+    MemberProfile.objects.bulk_update(batch, ['year_number'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_memberprofile_normalised_year_sig'),
+    ]
+
+    operations = [
+        migrations.RunPython(reparse, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
+import re
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 # 1. Dynamic SIG Model
 class Sig(models.Model):
@@ -81,6 +83,17 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username}"
 
+# A standalone 1-5, optionally with an ordinal suffix: '2nd Year', 'Year 3',
+# '4'. Numbers inside longer ones ('2023 batch', '10th sem') don't count.
+YEAR_PATTERN = re.compile(r'\b([1-5])(?:st|nd|rd|th)?\b', re.IGNORECASE)
+
+
+def parse_year(value):
+    """'2nd Year' -> 2, '3' -> 3; '', '2023 batch', '10th sem' -> None"""
+    match = YEAR_PATTERN.search(str(value or ''))
+    return int(match.group(1)) if match else None
+
+
 # 5. Member Profile
 class MemberProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile', null=True, blank=True)
@@ -112,12 +125,30 @@ class MemberProfile(models.Model):
 
     custom_fields = models.JSONField(default=dict, blank=True)
 
+    # Normalised copies of `year` / `sig` for set-based filtering (attendance
+    # population etc.). Derived in save(); not edited directly.
+    year_number = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True, editable=False)
+    primary_sig = models.ForeignKey('Sig', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='primary_members')
+
     class Meta:
         ordering = ['order', 'full_name']
 
     def __str__(self):
         return f"{self.full_name}"
 
+    # Also used by the 0016 backfill and attendance target years
+    parse_year = staticmethod(parse_year)
+
+    def save(self, *args, **kwargs):
+        self.year_number = self.parse_year(self.year)
+        self.primary_sig_id = (
+            Sig.objects.filter(name__iexact=self.sig).values_list('id', flat=True).first() if self.sig else None
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'year_number', 'primary_sig'}
+        super().save(*args, **kwargs)
+
 # 6. Audit Log (NEW)
 class AuditLog(models.Model):
     event_type = models.CharField(max_length=50) # e.g. "USER_MODIFIED", "ROLE_CHANGED"
@@ -126,10 +157,16 @@ class AuditLog(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     details = models.TextField(blank=True) # JSON or text summary
     success = models.BooleanField(default=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered writes keep the time the event happened
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='auditlog_created_idx'),
+            models.Index(fields=['event_type', 'created_at'], name='auditlog_event_created_idx'),
+            models.Index(fields=['actor', 'created_at'], name='auditlog_actor_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.event_type} by {self.actor} at {self.created_at}"
@@ -1,4 +1,157 @@
+from django.core.cache import cache
 from rest_framework import permissions
+from core.versioning import get_versions, bump_version
+
+# Every boolean permission flag on Role
+PERMISSION_FLAGS = (
+    'can_manage_users',
+    'can_manage_projects',
+    'can_manage_events',
+    'can_manage_team',
+    'can_manage_gallery',
+    'can_manage_announcements',
+    'can_manage_security',
+    'can_manage_messages',
+    'can_manage_sponsorship',
+    'can_manage_forms',
+    'can_manage_content',
+)
+
+PERMISSIONS_VERSION_KEY = 'perms:version'
+PERMISSION_CACHE_TIMEOUT = 60 * 60
+
+
+class PermissionSet:
+    """
+    Compiled view of everything a user is allowed to do: the union of the
+    flags on their directly assigned Roles and on the Role linked to their
+    Structure Position. Built once, then served from cache.
+    """
+    __slots__ = ('flags', 'role_names')
+
+    def __init__(self, flags=(), role_names=()):
+        self.flags = frozenset(flags)
+        self.role_names = frozenset(role_names)
+
+    def has(self, flag):
+        return flag in self.flags
+
+    @property
+    def is_web_lead(self):
+        return 'WEB_LEAD' in self.role_names
+
+    def as_list(self):
+        """Flag list as exposed to the frontend."""
+        perms = set(self.flags)
+        # Virtual Sudo Permission
+        if self.is_web_lead or 'can_manage_security' in perms:
+            perms.add('can_manage_everything')
+        return sorted(perms)
+
+    def __repr__(self):
+        return f"<PermissionSet {sorted(self.flags)}>"
+
+
+EMPTY_PERMISSION_SET = PermissionSet()
+
+
+def _user_version_key(user_id):
+    return f'perms:user:{user_id}'
+
+
+def _set_key(user_id):
+    return f'perms:set:{user_id}'
+
+
+def _position_name(user):
+    profile = getattr(user, 'profile', None)
+    return profile.position if profile else ''
+
+
+def _build_permission_set(roles):
+    flags = set()
+    for r in roles:
+        flags.update(f for f in PERMISSION_FLAGS if getattr(r, f))
+    return PermissionSet(flags, {r.name for r in roles})
+
+
+def compile_permission_set(user):
+    """Build a PermissionSet straight from the database (no caching)."""
+    from .models import TeamPosition
+
+    roles = list(user.user_roles.all())
+
+    # Role linked to the user's Position (legacy string match on name)
+    pos_name = _position_name(user)
+    if pos_name:
+        pos = TeamPosition.objects.filter(name__iexact=pos_name).select_related('role_link').first()
+        if pos and pos.role_link:
+            roles.append(pos.role_link)
+
+    return _build_permission_set(roles)
+
+
+def prime_permission_sets(users):
+    """
+    Compile PermissionSets for a whole page of users with a single
+    TeamPosition query. `user_roles` and `profile` should already be
+    prefetched; the result is memoised on each instance.
+    """
+    from .models import TeamPosition
+
+    position_roles = {}
+    for pos in TeamPosition.objects.filter(role_link__isnull=False).select_related('role_link'):
+        # Same precedence as .filter(name__iexact=...).first()
+        position_roles.setdefault(pos.name.lower(), pos.role_link)
+
+    for user in users:
+        roles = list(user.user_roles.all())
+        linked = position_roles.get(_position_name(user).lower())
+        if linked:
+            roles.append(linked)
+        user._permission_set = _build_permission_set(roles)
+
+
+def get_permission_set(user):
+    """
+    PermissionSet for `user`, memoised on the instance for the rest of the
+    request and cached across requests. Cache entries are stamped with a
+    global version (bumped on Role/TeamPosition changes) and a per-user
+    version (bumped on role assignment or position changes).
+    """
+    if not user or not user.is_authenticated:
+        return EMPTY_PERMISSION_SET
+
+    perm_set = getattr(user, '_permission_set', None)
+    if perm_set is not None:
+        return perm_set
+
+    user_key = _user_version_key(user.pk)
+    versions = get_versions(PERMISSIONS_VERSION_KEY, user_key)
+    stamp = (versions[PERMISSIONS_VERSION_KEY], versions[user_key])
+
+    cached = cache.get(_set_key(user.pk))
+    if cached and cached[0] == stamp:
+        perm_set = PermissionSet(cached[1], cached[2])
+    else:
+        perm_set = compile_permission_set(user)
+        cache.set(
+            _set_key(user.pk),
+            (stamp, sorted(perm_set.flags), sorted(perm_set.role_names)),
+            PERMISSION_CACHE_TIMEOUT
+        )
+
+    user._permission_set = perm_set
+    return perm_set
+
+
+def invalidate_user_permissions(user_id):
+    bump_version(_user_version_key(user_id))
+
+
+def invalidate_all_permissions():
+    bump_version(PERMISSIONS_VERSION_KEY)
+
 
 class GlobalPermission(permissions.BasePermission):
     """
@@ -58,27 +211,12 @@ class GlobalPermission(permissions.BasePermission):
         if user.is_superuser:
             return True
 
-        # Helper: check for specific flag across all sources
-        def check_flag(flag_name):
-            # A. Check explicitly assigned roles
-            if user.user_roles.filter(**{flag_name: True}).exists():
-                return True
-            
-            # B. Check Role linked to user's Position (Structure Management)
-            try:
-                from .models import TeamPosition
-                profile = getattr(user, 'profile', None)
-                pos_name = getattr(profile, 'position', None) if profile else None
-                if pos_name:
-                    pos = TeamPosition.objects.filter(name__iexact=pos_name).first()
-                    if pos and pos.role_link and getattr(pos.role_link, flag_name):
-                        return True
-            except: pass
-            
-            return False
+        # Flags from explicitly assigned roles AND the Role linked to the
+        # user's Position (Structure Management), compiled once per user
+        perms = get_permission_set(user)
             
         # 3. Web Lead / Security Manager check (Full Access)
-        if check_flag('can_manage_security'):
+        if perms.has('can_manage_security'):
             return True
 
         # 4. Shared Visibility Check removed to enforce Strict RBAC
@@ -108,6 +246,7 @@ class GlobalPermission(permissions.BasePermission):
             'EventViewSet': 'can_manage_events',
             'AttendanceSessionViewSet': 'can_manage_events',
             'AttendanceRecordViewSet': 'can_manage_events',
+            'AttendanceAnalyticsViewSet': 'can_manage_events',
             'AnnouncementViewSet': 'can_manage_announcements',
             'GalleryViewSet': 'can_manage_gallery',
             'SponsorshipViewSet': 'can_manage_sponsorship',
@@ -135,7 +274,7 @@ class GlobalPermission(permissions.BasePermission):
         if not flag:
             return False # Strictly deny unmapped write actions
             
-        if check_flag(flag):
+        if perms.has(flag):
             return True
             
         # 6. 'can_manage_content' Super-flag (Content CMS)
@@ -147,7 +286,7 @@ class GlobalPermission(permissions.BasePermission):
             'can_manage_messages',
             'can_manage_forms'
         ]
-        if flag in content_related_flags and check_flag('can_manage_content'):
+        if flag in content_related_flags and perms.has('can_manage_content'):
             return True
             
         return False
@@ -160,4 +299,4 @@ class IsWebLead(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated: return False
         if request.user.is_superuser: return True
-        return request.user.user_roles.filter(can_manage_security=True).exists()
+        return get_permission_set(request.user).has('can_manage_security')
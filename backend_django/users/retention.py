@@ -0,0 +1,62 @@
+"""
+Audit log retention.
+
+Old rows are removed in bounded batches (oldest first, by primary key) so a
+purge never holds a long lock on the table. Each batch can first be appended
+to a gzip-compressed JSON-lines archive per calendar month
+(audit-YYYY-MM.jsonl.gz). The archive is written before the rows are deleted,
+so an archive failure stops the purge without losing data.
+"""
+import gzip
+import json
+import time
+from pathlib import Path
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import AuditLog
+
+ARCHIVE_FIELDS = ('id', 'event_type', 'actor_id', 'actor__username', 'target', 'ip_address', 'details', 'success', 'created_at')
+
+
+def _archive(rows, archive_dir):
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row['created_at'].strftime('%Y-%m'), []).append(row)
+    for month, month_rows in by_month.items():
+        # Appending adds another gzip member; readers see one continuous stream
+        with gzip.open(Path(archive_dir) / f'audit-{month}.jsonl.gz', 'at', encoding='utf-8') as fh:
+            for row in month_rows:
+                fh.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+
+
+def purge_audit_logs(cutoff, batch_size=5000, archive_dir=None, dry_run=False, pause=0):
+    """Delete (and optionally archive) logs created before `cutoff`. Returns a summary."""
+    if archive_dir:
+        Path(archive_dir).mkdir(parents=True, exist_ok=True)
+
+    old = AuditLog.objects.filter(created_at__lt=cutoff)
+    if dry_run:
+        return {'deleted': 0, 'matched': old.count(), 'batches': 0}
+
+    deleted = batches = 0
+    last_id = 0
+    while True:
+        if archive_dir:
+            rows = list(old.filter(id__gt=last_id).order_by('id').values(*ARCHIVE_FIELDS)[:batch_size])
+            ids = [row['id'] for row in rows]
+        else:
+            ids = list(old.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        if archive_dir:
+            _archive(rows, archive_dir)
+        with transaction.atomic():
+            count, _ = AuditLog.objects.filter(id__in=ids).delete()
+        deleted += count
+        batches += 1
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+    return {'deleted': deleted, 'batches': batches}
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import Prefetch, prefetch_related_objects
 from .models import Role, MemberProfile, Sig, ProfileFieldDefinition, TeamPosition, AuditLog
+from .permissions import get_permission_set, prime_permission_sets
 
 User = get_user_model()
 
@@ -43,6 +46,31 @@ class MemberProfileSerializer(serializers.ModelSerializer):
         model = MemberProfile
         fields = '__all__'
 
+class UserListSerializer(serializers.ListSerializer):
+    """
+    Batch mode for UserSerializer(many=True): loads roles, profiles, SIGs,
+    project memberships and position-linked roles for the whole page in a
+    fixed number of queries instead of several per user.
+    """
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        prefetch_user_details(users)
+        return [self.child.to_representation(u) for u in users]
+
+def prefetch_user_details(users):
+    """Prefetch everything UserSerializer reads for a list of users."""
+    from projects.models import Project
+    project_qs = Project.objects.only('id', 'title')
+    prefetch_related_objects(
+        users,
+        'user_roles',
+        'profile__sigs',
+        # lead_id groups the rows by user; deferring it costs a query per project
+        Prefetch('led_projects', queryset=project_qs.only('id', 'title', 'lead_id')),
+        Prefetch('projects', queryset=project_qs),
+    )
+    prime_permission_sets(users)
+
 class UserSerializer(serializers.ModelSerializer):
     user_roles = RoleSerializer(many=True, read_only=True)
     profile = MemberProfileSerializer(read_only=True)
@@ -52,49 +80,46 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'role', 'user_roles', 'profile', 'is_active', 'permissions', 'projects_info', 'last_login')
+        list_serializer_class = UserListSerializer
 
     def get_projects_info(self, obj):
+        # .all() so prefetched memberships are reused
         return {
-            'led': list(obj.led_projects.values('id', 'title')),
-            'member': list(obj.projects.values('id', 'title'))
+            'led': [{'id': p.id, 'title': p.title} for p in obj.led_projects.all()],
+            'member': [{'id': p.id, 'title': p.title} for p in obj.projects.all()]
         }
 
     def get_permissions(self, obj):
-        perms = set()
-        
-        # 1. Direct Roles
-        for r in obj.user_roles.all():
-            self._add_role_perms(r, perms)
-            
-        # 2. Position-Linked Roles (NEW)
-        try:
-            if hasattr(obj, 'profile') and obj.profile and obj.profile.position:
-                # Try to find Position by name
-                # Ideally user.profile.position would be a ForeignKey, but legacy string support
-                pos = TeamPosition.objects.filter(name__iexact=obj.profile.position).select_related('role_link').first()
-                if pos and pos.role_link:
-                    self._add_role_perms(pos.role_link, perms)
-                    # Add role name to perms for frontend visibility checks
-                    if pos.role_link.name == 'WEB_LEAD': perms.add('can_manage_everything') 
-        except Exception: 
-            pass
-
-        # 3. Virtual Sudo Permission
-        if 'can_manage_security' in perms:
-            perms.add('can_manage_everything')
-
-        return list(perms)
-
-    def _add_role_perms(self, r, perms):
-        if r.can_manage_users: perms.add('can_manage_users')
-        if r.can_manage_projects: perms.add('can_manage_projects')
-        if r.can_manage_events: perms.add('can_manage_events')
-        if r.can_manage_team: perms.add('can_manage_team')
-        if r.can_manage_gallery: perms.add('can_manage_gallery')
-        if r.can_manage_announcements: perms.add('can_manage_announcements')
-        if r.can_manage_security: perms.add('can_manage_security')
-        if r.can_manage_messages: perms.add('can_manage_messages')
-        if r.can_manage_sponsorship: perms.add('can_manage_sponsorship')
-        if r.can_manage_forms: perms.add('can_manage_forms')
-        if r.can_manage_content: perms.add('can_manage_content')
-        if r.name == 'WEB_LEAD': perms.add('can_manage_everything')  
+        # Direct Roles + Position-Linked Role, compiled once per user
+        return get_permission_set(obj).as_list()
+
+# Nested representations
+
+class MemberSummarySerializer(serializers.ModelSerializer):
+    sigs = SigSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MemberProfile
+        fields = ('id', 'full_name', 'roll_number', 'position', 'sig', 'sigs', 'year', 'image', 'is_alumni')
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """
+    Lightweight user representation for nesting inside other resources
+    (project members, message authors, form respondents...). Only needs
+    `profile` and `profile__sigs` loaded, which parent viewsets prefetch.
+    """
+    profile = MemberSummarySerializer(read_only=True)
+
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'email', 'is_active', 'last_login', 'profile')
+
+def user_summary_prefetch(*paths):
+    """
+    `prefetch_related` lookups needed to render UserSummarySerializer for
+    the given user relations, e.g. user_summary_prefetch('author').
+    """
+    lookups = []
+    for path in paths:
+        lookups += [f'{path}__profile', f'{path}__profile__sigs']
+    return lookups
@@ -1,26 +1,114 @@
 from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import AuditLog
+from .models import Role, TeamPosition, MemberProfile, User, Sig
+from core.caching import invalidate_on
+from .audit import record_event
+from .permissions import invalidate_user_permissions, invalidate_all_permissions
+from .team import refresh_member, invalidate_team_snapshot
 
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
-    ip = request.META.get('REMOTE_ADDR')
-    AuditLog.objects.create(
-        event_type="USER_LOGIN",
-        actor=user,
-        target=f"User Login: {user.username}",
-        ip_address=ip,
-        details="User logged in successfully"
+    record_event(
+        "USER_LOGIN", f"User Login: {user.username}", actor=user,
+        ip_address=request.META.get('REMOTE_ADDR') if request else None,
+        details="User logged in successfully",
     )
 
 @receiver(user_logged_out)
 def log_user_logout(sender, request, user, **kwargs):
     if user:
-        ip = request.META.get('REMOTE_ADDR')
-        AuditLog.objects.create(
-            event_type="USER_LOGOUT",
-            actor=user,
-            target=f"User Logout: {user.username}",
-            ip_address=ip,
-            details="User logged out successfully"
+        record_event(
+            "USER_LOGOUT", f"User Logout: {user.username}", actor=user,
+            ip_address=request.META.get('REMOTE_ADDR') if request else None,
+            details="User logged out successfully",
         )
+
+# --- PERMISSION SET INVALIDATION ---
+
+def _invalidate_user_permissions(user_id):
+    """
+    Bump once the transaction commits. Bumping inside it would let a request
+    recompile the set from the old rows and cache it under the new version.
+
+    The bump is a plain incr, which FileBasedCache runs as a read and a write
+    rather than atomically: two bumps racing across processes may land as
+    one, and a set compiled between them stays cached until
+    PERMISSION_CACHE_TIMEOUT.
+    """
+    transaction.on_commit(lambda: invalidate_user_permissions(user_id))
+
+def _invalidate_all_permissions():
+    # Same after-commit, non-atomic bump as above, on the global version
+    transaction.on_commit(invalidate_all_permissions)
+
+@receiver([post_save, post_delete], sender=Role)
+@receiver([post_save, post_delete], sender=TeamPosition)
+def invalidate_on_role_change(sender, **kwargs):
+    # Flags or position links changed: every compiled set may be stale
+    _invalidate_all_permissions()
+
+@receiver(m2m_changed, sender=User.user_roles.through)
+def invalidate_on_role_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        _invalidate_user_permissions(instance.pk)
+    elif pk_set:
+        # role.users.add(...) / remove(...)
+        for user_id in pk_set:
+            _invalidate_user_permissions(user_id)
+    else:
+        # role.users.clear(): affected users are unknown after the fact
+        _invalidate_all_permissions()
+
+@receiver([post_save, post_delete], sender=MemberProfile)
+def invalidate_on_profile_change(sender, instance, **kwargs):
+    if instance.user_id:
+        _invalidate_user_permissions(instance.user_id)
+
+# --- NORMALISED PROFILE SIG ---
+
+@receiver(post_save, sender=Sig)
+def link_profiles_to_sig(sender, instance, **kwargs):
+    # Profiles naming a SIG before it existed (or after a rename) get linked now
+    MemberProfile.objects.filter(sig__iexact=instance.name).exclude(primary_sig=instance).update(primary_sig=instance)
+
+# --- PUBLIC PAGE CACHES (core/caching.py) ---
+
+# Events and forms nest user summaries. last_login alone (simplejwt, on
+# every token issue) is left to the cache timeout.
+invalidate_on(('events', 'forms'), User, MemberProfile, MemberProfile.sigs.through, Sig, ignore_fields=('last_login',))
+
+# --- PUBLIC TEAM SNAPSHOT (users/team.py) ---
+
+def _refresh_team_member(user_id):
+    transaction.on_commit(lambda: refresh_member(user_id))
+
+@receiver([post_save, post_delete], sender=MemberProfile)
+def refresh_team_on_profile_change(sender, instance, **kwargs):
+    if instance.user_id:
+        _refresh_team_member(instance.user_id)
+
+@receiver([post_save, post_delete], sender=User)
+def refresh_team_on_user_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    _refresh_team_member(instance.pk)
+
+@receiver(m2m_changed, sender=MemberProfile.sigs.through)
+def refresh_team_on_profile_sigs(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse and instance.user_id:
+        _refresh_team_member(instance.user_id)
+    else:
+        # sig.members.add(...) etc.
+        transaction.on_commit(invalidate_team_snapshot)
+
+@receiver([post_save, post_delete], sender=Sig)
+@receiver([post_save, post_delete], sender=TeamPosition)
+def rebuild_team_on_structure_change(sender, **kwargs):
+    # Section order or member ranks moved
+    transaction.on_commit(invalidate_team_snapshot)
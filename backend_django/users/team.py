@@ -0,0 +1,151 @@
+"""
+Public team page snapshot.
+
+PublicTeamView serves one pre-rendered JSON blob per type ('current' /
+'alumni'): compact member cards keyed by user id, plus SIG sections listing
+card ids. Sections follow Sig.order (profile SIG names that match no Sig,
+and "General Members", come after, alphabetically); members within a
+section follow TeamPosition.rank, then profile order and name. The blob and
+its ETag are cached, so clients revalidate with If-None-Match.
+
+Both snapshots are stamped with one version counter. users/signals.py
+keeps them current: a profile or account change bumps the version and
+re-renders just that member's card, patching it into the stored snapshots
+(moving it between current and alumni if needed). SIG and position
+changes, which reorder everything, only bump the version; the next request
+rebuilds in four queries. A patch is only applied on top of a snapshot of
+the immediately preceding version, so a rebuild that raced with a write
+is never kept.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from core.conditional import make_etag
+from core.versioning import get_version, bump_version
+from .models import MemberProfile, Sig, TeamPosition
+
+TYPES = ('current', 'alumni')
+GENERAL_SECTION = 'General Members'
+UNRANKED = 10 ** 6  # positions without a TeamPosition sort last
+SNAPSHOT_TIMEOUT = 60 * 60
+CACHE_CONTROL = 'public, max-age=60'
+
+VERSION_KEY = 'team:snapshot-version'
+
+CARD_FIELDS = (
+    'full_name', 'position', 'year', 'description',
+    'linkedin_url', 'github_url', 'instagram_url',
+)
+
+
+def _snapshot_key(team_type):
+    return f'team:snapshot:{team_type}'
+
+
+def _state_key(team_type):
+    return f'team:snapshot-state:{team_type}'
+
+
+def invalidate_team_snapshot():
+    bump_version(VERSION_KEY)
+
+
+def _load_members(**filters):
+    """{user_id: (team type, profile order, section names, card)} for public members."""
+    rows = list(
+        MemberProfile.objects.filter(user__isnull=False, user__is_active=True, is_public=True, **filters)
+        .values('id', 'user_id', 'user__username', 'sig', 'order', 'is_alumni', 'image', *CARD_FIELDS)
+    )
+    if not rows:
+        return {}
+
+    extra_sigs = defaultdict(list)
+    for profile_id, name in (
+        MemberProfile.sigs.through.objects.filter(memberprofile_id__in=[r['id'] for r in rows])
+        .order_by('sig__order', 'sig__name').values_list('memberprofile_id', 'sig__name')
+    ):
+        extra_sigs[profile_id].append(name)
+
+    storage = MemberProfile._meta.get_field('image').storage
+    members = {}
+    for row in rows:
+        sections = [row['sig']] if row['sig'] else []
+        sections += [name for name in extra_sigs[row['id']] if name != row['sig']]
+        card = {'id': row['user_id'], 'username': row['user__username']}
+        card.update((field, row[field]) for field in CARD_FIELDS)
+        card['image'] = storage.url(row['image']) if row['image'] else None
+        team_type = 'alumni' if row['is_alumni'] else 'current'
+        members[row['user_id']] = (team_type, row['order'], sections or [GENERAL_SECTION], card)
+    return members
+
+
+def build_state(team_type):
+    return {
+        'type': team_type,
+        'ranks': {name.lower(): rank for name, rank in TeamPosition.objects.values_list('name', 'rank')},
+        'sig_order': {name: i for i, name in enumerate(Sig.objects.order_by('order', 'name').values_list('name', flat=True))},
+        'members': _load_members(is_alumni=(team_type == 'alumni')),
+    }
+
+
+def render(state):
+    """(etag, JSON bytes) for a snapshot state."""
+    ranks, sig_order, members = state['ranks'], state['sig_order'], state['members']
+
+    def member_key(user_id):
+        _, order, _, card = members[user_id]
+        return (ranks.get(card['position'].strip().lower(), UNRANKED), order, card['full_name'].lower(), user_id)
+
+    def section_key(name):
+        return (0, sig_order[name], '') if name in sig_order else (1, 0, name.lower())
+
+    sections = defaultdict(list)
+    for user_id, (_, _, names, _) in members.items():
+        for name in names:
+            sections[name].append(user_id)
+
+    payload = {
+        'type': state['type'],
+        'members': {user_id: card for user_id, (_, _, _, card) in members.items()},
+        'sections': [
+            {'sig': name, 'members': sorted(sections[name], key=member_key)}
+            for name in sorted(sections, key=section_key)
+        ],
+    }
+    body = JSONRenderer().render(payload)
+    return make_etag(body), body
+
+
+def _store(team_type, version, state):
+    etag, body = render(state)
+    cache.set_many({
+        _snapshot_key(team_type): (version, etag, body),
+        _state_key(team_type): (version, state),
+    }, SNAPSHOT_TIMEOUT)
+    return etag, body
+
+
+def team_snapshot(team_type):
+    """(etag, JSON bytes) of the public team page for 'current' or 'alumni'."""
+    version = get_version(VERSION_KEY)
+    cached = cache.get(_snapshot_key(team_type))
+    if cached and cached[0] == version:
+        return cached[1], cached[2]
+    return _store(team_type, version, build_state(team_type))
+
+
+def refresh_member(user_id):
+    """Re-render one member's card into the stored snapshots (call after commit)."""
+    version = bump_version(VERSION_KEY)
+    member = _load_members(user_id=user_id).get(user_id)
+    for team_type in TYPES:
+        cached = cache.get(_state_key(team_type))
+        if not cached or cached[0] != version - 1:
+            continue  # missing, or another write got in between: rebuilt on next read
+        state = cached[1]
+        state['members'].pop(user_id, None)
+        if member and member[0] == team_type:
+            state['members'][user_id] = member
+        _store(team_type, version, state)
@@ -1,3 +1,345 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.testing import IsolatedTestCase, read_csv
+from projects.models import Project
+from .audit import AuditWriter, record_event
+from .models import AuditLog, MemberProfile, Role, Sig, TeamPosition, User
+from .permissions import get_permission_set
+
+
+def make_member(username, sig=None, role=None, project=None, **profile):
+    user = User.objects.create(username=username, email=f'{username}@example.com')
+    member = MemberProfile.objects.create(user=user, full_name=username.title(), **profile)
+    if sig:
+        member.sigs.add(sig)
+    if role:
+        user.user_roles.add(role)
+    if project:
+        project.members.add(user)
+    return user
+
+
+class UserListQueryTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.sig = Sig.objects.create(name='Electronics')
+        self.role = Role.objects.create(name='Coordinator', can_manage_users=True)
+        self.project = Project.objects.create(title='Rover', lead=self.admin)
+
+    def add_members(self, start, count):
+        for i in range(start, start + count):
+            make_member(f'member{i}', sig=self.sig, role=self.role, project=self.project)
+
+    def test_list_query_count_does_not_grow_with_users(self):
+        self.add_members(0, 3)
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/management/')
+        self.assertEqual(response.status_code, 200)
+
+        self.add_members(3, 5)
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/management/')
+        self.assertEqual(len(response.data), 9)
+        member = next(u for u in response.data if u['username'] == 'member0')
+        self.assertEqual(member['projects_info']['member'], [{'id': self.project.id, 'title': 'Rover'}])
+        self.assertEqual([s['name'] for s in member['profile']['sigs']], ['Electronics'])
+        self.assertIn('can_manage_users', member['permissions'])
+
+
+class PermissionSetTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.role = Role.objects.create(name='Editor', can_manage_content=True)
+        self.user = make_member('member', role=self.role)
+
+    def permissions(self):
+        # A fresh instance, so nothing is memoised from an earlier call
+        return get_permission_set(User.objects.get(pk=self.user.pk))
+
+    def test_compiled_set_is_served_from_cache(self):
+        self.assertTrue(self.permissions().has('can_manage_content'))
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(get_permission_set(user).has('can_manage_content'))
+
+    def test_role_assignment_and_flag_changes_invalidate(self):
+        self.assertFalse(self.permissions().has('can_manage_forms'))
+        with self.captureOnCommitCallbacks(execute=True):
+            forms = Role.objects.create(name='Forms')
+            self.user.user_roles.add(forms)
+        self.assertFalse(self.permissions().has('can_manage_forms'))
+
+        forms.can_manage_forms = True
+        with self.captureOnCommitCallbacks(execute=True):
+            forms.save()
+        self.assertTrue(self.permissions().has('can_manage_forms'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_roles.remove(forms)
+        self.assertFalse(self.permissions().has('can_manage_forms'))
+
+    def test_versions_are_bumped_after_commit(self):
+        self.assertFalse(self.permissions().has('can_manage_forms'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_roles.add(Role.objects.create(name='Forms', can_manage_forms=True))
+            # Still the old set until the transaction commits
+            self.assertFalse(self.permissions().has('can_manage_forms'))
+        self.assertTrue(self.permissions().has('can_manage_forms'))
+
+    def test_position_linked_role_counts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamPosition.objects.create(name='Treasurer', rank=3, role_link=Role.objects.create(name='Finance', can_manage_sponsorship=True))
+        self.assertFalse(self.permissions().has('can_manage_sponsorship'))
+
+        profile = self.user.profile
+        profile.position = 'treasurer'
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertTrue(self.permissions().has('can_manage_sponsorship'))
+
+    def test_web_lead_gets_everything(self):
+        self.user.user_roles.add(Role.objects.create(name='WEB_LEAD'))
+        self.assertIn('can_manage_everything', self.permissions().as_list())
+
+
+class ExportTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_user_export_streams_in_one_query(self):
+        for i in range(3):
+            make_member(f'member{i}', position='Treasurer' if i == 0 else '')
+        User.objects.filter(username='member2').update(is_active=False)
+        response = self.client.get('/api/management/export_csv/', {'is_active': 'true'})
+        with self.assertNumQueries(1):
+            rows = read_csv(response)
+        self.assertEqual(rows[0][:3], ['Username', 'Email', 'Full Name'])
+        self.assertEqual([r[0] for r in rows[1:]], ['admin', 'member0', 'member1'])
+        self.assertEqual(rows[2][4], 'Treasurer')
+
+    def test_audit_export_filters_by_event_type(self):
+        AuditLog.objects.create(event_type='USER_MODIFIED', actor=self.admin, target='member0')
+        AuditLog.objects.create(event_type='LOGIN_FAILED', target='member1')
+        response = self.client.get('/api/audit-logs/export_csv/', {'event_type': 'LOGIN_FAILED', 'gzip': 'true'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="audit_logs.csv.gz"')
+        with self.assertNumQueries(1):
+            rows = read_csv(response)
+        self.assertEqual(rows[1][:3], ['LOGIN_FAILED', 'System/Proton', 'member1'])
+        self.assertEqual(len(rows), 2)
+
+
+class AuditWriterTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.writer = AuditWriter()
+        self.actor = make_member('actor')
+
+    def record(self, event_type='USER_MODIFIED', actor_id=None):
+        self.writer.record(event_type, 'member0', actor_id=actor_id or self.actor.pk)
+
+    def test_record_event_writes_json_details(self):
+        record_event('ROLE_CHANGED', 'member0', actor=self.actor, details='promoted')
+        log = AuditLog.objects.get()
+        self.assertEqual((log.event_type, log.actor), ('ROLE_CHANGED', self.actor))
+        self.assertEqual(json.loads(log.details), {'message': 'promoted'})
+
+    def test_failed_write_is_spooled_and_replayed(self):
+        failing = mock.patch.object(self.writer, 'write_batch', side_effect=RuntimeError('db down'))
+        with failing, self.assertLogs('core.buffering', 'ERROR'):
+            self.record()
+        self.assertFalse(AuditLog.objects.exists())
+        self.assertTrue(self.writer._spool_path().exists())
+
+        self.record('LOGIN')
+        self.assertEqual(sorted(AuditLog.objects.values_list('event_type', flat=True)), ['LOGIN', 'USER_MODIFIED'])
+        self.assertFalse(self.writer._spool_path().exists())
+        stats = self.writer.stats()
+        self.assertEqual((stats['failed_flushes'], stats['spooled'], stats['replayed']), (1, 1, 1))
+
+    @override_settings(AUDIT_LOG_ASYNC=True, AUDIT_LOG_MAX_BUFFER=2)
+    def test_overflowing_buffer_spills_to_the_spool(self):
+        # No background thread: the test flushes by hand
+        self.writer._ensure_thread = lambda: None
+        for _ in range(3):
+            self.record()
+        self.assertEqual(self.writer.stats()['spooled'], 3)
+        self.assertFalse(AuditLog.objects.exists())
+
+        self.record()
+        self.writer.flush()  # writes the buffered event, then replays the spool
+        self.assertEqual(AuditLog.objects.count(), 4)
+        self.assertEqual(self.writer.stats()['buffered'], 0)
+
+    def test_writer_stats_are_for_user_managers(self):
+        url = '/api/audit-logs/writer_stats/'
+        client = APIClient()
+        client.force_authenticate(self.actor)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        client.force_authenticate(make_member('manager', role=Role.objects.create(name='Admin', can_manage_users=True)))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('buffered', response.data)
+
+
+class AuditRetentionTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        now = timezone.now()
+        for days in (400, 399, 398, 10):
+            AuditLog.objects.create(event_type='LOGIN', target=f'{days} days ago', actor=self.admin,
+                                    created_at=now - timedelta(days=days))
+
+    def prune(self, *args):
+        out = StringIO()
+        call_command('prune_audit_logs', '--days', '365', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_only_counts(self):
+        self.assertIn('3 logs older than', self.prune('--dry-run'))
+        self.assertEqual(AuditLog.objects.count(), 4)
+
+    def test_purge_runs_in_batches_and_archives_first(self):
+        with tempfile.TemporaryDirectory() as archive_dir:
+            output = self.prune('--batch-size', '2', '--archive-dir', archive_dir)
+            self.assertIn('Deleted 3 logs', output)
+            self.assertIn('in 2 batches', output)
+            rows = []
+            for path in Path(archive_dir).glob('audit-*.jsonl.gz'):
+                with gzip.open(path, 'rt') as fh:
+                    rows += [json.loads(line) for line in fh]
+        self.assertEqual(sorted(r['target'] for r in rows), ['398 days ago', '399 days ago', '400 days ago'])
+        self.assertEqual(rows[0]['actor__username'], 'admin')
+        self.assertEqual(list(AuditLog.objects.values_list('target', flat=True)), ['10 days ago'])
+
+
+class AuditLogPaginationTests(IsolatedTestCase):
+    def test_pages_follow_the_cursor(self):
+        admin = User.objects.create(username='admin', is_superuser=True)
+        created = timezone.now()
+        for i in range(5):
+            # Same timestamp throughout: the id tiebreak keeps pages disjoint
+            AuditLog.objects.create(event_type='LOGIN', target=f'event {i}', created_at=created)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        page = client.get('/api/audit-logs/', {'page_size': 3}).data
+        seen = [log['target'] for log in page['results']]
+        page = client.get(page['next']).data
+        seen += [log['target'] for log in page['results']]
+        self.assertIsNone(page['next'])
+        self.assertEqual(seen, [f'event {i}' for i in range(4, -1, -1)])
+
+
+class TeamSnapshotTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.aero = Sig.objects.create(name='Aero', order=2)
+        self.rover = Sig.objects.create(name='Rover', order=1)
+        TeamPosition.objects.create(name='Captain', rank=1)
+        TeamPosition.objects.create(name='Lead', rank=2)
+        self.captain = make_member('captain', sig=self.aero, position='Captain')
+        self.lead = make_member('lead', sig=self.aero, position='Lead')
+        self.rookie = make_member('rookie', sig=self.rover)
+        self.old = make_member('old', is_alumni=True)
+        make_member('hidden', is_public=False)
+        self.client = APIClient()
+
+    def team(self, team_type='current', **headers):
+        return self.client.get('/api/team/public/', {'type': team_type}, **headers)
+
+    def sections(self, team_type='current'):
+        payload = json.loads(self.team(team_type).content)
+        return [(s['sig'], [payload['members'][str(uid)]['username'] for uid in s['members']]) for s in payload['sections']]
+
+    def test_sections_follow_sig_order_and_rank(self):
+        self.assertEqual(self.sections(), [('Rover', ['rookie']), ('Aero', ['captain', 'lead'])])
+        self.assertEqual(self.sections('alumni'), [('General Members', ['old'])])
+
+    def test_served_with_validators(self):
+        response = self.team()
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.team(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_profile_edits_patch_the_stored_snapshot(self):
+        self.team(), self.team('alumni')
+        profile = self.rookie.profile
+        profile.is_alumni = True
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        with self.assertNumQueries(0):
+            current, alumni = self.sections(), self.sections('alumni')
+        self.assertEqual(current, [('Aero', ['captain', 'lead'])])
+        self.assertEqual(alumni, [('Rover', ['rookie']), ('General Members', ['old'])])
+
+    def test_rank_changes_rebuild(self):
+        self.team()
+        profile = self.lead.profile
+        profile.position = 'President'
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamPosition.objects.create(name='President', rank=0)
+            profile.save()
+        self.assertEqual(self.sections()[1], ('Aero', ['lead', 'captain']))
+
+
+class InvalidateAfterUpdateTests(IsolatedTestCase):
+    """Reorders and renames use QuerySet.update(), which sends no signals."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create(username='admin', is_superuser=True)
+        self.aero = Sig.objects.create(name='Aero', order=1)
+        self.rover = Sig.objects.create(name='Rover', order=2)
+        self.ana = make_member('ana', sig=self.aero)
+        self.ben = make_member('ben', sig=self.aero)
+        make_member('cy', sig=self.rover)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def team(self):
+        payload = json.loads(APIClient().get('/api/team/public/').content)
+        return [(s['sig'], [payload['members'][str(uid)]['username'] for uid in s['members']]) for s in payload['sections']]
+
+    def post(self, url, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'items': items}, format='json')
+
+    def test_reorders_refresh_the_team_page(self):
+        self.assertEqual(self.team(), [('Aero', ['ana', 'ben']), ('Rover', ['cy'])])
+        self.post('/api/sigs/reorder-sigs/', [{'id': self.aero.pk, 'order': 3}])
+        self.post('/api/management/reorder-team/', [{'id': self.ben.pk, 'order': -1}])
+        self.assertEqual(self.team(), [('Rover', ['cy']), ('Aero', ['ben', 'ana'])])
+
+    def test_reorder_moves_list_validators(self):
+        events = APIClient()
+        etag = events.get('/api/events/')['ETag']
+        self.post('/api/management/reorder-team/', [{'id': self.ana.pk, 'order': 5}])
+        self.assertEqual(events.get('/api/events/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_sig_rename_carries_profiles_along(self):
+        profile = self.ana.profile
+        profile.sig = 'Aero'
+        profile.save()
+        self.team()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/sigs/{self.aero.pk}/', {'name': 'Aerial'}, format='json')
+        self.assertEqual(self.team()[0], ('Aerial', ['ana', 'ben']))
@@ -2,6 +2,7 @@ from rest_framework import generics, permissions, status, viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from .models import Role, MemberProfile, Sig, ProfileFieldDefinition, TeamPosition, AuditLog
@@ -9,53 +10,100 @@ from .serializers import (
     UserSerializer, RoleSerializer, MemberProfileSerializer, 
     SigSerializer, ProfileFieldDefinitionSerializer, TeamPositionSerializer, AuditLogSerializer
 )
-from .permissions import GlobalPermission
+from .permissions import GlobalPermission, get_permission_set
+from .audit import record_event, writer as audit_writer
+from .retention import purge_audit_logs
+from .team import invalidate_team_snapshot
+from core.caching import invalidate_models
+from core.conditional import json_body_response
+from core.exports import ExportFilterError, date_range_filters, iterate, stream_csv, wants_gzip
 import json
-import csv
-from django.http import HttpResponse
 from django.utils import timezone
 from datetime import timedelta
 
 User = get_user_model()
 
+# --- HELPER: CACHES AFTER QUERYSET UPDATES ---
+def invalidate_after_update(*models):
+    # QuerySet.update() sends no signals: drop what a save of `models` would, once committed
+    def bump():
+        invalidate_models(*models)
+        invalidate_team_snapshot()
+    transaction.on_commit(bump)
+
 # --- HELPER: AUDIT LOGGER ---
 def log_audit(request, event, target, details=""):
-    try:
-        ip = request.META.get('REMOTE_ADDR')
-        AuditLog.objects.create(
-            event_type=event,
-            actor=request.user if request.user.is_authenticated else None,
-            target=target,
-            ip_address=ip,
-            details=str(details)
-        )
-    except: pass
+    # Buffered: the row is written by users.audit's background flusher
+    record_event(
+        event, target,
+        actor=request.user if request.user.is_authenticated else None,
+        ip_address=request.META.get('REMOTE_ADDR'),
+        details=details,
+        request=request,
+    )
 
 # --- VIEWSETS ---
 
+class AuditLogPagination(CursorPagination):
+    """Keyset pagination on (created_at, id): page N costs the same as page 1."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
+
+
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = AuditLog.objects.all()
+    queryset = AuditLog.objects.select_related('actor')
     serializer_class = AuditLogSerializer
     permission_classes = [GlobalPermission]
+    pagination_class = AuditLogPagination
+
+    def _filtered(self, queryset):
+        """?from=&to= (dates), ?event_type=, ?actor=<user id>"""
+        params = self.request.query_params
+        filters = date_range_filters(self.request, 'created_at')
+        if params.get('event_type'):
+            filters['event_type'] = params['event_type']
+        if params.get('actor', '').isdigit():
+            filters['actor_id'] = params['actor']
+        return queryset.filter(**filters)
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == 'list':
+            qs = self._filtered(qs)
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        try:
+            return super().list(request, *args, **kwargs)
+        except ExportFilterError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="audit_logs.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Event Type', 'Actor', 'Target', 'IP Address', 'Details', 'Created At'])
-
-        for log in self.queryset.all():
-            writer.writerow([
-                log.event_type,
-                log.actor.username if log.actor else 'System/Proton',
-                log.target,
-                log.ip_address,
-                log.details,
-                log.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            ])
-        return response
+        """Streams the log. Same filters as the list, plus ?gzip=1"""
+        try:
+            logs = self._filtered(AuditLog.objects.all())
+        except ExportFilterError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logs = logs.values_list(
+            'event_type', 'actor__username', 'target', 'ip_address', 'details', 'created_at'
+        )
+        rows = (
+            [event, actor or 'System/Proton', target, ip, details, created.strftime("%Y-%m-%d %H:%M:%S")]
+            for event, actor, target, ip, details, created in iterate(logs)
+        )
+        header = ['Event Type', 'Actor', 'Target', 'IP Address', 'Details', 'Created At']
+        return stream_csv('audit_logs.csv', header, rows, compress=wants_gzip(request))
+
+    @action(detail=False, methods=['get'])
+    def writer_stats(self, request):
+        """Counters for this process's buffered audit writer"""
+        if not (request.user.is_superuser or get_permission_set(request.user).has('can_manage_users')):
+            return Response({"error": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+        return Response(audit_writer.stats())
 
     @action(detail=False, methods=['post'])
     def delete_old_logs(self, request):
@@ -66,14 +114,15 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         try:
             days = int(days)
             cutoff_date = timezone.now() - timedelta(days=days)
-            deleted_count, _ = AuditLog.objects.filter(created_at__lt=cutoff_date).delete()
-            log_audit(request, "LOGS_CLEANED", f"Deleted {deleted_count} logs older than {days} days")
+            # Batched so a large purge doesn't lock the table in one statement
+            deleted_count = purge_audit_logs(cutoff_date)['deleted']
+            log_audit(request, "LOGS_CLEANED", f"Deleted {deleted_count} logs older than {days} days", {"days": days, "deleted_count": deleted_count})
             return Response({"status": "success", "deleted_count": deleted_count})
         except ValueError:
              return Response({"error": "Invalid days parameter"}, status=status.HTTP_400_BAD_REQUEST)
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('profile')
     serializer_class = UserSerializer
     permission_classes = [GlobalPermission]
 
@@ -129,30 +178,31 @@ class UserViewSet(viewsets.ModelViewSet):
         self._update_profile(user, data, request.FILES.get('image'))
         
         if changes:
-             log_audit(request, "USER_MODIFIED", f"Modified user {user.username}", ", ".join(changes))
+             log_audit(request, "USER_MODIFIED", f"Modified user {user.username}", {"changes": changes})
 
         return Response(UserSerializer(user).data)
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="users.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Username', 'Email', 'Full Name', 'Role', 'Team Position', 'SIG', 'Status'])
-
-        for user in self.queryset.all():
-            profile = getattr(user, 'profile', None)
-            writer.writerow([
-                user.username,
-                user.email,
-                profile.full_name if profile else '',
-                user.role,
-                profile.position if profile else '',
-                profile.sig if profile else '',
-                'Active' if user.is_active else 'Inactive'
-            ])
-        return response
+        """Streams all users. Filters: ?from=&to= (date joined), ?role=, ?is_active=true|false, ?gzip=1"""
+        try:
+            filters = date_range_filters(request, 'date_joined')
+        except ExportFilterError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('role'):
+            filters['role'] = request.query_params['role']
+        if request.query_params.get('is_active') in ('true', 'false'):
+            filters['is_active'] = request.query_params['is_active'] == 'true'
+
+        users = User.objects.filter(**filters).order_by('id').values_list(
+            'username', 'email', 'profile__full_name', 'role', 'profile__position', 'profile__sig', 'is_active'
+        )
+        rows = (
+            [username, email, full_name or '', role, position or '', sig or '', 'Active' if active else 'Inactive']
+            for username, email, full_name, role, position, sig, active in iterate(users)
+        )
+        header = ['Username', 'Email', 'Full Name', 'Role', 'Team Position', 'SIG', 'Status']
+        return stream_csv('users.csv', header, rows, compress=wants_gzip(request))
 
     def destroy(self, request, *args, **kwargs):
         user = self.get_object()
@@ -175,7 +225,7 @@ class UserViewSet(viewsets.ModelViewSet):
         # Security permission check helper
         has_security_perm = (
             request_user.is_superuser or 
-            request_user.user_roles.filter(can_manage_security=True).exists()
+            get_permission_set(request_user).has('can_manage_security')
         )
 
         def set_if(field):
@@ -254,6 +304,7 @@ class UserViewSet(viewsets.ModelViewSet):
                  order = item.get('order')
                  if uid and order is not None:
                      MemberProfile.objects.filter(user_id=uid).update(order=order)
+            invalidate_after_update(MemberProfile)
         return Response({"status": "updated"})
 
 
@@ -287,6 +338,7 @@ class SigViewSet(viewsets.ModelViewSet):
         res = super().update(request, *args, **kwargs)
         if old != res.data['name']:
              MemberProfile.objects.filter(sig=old).update(sig=res.data['name'])
+             invalidate_after_update(MemberProfile)
              log_audit(request, "SIG_RENAMED", f"Renamed SIG {old} to {res.data['name']}")
         return res
 
@@ -299,6 +351,7 @@ class SigViewSet(viewsets.ModelViewSet):
                  order = item.get('order')
                  if uid and order is not None:
                      Sig.objects.filter(id=uid).update(order=order)
+            invalidate_after_update(Sig)
         return Response({"status": "updated"})
 
 class TeamPositionViewSet(viewsets.ModelViewSet):
@@ -403,13 +456,12 @@ class UserProfileView(APIView):
         log_audit(request, "PROFILE_SELF_UPDATE", f"User {user.username} updated own profile")
         return Response(UserSerializer(user).data)
 
-class PublicTeamView(generics.ListAPIView):
+class PublicTeamView(APIView):
+    """Pre-rendered team page snapshot (users/team.py), ?type=alumni for alumni."""
     permission_classes = [permissions.AllowAny]
-    serializer_class = UserSerializer
 
-    def get_queryset(self):
-        qs = User.objects.filter(is_active=True, profile__is_public=True).select_related('profile').prefetch_related('user_roles')
-        m_type = self.request.query_params.get('type')
-        if m_type == 'alumni': qs = qs.filter(profile__is_alumni=True)
-        else: qs = qs.filter(profile__is_alumni=False)
-        return qs.order_by('profile__order', 'profile__full_name')
+    def get(self, request):
+        from .team import team_snapshot, CACHE_CONTROL
+        team_type = 'alumni' if request.query_params.get('type') == 'alumni' else 'current'
+        etag, body = team_snapshot(team_type)
+        return json_body_response(request, body, etag, cache_control=CACHE_CONTROL)
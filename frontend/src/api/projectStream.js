@@ -0,0 +1,70 @@
+import api from "./axios";
+
+// One shared EventSource per project page (dashboard + discussions tab).
+// If the server cannot stream (e.g. running under WSGI -> 503) the source
+// closes and callers keep polling; isProjectStreamLive() tells them which.
+const streams = new Map(); // projectId -> { source, listeners, live, closed }
+
+const EVENT_TYPES = ["ready", "message", "typing", "presence"];
+const RECONNECT_MS = 5000;
+
+// EventSource cannot send headers, so each connection is opened with a
+// short-lived stream ticket instead of the access token.
+async function open(projectId, entry) {
+    let ticket;
+    try {
+        ({ data: { ticket } } = await api.get(`/projects/${projectId}/stream_ticket/`));
+    } catch {
+        return; // not a member / logged out: stay on polling
+    }
+    if (entry.closed) return;
+
+    const source = new EventSource(`${api.defaults.baseURL}/projects/${projectId}/stream/?ticket=${encodeURIComponent(ticket)}`);
+    entry.source = source;
+
+    source.addEventListener("ready", () => { entry.live = true; entry.opened = true; });
+    source.onerror = () => {
+        entry.live = false;
+        // A dropped connection retries with the same (by then expired) ticket
+        // and fails for good; reopen with a fresh one. Only after a connection
+        // was established, so servers that can't stream aren't retried forever.
+        if (source.readyState === EventSource.CLOSED && entry.opened && !entry.closed) {
+            setTimeout(() => { if (!entry.closed) open(projectId, entry); }, RECONNECT_MS);
+        }
+    };
+
+    EVENT_TYPES.forEach(type => {
+        source.addEventListener(type, (e) => {
+            let data;
+            try { data = JSON.parse(e.data); } catch { return; }
+            entry.listeners.forEach(l => l(type, data));
+        });
+    });
+}
+
+export function subscribeProjectStream(projectId, listener) {
+    if (typeof EventSource === "undefined") return () => { };
+    projectId = String(projectId);
+
+    let entry = streams.get(projectId);
+    if (!entry) {
+        if (!localStorage.getItem("accessToken")) return () => { };
+        entry = { source: null, listeners: new Set(), live: false, opened: false, closed: false };
+        streams.set(projectId, entry);
+        open(projectId, entry);
+    }
+
+    entry.listeners.add(listener);
+    return () => {
+        entry.listeners.delete(listener);
+        if (entry.listeners.size === 0) {
+            entry.closed = true;
+            entry.source?.close();
+            streams.delete(projectId);
+        }
+    };
+}
+
+export function isProjectStreamLive(projectId) {
+    return streams.get(String(projectId))?.live === true;
+}
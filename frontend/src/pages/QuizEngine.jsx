@@ -14,7 +14,12 @@ export default function QuizEngine() {
     const [isViolation, setIsViolation] = useState(false);
 
     const engineRef = useRef(null);
+    // Autosave: answers changed since the last acknowledged save, and the last sequence number sent
+    const pendingRef = useRef({});
+    const seqRef = useRef(0);
     const guestEmail = sessionStorage.getItem(`quiz_email_${id}`);
+    // Signed attempt token from join_by_code / start_quiz; routes our calls to the attempt
+    const tokenRef = useRef(sessionStorage.getItem(`quiz_token_${id}`));
 
     useEffect(() => {
         // 1. Strict Interaction Lock
@@ -86,10 +91,15 @@ export default function QuizEngine() {
                 // Fetch current status and quiz data
                 const res = await api.post("/quizzes/join_by_code/", {
                     code,
-                    email: guestEmail
+                    email: guestEmail,
+                    attempt_token: tokenRef.current
                 });
 
-                const { quiz, attempt } = res.data;
+                const { quiz, attempt, attempt_token } = res.data;
+                if (attempt_token) {
+                    tokenRef.current = attempt_token;
+                    sessionStorage.setItem(`quiz_token_${id}`, attempt_token);
+                }
 
                 if (!attempt || attempt.status !== 'ONGOING') {
                     navigate(`/quizzes/${id}/onboarding`);
@@ -100,6 +110,7 @@ export default function QuizEngine() {
                 setAttempt(attempt);
                 setTimeLeft(attempt.time_left);
                 setResponses(attempt.responses || {});
+                seqRef.current = attempt.response_seq || 0;
                 setLoading(false);
             } catch (err) { navigate("/quizzes"); }
         };
@@ -125,22 +136,38 @@ export default function QuizEngine() {
     const handleViolation = async (reason) => {
         if (isViolation) return;
         setIsViolation(true);
-        await api.post(`/quizzes/${id}/submit_quiz/`, { disqualified: true, email: guestEmail });
+        await api.post(`/quizzes/${id}/submit_quiz/`, { disqualified: true, email: guestEmail, attempt_token: tokenRef.current });
         alert(`SECURITY BREACH: ${reason}\nAssessment sequence terminated.`);
         navigate("/quizzes");
     };
 
     const handleSelectOption = (qId, val) => {
-        const newResponses = { ...responses, [qId]: Array.isArray(val) ? val : [val] };
-        setResponses(newResponses);
-        api.post(`/quizzes/${id}/update_responses/`, { responses: newResponses, email: guestEmail });
+        const answer = Array.isArray(val) ? val : [val];
+        setResponses({ ...responses, [qId]: answer });
+        pendingRef.current = { ...pendingRef.current, [qId]: answer };
+
+        // Send everything not yet acknowledged, so a lost or out-of-order save loses nothing
+        const changes = pendingRef.current;
+        const seq = ++seqRef.current;
+        api.post(`/quizzes/${id}/update_responses/`, { seq, changes, email: guestEmail, attempt_token: tokenRef.current })
+            .then(() => {
+                const pending = { ...pendingRef.current };
+                Object.keys(changes).forEach((key) => {
+                    if (pending[key] === changes[key]) delete pending[key];
+                });
+                pendingRef.current = pending;
+            })
+            .catch(() => { /* kept in pendingRef and resent with the next save */ });
     };
 
     const handleSubmit = async (isAuto = false) => {
         if (!isAuto && !window.confirm("Finalize transmission?")) return;
         setLoading(true);
         try {
-            await api.post(`/quizzes/${id}/submit_quiz/`, { email: guestEmail });
+            const changes = pendingRef.current;
+            const body = { email: guestEmail, attempt_token: tokenRef.current };
+            if (Object.keys(changes).length) Object.assign(body, { seq: ++seqRef.current, changes });
+            await api.post(`/quizzes/${id}/submit_quiz/`, body);
             navigate("/quizzes/success");
         } catch (err) {
             alert("Transmission failure.");
@@ -33,7 +33,9 @@ export default function QuizEnrollment() {
 
         try {
             const email = sessionStorage.getItem(`quiz_email_${id}`);
-            await api.post(`/quizzes/${id}/start_quiz/`, { email });
+            const attempt_token = sessionStorage.getItem(`quiz_token_${id}`);
+            const res = await api.post(`/quizzes/${id}/start_quiz/`, { email, attempt_token });
+            sessionStorage.setItem(`quiz_token_${id}`, res.data.attempt_token);
             navigate(`/quizzes/${id}/session`);
         } catch (err) {
             alert(err.response?.data?.error || "Initialization failed.");
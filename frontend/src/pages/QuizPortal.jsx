@@ -39,10 +39,14 @@ export default function QuizPortal() {
         setError("");
 
         try {
-            const res = await api.post("/quizzes/join_by_code/", { code, name, email });
-            const { quiz, attempt } = res.data;
+            // Rejoining from this tab: the token from the first join proves it's us
+            const previous = sessionStorage.getItem(`quiz_join_token_${code}`);
+            const res = await api.post("/quizzes/join_by_code/", { code, name, email, attempt_token: previous });
+            const { quiz, attempt, attempt_token } = res.data;
 
             // Store identity and code in sessionStorage to persist guest session
+            sessionStorage.setItem(`quiz_token_${quiz.id}`, attempt_token);
+            sessionStorage.setItem(`quiz_join_token_${code}`, attempt_token);
             sessionStorage.setItem(`quiz_email_${quiz.id}`, email);
             sessionStorage.setItem(`quiz_name_${quiz.id}`, name);
             sessionStorage.setItem(`quiz_code_${quiz.id}`, code);
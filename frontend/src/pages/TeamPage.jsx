@@ -1,21 +1,16 @@
-import { useEffect, useState, useMemo } from "react";
+import { useEffect, useState } from "react";
 import api from "../api/axios";
+import { buildMediaUrl } from "../utils/mediaUrl";
 import Navigation from "../components/Navbar";
 import Footer from "../components/Footer";
 
 export default function TeamPage() {
-  const [data, setData] = useState({}); // { "Coding": [members], "Systems": [members] }
-  const [sigs, setSigs] = useState([]);
+  const [sections, setSections] = useState([]); // [{ sig: "Coding", members: [member, ...] }]
   const [loading, setLoading] = useState(true);
 
   // Filter state
   const [viewType, setViewType] = useState('current'); // 'current' or 'alumni'
 
-  useEffect(() => {
-    // Fetch SIG structure once (for ordering)
-    api.get("/sigs/").then(res => setSigs(res.data)).catch(console.error);
-  }, []);
-
   useEffect(() => {
     loadMembers();
   }, [viewType]);
@@ -23,49 +18,16 @@ export default function TeamPage() {
   const loadMembers = async () => {
     setLoading(true);
     try {
-      // Fetch public members
+      // Snapshot comes grouped and ordered (SIG order, then position rank);
+      // sections reference member cards by id
       const res = await api.get("/team/public/", {
         params: { type: viewType }
       });
-
-      // Group by SIG (or use backend grouping if preferred, but frontend is flexible)
-      // Group logic: profile.sig
-      const grouped = res.data.reduce((acc, user) => {
-        const profile = user.profile || {};
-
-        // 1. Primary SIG (if any)
-        if (profile.sig) {
-          if (!acc[profile.sig]) acc[profile.sig] = [];
-          acc[profile.sig].push(user);
-        }
-
-        // 2. Secondary SIGs (from ManyToMany field 'sigs')
-        // The API returns 'sigs' typically as a list of objects [{id, name}, ...] or strings based on serializer.
-        // Assuming user.profile.sigs is available (check serializer).
-        if (profile.sigs && Array.isArray(profile.sigs)) {
-          profile.sigs.forEach(s => {
-            const sName = typeof s === 'object' ? s.name : s;
-            // Avoid duplicates if primary sig is same as one of secondary
-            if (sName !== profile.sig) {
-              if (!acc[sName]) acc[sName] = [];
-
-              // Check if user already pushed to this bucket (unlikely if unique set of sigs)
-              const existing = acc[sName].find(u => u.id === user.id);
-              if (!existing) acc[sName].push(user);
-            }
-          });
-        }
-
-        // 3. Fallback: If no SIGs at all, put in "General Members"
-        if (!profile.sig && (!profile.sigs || profile.sigs.length === 0)) {
-          if (!acc["General Members"]) acc["General Members"] = [];
-          acc["General Members"].push(user);
-        }
-
-        return acc;
-      }, {});
-
-      setData(grouped);
+      const { members, sections } = res.data;
+      setSections(sections.map(section => ({
+        sig: section.sig,
+        members: section.members.map(id => members[id]),
+      })));
 
     } catch (err) {
       console.error("Failed to load team", err);
@@ -74,25 +36,6 @@ export default function TeamPage() {
     }
   };
 
-  const sortedSections = useMemo(() => {
-    const keys = Object.keys(data);
-    const ordered = [];
-    const seen = new Set();
-
-    // 1. Add ordered SIGs (defined in structure command)
-    sigs.forEach(s => {
-      if (keys.includes(s.name)) {
-        ordered.push(s.name);
-        seen.add(s.name);
-      }
-    });
-
-    // 2. Add remaining (e.g. "General Members" or undefined SIGs) sorted alphabetically
-    const others = keys.filter(k => !seen.has(k)).sort();
-
-    return [...ordered, ...others];
-  }, [data, sigs]);
-
   return (
     <>
       <Navigation />
@@ -139,26 +82,26 @@ export default function TeamPage() {
             </div>
           )}
 
-          {!loading && Object.keys(data).length === 0 && (
+          {!loading && sections.length === 0 && (
             <div className="text-center py-20 text-gray-500">
               No members found in this category.
             </div>
           )}
 
-          {!loading && sortedSections.map(sigName => (
-            <div key={sigName} className="mb-24 animate-fade-in">
+          {!loading && sections.map(({ sig, members }) => (
+            <div key={sig} className="mb-24 animate-fade-in">
               {/* SIG Header */}
               <div className="flex items-center gap-4 mb-12">
                 <h2 className="text-3xl font-bold text-white font-[Orbitron] uppercase tracking-wider">
-                  {sigName}
+                  {sig}
                 </h2>
                 <div className="h-px bg-gradient-to-r from-cyan-500/50 to-transparent flex-1" />
               </div>
 
               {/* Cards Grid */}
               <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-8">
-                {data[sigName].map(user => (
-                  <MemberCard key={user.id} user={user} />
+                {members.map(member => (
+                  <MemberCard key={member.id} member={member} />
                 ))}
               </div>
             </div>
@@ -172,12 +115,11 @@ export default function TeamPage() {
 }
 
 /* ================= MEMBER CARD COMPONENT ================= */
-function MemberCard({ user }) {
-  const profile = user.profile || {};
+function MemberCard({ member }) {
   const [isHovered, setIsHovered] = useState(false);
 
   // Use profile image or fallback
-  const imgSrc = profile.image || null;
+  const imgSrc = member.image ? buildMediaUrl(member.image) : null;
 
   return (
     <div
@@ -190,12 +132,12 @@ function MemberCard({ user }) {
         {imgSrc ? (
           <img
             src={imgSrc}
-            alt={profile.full_name}
+            alt={member.full_name}
             className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-105"
           />
         ) : (
           <div className="w-full h-full flex flex-col items-center justify-center text-gray-700">
-            <span className="text-6xl font-bold opacity-20">{user.username[0]}</span>
+            <span className="text-6xl font-bold opacity-20">{member.username[0]}</span>
           </div>
         )}
 
@@ -205,27 +147,27 @@ function MemberCard({ user }) {
         {/* Reveal Content on Hover */}
         <div className={`absolute bottom-0 left-0 w-full p-6 transform transition-transform duration-300 ${isHovered ? 'translate-y-0' : 'translate-y-10 opacity-0'}`}>
           <p className="text-gray-300 text-sm line-clamp-3 mb-4">
-            {profile.description || "No bio available."}
+            {member.description || "No bio available."}
           </p>
 
           {/* Social Icons */}
           <div className="flex gap-4 text-xl">
-            {profile.linkedin_url && (
-              <a href={profile.linkedin_url} target="_blank" rel="noreferrer" className="text-white hover:text-blue-400 transition transform hover:scale-110">
+            {member.linkedin_url && (
+              <a href={member.linkedin_url} target="_blank" rel="noreferrer" className="text-white hover:text-blue-400 transition transform hover:scale-110">
 
                 {/* Fallback if fontawesome not loaded: just text */}
                 <span className="sr-only">LinkedIn</span>
                 <svg className="w-5 h-5 fill-current" viewBox="0 0 24 24"><path d="M19 0h-14c-2.761 0-5 2.239-5 5v14c0 2.761 2.239 5 5 5h14c2.762 0 5-2.239 5-5v-14c0-2.761-2.238-5-5-5zm-11 19h-3v-11h3v11zm-1.5-12.268c-.966 0-1.75-.79-1.75-1.764s.784-1.764 1.75-1.764 1.75.79 1.75 1.764-.783 1.764-1.75 1.764zm13.5 12.268h-3v-5.604c0-3.368-4-3.113-4 0v5.604h-3v-11h3v1.765c1.396-2.586 7-2.777 7 2.476v6.759z" /></svg>
               </a>
             )}
-            {profile.github_url && (
-              <a href={profile.github_url} target="_blank" rel="noreferrer" className="text-white hover:text-gray-400 transition transform hover:scale-110">
+            {member.github_url && (
+              <a href={member.github_url} target="_blank" rel="noreferrer" className="text-white hover:text-gray-400 transition transform hover:scale-110">
                 <span className="sr-only">GitHub</span>
                 <svg className="w-5 h-5 fill-current" viewBox="0 0 24 24"><path d="M12 0c-6.626 0-12 5.373-12 12 0 5.302 3.438 9.8 8.207 11.387.599.111.793-.261.793-.577v-2.234c-3.338.726-4.033-1.416-4.033-1.416-.546-1.387-1.333-1.756-1.333-1.756-1.089-.745.083-.729.083-.729 1.205.084 1.839 1.237 1.839 1.237 1.07 1.834 2.807 1.304 3.492.997.107-.775.418-1.305.762-1.604-2.665-.305-5.467-1.334-5.467-5.931 0-1.311.469-2.381 1.236-3.221-.124-.303-.535-1.524.117-3.176 0 0 1.008-.322 3.301 1.23.957-.266 1.983-.399 3.003-.404 1.02.005 2.047.138 3.006.404 2.291-1.552 3.297-1.23 3.297-1.23.653 1.653.242 2.874.118 3.176.77.84 1.235 1.911 1.235 3.221 0 4.609-2.807 5.624-5.479 5.921.43.372.823 1.102.823 2.222v3.293c0 .319.192.694.801.576 4.765-1.589 8.199-6.086 8.199-11.386 0-6.627-5.373-12-12-12z" /></svg>
               </a>
             )}
-            {profile.instagram_url && (
-              <a href={profile.instagram_url} target="_blank" rel="noreferrer" className="text-white hover:text-pink-400 transition transform hover:scale-110">
+            {member.instagram_url && (
+              <a href={member.instagram_url} target="_blank" rel="noreferrer" className="text-white hover:text-pink-400 transition transform hover:scale-110">
                 <span className="sr-only">Instagram</span>
                 <svg className="w-5 h-5 fill-current" viewBox="0 0 24 24"><path d="M12 2.163c3.204 0 3.584.012 4.85.07 3.252.148 4.771 1.691 4.919 4.919.058 1.265.069 1.645.069 4.849 0 3.205-.012 3.584-.069 4.849-.149 3.225-1.664 4.771-4.919 4.919-1.266.058-1.644.07-4.85.07-3.204 0-3.584-.012-4.849-.07-3.26-.149-4.771-1.699-4.919-4.92-.058-1.265-.07-1.644-.07-4.849 0-3.204.013-3.583.07-4.849.149-3.227 1.664-4.771 4.919-4.919 1.266-.057 1.645-.069 4.849-.069zm0-2.163c-3.259 0-3.667.014-4.947.072-4.358.2-6.78 2.618-6.98 6.98-.059 1.281-.073 1.689-.073 4.948 0 3.259.014 3.668.072 4.948.2 4.358 2.618 6.78 6.98 6.98 1.281.058 1.689.072 4.948.072 3.259 0 3.668-.014 4.948-.072 4.354-.2 6.782-2.618 6.979-6.98.059-1.28.073-1.689.073-4.948 0-3.259-.014-3.667-.072-4.947-.196-4.354-2.617-6.78-6.979-6.98-1.281-.059-1.69-.073-4.949-.073zm0 5.838c-3.403 0-6.162 2.759-6.162 6.162s2.759 6.163 6.162 6.163 6.162-2.759 6.162-6.163-2.759-6.162-6.162-6.162zm0 10.162c-2.209 0-4-1.79-4-4 0-2.209 1.791-4 4-4s4 1.791 4 4c0 2.21-1.791 4-4 4zm6.406-11.845c-.796 0-1.441.645-1.441 1.44s.645 1.44 1.441 1.44c.795 0 1.439-.645 1.439-1.44s-.644-1.44-1.439-1.44z" /></svg>
               </a>
@@ -236,10 +178,10 @@ function MemberCard({ user }) {
 
       {/* Basic Info (Visible Always) */}
       <div className="p-4 bg-[#0a0a0a]">
-        <h3 className="text-white font-bold text-lg truncate">{profile.full_name || user.username}</h3>
+        <h3 className="text-white font-bold text-lg truncate">{member.full_name || member.username}</h3>
         <div className="flex items-center justify-between mt-1 text-sm">
-          <span className="text-cyan-400 font-medium">{profile.position || "Member"}</span>
-          {profile.year && <span className="text-gray-500 text-xs border border-white/10 px-2 py-0.5 rounded">{profile.year}</span>}
+          <span className="text-cyan-400 font-medium">{member.position || "Member"}</span>
+          {member.year && <span className="text-gray-500 text-xs border border-white/10 px-2 py-0.5 rounded">{member.year}</span>}
         </div>
       </div>
     </div>
@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import api from "../../api/axios";
 
@@ -13,6 +13,8 @@ export default function AdminAttendanceDetail() {
 
     // For batch updates
     const [pendingChanges, setPendingChanges] = useState({}); // { 101: 'PRESENT', 102: 'ABSENT' }
+    // Reused when re-saving the same changes after a failed request, so the server applies them once
+    const batchIdRef = useRef(null);
 
     useEffect(() => {
         loadSession();
@@ -26,8 +28,21 @@ export default function AdminAttendanceDetail() {
 
             // Fetch records
             try {
-                const recRes = await api.get(`/attendance/sessions/${id}/records/`);
-                setRecords(recRes.data);
+                // Columnar payload: one array per field, much smaller for large sessions
+                const recRes = await api.get(`/attendance/sessions/${id}/records/`, { params: { layout: "columnar" } });
+                const cols = recRes.data.columns;
+                setRecords(cols.id.map((recordId, i) => ({
+                    id: recordId,
+                    user: cols.user_id[i],
+                    status: cols.status[i],
+                    user_details: {
+                        full_name: cols.full_name[i],
+                        username: cols.username[i],
+                        roll_number: cols.roll_number[i],
+                        sig: cols.sig[i],
+                        year: cols.year[i],
+                    },
+                })));
             } catch (err) {
                 // Ignore 404/empty
             }
@@ -54,6 +69,7 @@ export default function AdminAttendanceDetail() {
     };
 
     const handleStatusChange = (recordId, newStatus) => {
+        batchIdRef.current = null; // different payload -> new batch
         // Optimistic UI update for pending
         setPendingChanges(prev => ({
             ...prev,
@@ -85,7 +101,11 @@ export default function AdminAttendanceDetail() {
                     status: pendingChanges[r.id]
                 }));
 
-            await api.post(`/attendance/sessions/${id}/batch_update/`, { updates });
+            if (!batchIdRef.current) {
+                batchIdRef.current = window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+            }
+            await api.post(`/attendance/sessions/${id}/batch_update/`, { updates, batch_id: batchIdRef.current });
+            batchIdRef.current = null;
             setPendingChanges({});
             // loadSession(); // No need to reload if optimistic was correct
         } catch (err) {
@@ -7,7 +7,9 @@ export default function AdminAuditLogs() {
 
   const [logs, setLogs] = useState([]);
   const [page, setPage] = useState(1);
-  const [total, setTotal] = useState(0);
+  const [cursor, setCursor] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [prevCursor, setPrevCursor] = useState(null);
   const [eventType, setEventType] = useState("");
   const [deleteDays, setDeleteDays] = useState(""); // For delete input
   const [showDeleteConfirm, setShowDeleteConfirm] = useState(false);
@@ -39,6 +41,8 @@ export default function AdminAuditLogs() {
       alert(`Deleted ${res.data.deleted_count} logs.`);
       setShowDeleteConfirm(false);
       setDeleteDays("");
+      setCursor(null);
+      setPage(1);
       fetchLogs();
     } catch (err) {
       console.error("Delete failed", err);
@@ -48,44 +52,24 @@ export default function AdminAuditLogs() {
 
   useEffect(() => {
     fetchLogs();
-  }, [page, eventType]);
+  }, [cursor, eventType]);
+
+  // Backend pages by cursor (keyset), so pages are fetched on demand
+  const cursorOf = (url) => (url ? new URL(url).searchParams.get("cursor") : null);
 
   const fetchLogs = async () => {
     try {
       const res = await api.get("/audit-logs/", {
-        params: { page, limit, eventType },
+        params: { page_size: limit, event_type: eventType || undefined, cursor: cursor || undefined },
       });
-
-      // Handle different response structures
-      if (Array.isArray(res.data)) {
-        // No pagination active on backend
-        let filtered = res.data;
-        if (eventType) {
-          filtered = filtered.filter(l => l.event_type === eventType);
-        }
-        // Manual client-side pagination since backend isn't paginating
-        setTotal(filtered.length);
-        const start = (page - 1) * limit;
-        setLogs(filtered.slice(start, start + limit));
-      } else if (res.data.results) {
-        // Standard DRF Pagination
-        setLogs(res.data.results);
-        setTotal(res.data.count);
-      } else if (res.data.data) {
-        // Custom envelope (as implied by previous code)
-        setLogs(res.data.data);
-        setTotal(res.data.total);
-      } else {
-        setLogs([]);
-        setTotal(0);
-      }
+      setLogs(res.data.results || []);
+      setNextCursor(cursorOf(res.data.next));
+      setPrevCursor(cursorOf(res.data.previous));
     } catch (err) {
       console.error("Failed to load logs", err);
     }
   };
 
-  const totalPages = Math.ceil(total / limit);
-
   const badgeStyle = (success) =>
     success
       ? "bg-green-500/10 text-green-400 border-green-500/30"
@@ -155,6 +139,7 @@ export default function AdminAuditLogs() {
           value={eventType}
           onChange={(e) => {
             setEventType(e.target.value);
+            setCursor(null);
             setPage(1);
           }}
           className="
@@ -293,21 +278,20 @@ export default function AdminAuditLogs() {
       {/* ===== PAGINATION ===== */}
       <div className="flex items-center justify-between mt-6">
         <button
-          disabled={page === 1}
-          onClick={() => setPage(page - 1)}
+          disabled={!prevCursor}
+          onClick={() => { setCursor(prevCursor); setPage(page - 1); }}
           className="px-4 py-2 rounded-lg bg-gray-800 text-gray-300 disabled:opacity-40 hover:bg-gray-700 transition"
         >
           ← Prev
         </button>
 
         <span className="text-gray-400 text-sm">
-          Page <span className="text-gray-200">{page}</span> of{" "}
-          <span className="text-gray-200">{totalPages || 1}</span>
+          Page <span className="text-gray-200">{page}</span>
         </span>
 
         <button
-          disabled={page === totalPages || totalPages === 0}
-          onClick={() => setPage(page + 1)}
+          disabled={!nextCursor}
+          onClick={() => { setCursor(nextCursor); setPage(page + 1); }}
           className="px-4 py-2 rounded-lg bg-gray-800 text-gray-300 disabled:opacity-40 hover:bg-gray-700 transition"
         >
           Next →
@@ -24,7 +24,7 @@ export default function AdminProjectsPage() {
     setLoading(true);
     try {
       const [pRes, uRes] = await Promise.all([
-        api.get("/projects/"),
+        api.get("/projects/", { params: { expand: "tasks,members,join_requests" } }),
         api.get("/management/")
       ]);
       setProjects(pRes.data);
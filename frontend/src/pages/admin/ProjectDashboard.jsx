@@ -1,6 +1,7 @@
 import { useEffect, useState, useRef } from "react";
 import { useParams, useNavigate, useOutletContext, useSearchParams } from "react-router-dom";
 import api from "../../api/axios";
+import { subscribeProjectStream, isProjectStreamLive } from "../../api/projectStream";
 import { buildMediaUrl } from "../../utils/mediaUrl";
 
 // Icons
@@ -98,7 +99,55 @@ export default function ProjectDashboard() {
         }
     };
 
+    // Push Channel: new messages and presence arrive over SSE while connected
+    const viewRef = useRef({});
+    viewRef.current = { activeTab, threadId: parseInt(searchParams.get("thread")), project };
+
+    useEffect(() => {
+        if (!user) return;
+
+        return subscribeProjectStream(id, (type, data) => {
+            if (type === "message") {
+                // Own messages are reconciled by the sender's silent reload
+                if (data.author === user.id) return;
+                const view = viewRef.current;
+                const thread = view.project?.threads?.find(t => t.id === data.thread);
+                if (!thread || thread.messages?.some(m => m.id === data.id)) return;
+
+                setProject(prev => prev && {
+                    ...prev,
+                    threads: prev.threads.map(t =>
+                        t.id === data.thread && !t.messages?.some(m => m.id === data.id)
+                            ? { ...t, messages: [...(t.messages || []), data] }
+                            : t
+                    )
+                });
+                setSeenMessageIds(prev => new Set(prev).add(data.id));
+
+                if (Notification.permission === "granted") {
+                    new Notification(`New Signal: #${thread.title}`, {
+                        body: `${data.author_details?.username}: ${data.content.substring(0, 50)}${data.content.length > 50 ? '...' : ''}`,
+                        icon: '/favicon.ico'
+                    });
+                }
+                if (view.activeTab !== 'discussions' || view.threadId !== data.thread) {
+                    setUnreadMsgIds(prev => new Set(prev).add(data.id));
+                }
+            } else if (type === "presence" && data.online) {
+                setProject(prev => {
+                    if (!prev) return prev;
+                    const touch = (m) => m && m.id === data.id ? { ...m, last_login: data.at } : m;
+                    return { ...prev, lead_details: touch(prev.lead_details), members_details: prev.members_details?.map(touch) };
+                });
+            }
+        });
+    }, [id, user]);
+
     // Adaptive Polling Logic (Traffic Control)
+    const syncVersionRef = useRef(null);
+    // Thread diffs are only checked on the discussions tab: re-sync fully on tab switch
+    useEffect(() => { syncVersionRef.current = null; }, [activeTab]);
+
     useEffect(() => {
         // Spin Down: If no user session, do not start engine
         if (!user) return;
@@ -113,10 +162,23 @@ export default function ProjectDashboard() {
                 return;
             }
 
+            // Push channel connected: nothing to poll
+            if (isProjectStreamLive(id)) {
+                timeoutId = setTimeout(poll, 5000);
+                return;
+            }
+
             try {
-                // Lightweight Sync Call
-                const res = await api.get(`/projects/${id}/sync_state/`);
-                const { members_status = {}, threads_state = {} } = res.data || {};
+                // Lightweight Sync Call: 304 when nothing changed since our version
+                const res = await api.get(`/projects/${id}/sync_state/`, {
+                    params: syncVersionRef.current ? { since: syncVersionRef.current } : {},
+                    validateStatus: (s) => (s >= 200 && s < 300) || s === 304
+                });
+                if (res.status === 304) {
+                    timeoutId = setTimeout(poll, 5000);
+                    return;
+                }
+                const { version, members_status = {}, threads_state = {} } = res.data || {};
 
                 // State Update Logic
                 // 3. Diffing & Side-Effects (Moved OUT of setProject)
@@ -151,6 +213,7 @@ export default function ProjectDashboard() {
                         return prev;
                     });
                 }
+                syncVersionRef.current = version;
 
                 // Normal Pace: 5 seconds
                 timeoutId = setTimeout(poll, 5000);
@@ -581,11 +644,31 @@ function DiscussionsTab({ project, setProject, user, onUpdate, unreadMsgIds, set
         }
     };
 
-    // Typing Status Poller (Lightweight)
+    // Typing Status via push channel (entries expire like the server's 4s cache key)
+    useEffect(() => {
+        if (!activeThreadId) return;
+        setTypers([]);
+
+        const timers = {};
+        const unsubscribe = subscribeProjectStream(project.id, (type, data) => {
+            if (type !== "typing" || data.thread !== activeThreadId || data.id === user.id) return;
+            setTypers(prev => prev.some(t => t.id === data.id) ? prev : [...prev, { id: data.id, username: data.username }]);
+            clearTimeout(timers[data.id]);
+            timers[data.id] = setTimeout(() => setTypers(prev => prev.filter(t => t.id !== data.id)), 4000);
+        });
+
+        return () => {
+            unsubscribe();
+            Object.values(timers).forEach(clearTimeout);
+        };
+    }, [activeThreadId, project.id]);
+
+    // Typing Status Poller (Fallback when the push channel is down)
     useEffect(() => {
         if (!activeThreadId || document.hidden) return;
 
         const pollTypers = async () => {
+            if (isProjectStreamLive(project.id)) return;
             try {
                 const res = await api.get(`/threads/${activeThreadId}/get_typing_status/`);
                 setTypers(res.data.typers || []);